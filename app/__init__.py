@@ -85,7 +85,8 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = 86400
     
     db.init_app(app)
-    migrate.init_app(app, db)
+    # migrations/ sits next to the app package, whatever the working directory
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
     
     if is_production:
         railway_domain = os.environ.get('RAILWAY_PUBLIC_DOMAIN')
@@ -137,7 +138,7 @@ def create_app():
     # Initialize i18n
     i18n.init_app(app)
     
-    from app.routes import auth, catalog, quotes, users, settings, super_admin, email, languages
+    from app.routes import auth, catalog, quotes, users, settings, super_admin, email, languages, jobs, bootstrap
     
     app.register_blueprint(auth.bp)
     app.register_blueprint(catalog.bp)
@@ -147,6 +148,8 @@ def create_app():
     app.register_blueprint(super_admin.bp)
     app.register_blueprint(email.bp)
     app.register_blueprint(languages.bp)
+    app.register_blueprint(jobs.bp)
+    app.register_blueprint(bootstrap.bp)
     
     from flask import render_template
     
@@ -190,16 +193,15 @@ def create_app():
     def super_admin_activity_logs_page():
         return render_template('super_admin_activity_logs.html')
     
-    @app.route('/sw.js')
-    def service_worker():
-        from flask import send_from_directory
-        return send_from_directory('static', 'sw.js', mimetype='application/javascript')
-    
-    @app.after_request
-    def add_header(response):
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        return response
+    from app.services.assets import init_assets
+    
+    # asset_url() for templates, pre-compressed build output, generated sw.js
+    init_assets(app)
+    
+    from app.services.http_cache import apply_cache_policy
+    
+    # Route-aware Cache-Control: immutable fingerprinted assets, ETag
+    # revalidation for catalog/i18n, no-store for everything sensitive
+    app.after_request(apply_cache_policy)
     
     return app
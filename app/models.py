@@ -1,10 +1,26 @@
 from app import db
+from sqlalchemy.orm import declared_attr
 from datetime import datetime
 from hashlib import pbkdf2_hmac
 import secrets
+import json
 
 
-class ChassisType(db.Model):
+class CatalogEntry:
+    """Copy-on-write columns shared by the five catalog tables
+
+    Template rows have company_id NULL. A company row with template_id set
+    overrides that template row; with is_hidden it hides it instead.
+    """
+
+    @declared_attr
+    def template_id(cls):
+        return db.Column(db.Integer, db.ForeignKey(f'{cls.__tablename__}.id'), nullable=True, index=True)
+
+    is_hidden = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+
+class ChassisType(CatalogEntry, db.Model):
     __tablename__ = 'chassis_types'
     __table_args__ = (
         db.UniqueConstraint('company_id', 'name', name='uq_chassis_types_company_name'),
@@ -32,7 +48,7 @@ class ChassisType(db.Model):
         }
 
 
-class ProfileSeries(db.Model):
+class ProfileSeries(CatalogEntry, db.Model):
     __tablename__ = 'profile_series'
     __table_args__ = (
         db.UniqueConstraint('company_id', 'name', name='uq_profile_series_company_name'),
@@ -54,7 +70,7 @@ class ProfileSeries(db.Model):
         }
 
 
-class GlazingType(db.Model):
+class GlazingType(CatalogEntry, db.Model):
     __tablename__ = 'glazing_types'
     __table_args__ = (
         db.UniqueConstraint('company_id', 'name', name='uq_glazing_types_company_name'),
@@ -78,7 +94,7 @@ class GlazingType(db.Model):
         }
 
 
-class Finish(db.Model):
+class Finish(CatalogEntry, db.Model):
     __tablename__ = 'finishes'
     __table_args__ = (
         db.UniqueConstraint('company_id', 'name', name='uq_finishes_company_name'),
@@ -100,7 +116,7 @@ class Finish(db.Model):
         }
 
 
-class Accessory(db.Model):
+class Accessory(CatalogEntry, db.Model):
     __tablename__ = 'accessories'
     __table_args__ = (
         db.UniqueConstraint('company_id', 'name', name='uq_accessories_company_name'),
@@ -131,20 +147,29 @@ class Pricing(db.Model):
     unit = db.Column(db.String(20), nullable=False)
     price = db.Column(db.Float, nullable=False)
     coefficient = db.Column(db.Float, default=1.0)
+    min_quantity = db.Column(db.Float, nullable=False, default=0)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=True)
 
     def to_dict(self):
         return {
             'id': self.id,
+            'company_id': self.company_id,
             'category': self.category,
             'subcategory': self.subcategory,
             'unit': self.unit,
             'price': self.price,
-            'coefficient': self.coefficient
+            'coefficient': self.coefficient,
+            'min_quantity': self.min_quantity
         }
 
 
 class Quote(db.Model):
     __tablename__ = 'quotes'
+    __table_args__ = (
+        # price_ttc and item_count make the dashboard aggregates index-only scans
+        db.Index('ix_quotes_company_date', 'company_id', 'quote_date', 'price_ttc', 'item_count'),
+        db.Index('ix_quotes_company_client', 'company_id', 'client_name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     quote_number = db.Column(db.String(50), nullable=False, unique=True)
@@ -160,11 +185,20 @@ class Quote(db.Model):
     price_ht = db.Column(db.Float, nullable=False)
     price_ttc = db.Column(db.Float, nullable=False)
     details = db.Column(db.Text, nullable=False)
+    # Copied out of details for SQL aggregates (NULL until backfilled)
+    client_name = db.Column(db.String(200))
+    item_count = db.Column(db.Integer, nullable=False, default=1)
     company_id = db.Column(db.Integer,
                            db.ForeignKey('companies.id'),
                            nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    items = db.relationship('QuoteItem',
+                            backref='quote',
+                            order_by='QuoteItem.position',
+                            cascade='all, delete-orphan',
+                            lazy=True)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -181,12 +215,94 @@ class Quote(db.Model):
             'price_ht': self.price_ht,
             'price_ttc': self.price_ttc,
             'details': self.details,
+            'client_name': self.client_name,
+            'item_count': self.item_count,
             'company_id': self.company_id,
             'created_at':
             self.created_at.isoformat() if self.created_at else None
         }
 
 
+# Recent-quotes feed: newest first per company, the feed's columns included (PostgreSQL)
+db.Index('ix_quotes_company_created',
+         Quote.company_id,
+         Quote.created_at.desc(),
+         postgresql_include=['quote_number', 'quote_date', 'price_ttc', 'chassis_type', 'client_name'])
+
+
+class QuoteItem(db.Model):
+    __tablename__ = 'quote_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    quote_id = db.Column(db.Integer,
+                         db.ForeignKey('quotes.id', ondelete='CASCADE'),
+                         nullable=False,
+                         index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    chassis_type = db.Column(db.String(100), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    profile_series = db.Column(db.String(100))
+    glazing_type = db.Column(db.String(100))
+    finish = db.Column(db.String(100))
+    accessories = db.Column(db.Text)
+    discount_percent = db.Column(db.Float, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    unit_price_ht = db.Column(db.Float, nullable=False)
+    unit_price_ttc = db.Column(db.Float, nullable=False)
+    breakdown = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'quote_id': self.quote_id,
+            'position': self.position,
+            'chassis_type': self.chassis_type,
+            'width': self.width,
+            'height': self.height,
+            'profile_series': self.profile_series,
+            'glazing_type': self.glazing_type,
+            'finish': self.finish,
+            'accessories': json.loads(self.accessories) if self.accessories else {},
+            'discount_percent': self.discount_percent,
+            'quantity': self.quantity,
+            'unit_price_ht': self.unit_price_ht,
+            'unit_price_ttc': self.unit_price_ttc,
+            'breakdown': json.loads(self.breakdown) if self.breakdown else {}
+        }
+
+
+class QuoteCounter(db.Model):
+    __tablename__ = 'quote_counters'
+
+    # company_key 0 = quotes without company
+    company_key = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.String(8), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class QuoteDailyRollup(db.Model):
+    __tablename__ = 'quote_daily_rollups'
+
+    # company_key 0 = quotes without company; day = Quote.quote_date (YYYY-MM-DD)
+    company_key = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.String(10), primary_key=True)
+    quote_count = db.Column(db.Integer, nullable=False, default=0)
+    total_ht = db.Column(db.Float, nullable=False, default=0)
+    total_ttc = db.Column(db.Float, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'company_key': self.company_key,
+            'day': self.day,
+            'quote_count': self.quote_count,
+            'total_ht': self.total_ht,
+            'total_ttc': self.total_ttc,
+            'item_count': self.item_count
+        }
+
+
 class Config(db.Model):
     __tablename__ = 'config'
 
@@ -197,6 +313,61 @@ class Config(db.Model):
         return {'key': self.key, 'value': self.value}
 
 
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+
+    # company_key 0 = template catalog / global configuration
+    company_key = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'company_key': self.company_key,
+            'scope': self.scope,
+            'version': self.version
+        }
+
+
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    company_id = db.Column(db.Integer,
+                           db.ForeignKey('companies.id'),
+                           nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    summary = db.Column(db.Text)
+    result_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    # Refreshed by every progress update: a running job whose heartbeat is
+    # too old was lost with its worker (see jobs.fail_stale_jobs)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'company_id': self.company_id,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'summary': json.loads(self.summary) if self.summary else None,
+            'has_result': bool(self.result_path),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
 class AuditLog(db.Model):
     __tablename__ = 'audit_log'
 
@@ -225,7 +396,8 @@ class User(db.Model):
     role = db.Column(db.String(20), nullable=False, default='user')
     company_id = db.Column(db.Integer,
                            db.ForeignKey('companies.id'),
-                           nullable=True)
+                           nullable=True,
+                           index=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -283,6 +455,9 @@ class Setting(db.Model):
 
 class Company(db.Model):
     __tablename__ = 'companies'
+    __table_args__ = (
+        db.Index('ix_companies_created_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False, unique=True)
@@ -292,6 +467,9 @@ class Company(db.Model):
     approved_by = db.Column(db.Integer,
                             db.ForeignKey('users.id'),
                             nullable=True)
+    # Reads the template catalog through its own overrides. Companies created
+    # before the overlay hold full copies (False) until `flask compact-catalog`
+    catalog_inherits = db.Column(db.Boolean, nullable=False, default=True, server_default=db.false())
 
     users = db.relationship('User',
                             foreign_keys='User.company_id',
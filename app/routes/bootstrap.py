@@ -0,0 +1,73 @@
+from flask import Blueprint, session
+from datetime import datetime
+from app import db
+from app.models import ChassisType, ProfileSeries, GlazingType, Finish, Accessory, DataVersion
+from app.routes.auth import login_required
+from app.services.catalog_overlay import catalog_rows
+from app.services.http_cache import make_etag, conditional_json
+from app.services.pricing import get_price_book
+from app.services.quote_stats import quote_stats, recent_quotes
+from app.services.versions import company_key, get_versions, TEMPLATE_KEY
+
+bp = Blueprint('bootstrap', __name__, url_prefix='/api/bootstrap')
+
+def _session_user():
+    return {
+        'id': session.get('user_id'),
+        'username': session.get('username'),
+        'role': session.get('role'),
+        'full_name': session.get('full_name'),
+        'company_id': session.get('company_id')
+    }
+
+def _quotes_version(company_id, role):
+    if role == 'super_admin':
+        # Platform-wide stats: any company's quote write changes the payload
+        return db.session.query(db.func.coalesce(db.func.sum(DataVersion.version), 0)).filter(
+            DataVersion.scope == 'quotes'
+        ).scalar()
+    key = company_key(company_id)
+    return get_versions([key]).get((key, 'quotes'), 0)
+
+@bp.route('/dashboard', methods=['GET'])
+@login_required
+def dashboard():
+    company_id = session.get('company_id')
+    role = session.get('role')
+    user = _session_user()
+
+    # Week/month figures roll over with the date even without new quotes
+    etag = make_etag('dashboard', user, _quotes_version(company_id, role), datetime.now().strftime('%Y-%m-%d'))
+
+    return conditional_json(etag, lambda: {
+        'user': user,
+        'stats': quote_stats(company_id, role),
+        'recent': recent_quotes(company_id, role)
+    })
+
+@bp.route('/quote-wizard', methods=['GET'])
+@login_required
+def quote_wizard():
+    company_id = session.get('company_id')
+    user = _session_user()
+
+    key = company_key(company_id)
+    versions = get_versions([key, TEMPLATE_KEY])
+    etag = make_etag('quote-wizard', user,
+                     versions.get((key, 'catalog'), 0),
+                     versions.get((TEMPLATE_KEY, 'catalog'), 0))
+
+    def build():
+        return {
+            'user': user,
+            'catalog': {
+                'chassisTypes': catalog_rows(ChassisType, company_id, versions),
+                'profileSeries': catalog_rows(ProfileSeries, company_id, versions),
+                'glazingTypes': catalog_rows(GlazingType, company_id, versions),
+                'finishes': catalog_rows(Finish, company_id, versions),
+                'accessories': catalog_rows(Accessory, company_id, versions)
+            },
+            'compatibility': get_price_book(company_id).compatibility.to_dict()
+        }
+
+    return conditional_json(etag, build)
@@ -1,39 +1,87 @@
-from flask import Blueprint, jsonify, request, session
-from app.models import ChassisType, ProfileSeries, GlazingType, Finish, Accessory, Config
+from flask import Blueprint, abort, current_app, jsonify, request, session, stream_with_context
+from app.models import ChassisType, ProfileSeries, GlazingType, Finish, Accessory, Config, Pricing
 from app.routes.auth import login_required, admin_required
 from app import db
+from app.services.versions import bump_version, company_key, get_versions, TEMPLATE_KEY
+from app.services.http_cache import make_etag, conditional_json
+from app.services.pricing_rules import rule_values_error
+from app.services.catalog_overlay import (CATALOG_MODELS, BulkError, bulk_apply, catalog_rows,
+                                          find_entry, create_entry, update_entry, delete_entry)
+from app.services.catalog_io import FORMATS, ImportFormatError, detect_format, export_catalog, import_catalog
+from app.services.pricing import get_price_book
 
 bp = Blueprint('catalog', __name__, url_prefix='/api/catalog')
 
+def _catalog_response(name, model):
+    """Catalogue vu par l'entreprise (modèle + surcharges), revalidé par un
+    ETag tiré des versions du catalogue : un 304 n'exécute aucune requête
+    sur la table"""
+    company_id = session.get('company_id')
+    key = company_key(company_id)
+    versions = get_versions([key, TEMPLATE_KEY])
+    etag = make_etag(name, company_id,
+                     versions.get((key, 'catalog'), 0),
+                     versions.get((TEMPLATE_KEY, 'catalog'), 0))
+    return conditional_json(etag, lambda: catalog_rows(model, company_id, versions))
+
+def _create_entry(model):
+    company_id = session.get('company_id')
+    entry = create_entry(model, company_id, request.json)
+    bump_version(company_id)
+    db.session.commit()
+    return jsonify(entry.to_dict()), 201
+
+def _update_entry(model, id):
+    # Editing an inherited template row copies it into the company catalog
+    company_id = session.get('company_id')
+    entry = find_entry(model, id, company_id)
+    if entry is None:
+        abort(404)
+    entry = update_entry(model, entry, company_id, request.json)
+    bump_version(company_id)
+    db.session.commit()
+    return jsonify(entry.to_dict())
+
+def _delete_entry(model, id):
+    company_id = session.get('company_id')
+    entry = find_entry(model, id, company_id)
+    if entry is None:
+        abort(404)
+    delete_entry(model, entry, company_id)
+    bump_version(company_id)
+    db.session.commit()
+    return jsonify({'success': True})
+
 @bp.route('/chassis-types', methods=['GET'])
 def get_chassis_types():
-    company_id = session.get('company_id')
-    chassis_types = ChassisType.query.filter_by(company_id=company_id).all()
-    return jsonify([ct.to_dict() for ct in chassis_types])
+    return _catalog_response('chassis-types', ChassisType)
 
 @bp.route('/profile-series', methods=['GET'])
 def get_profile_series():
-    company_id = session.get('company_id')
-    series = ProfileSeries.query.filter_by(company_id=company_id).all()
-    return jsonify([s.to_dict() for s in series])
+    return _catalog_response('profile-series', ProfileSeries)
 
 @bp.route('/glazing-types', methods=['GET'])
 def get_glazing_types():
-    company_id = session.get('company_id')
-    glazing = GlazingType.query.filter_by(company_id=company_id).all()
-    return jsonify([g.to_dict() for g in glazing])
+    return _catalog_response('glazing-types', GlazingType)
 
 @bp.route('/finishes', methods=['GET'])
 def get_finishes():
-    company_id = session.get('company_id')
-    finishes = Finish.query.filter_by(company_id=company_id).all()
-    return jsonify([f.to_dict() for f in finishes])
+    return _catalog_response('finishes', Finish)
 
 @bp.route('/accessories', methods=['GET'])
 def get_accessories():
+    return _catalog_response('accessories', Accessory)
+
+@bp.route('/compatibility', methods=['GET'])
+def get_compatibility():
+    # Same versions as the price book it is compiled into
     company_id = session.get('company_id')
-    accessories = Accessory.query.filter_by(company_id=company_id).all()
-    return jsonify([a.to_dict() for a in accessories])
+    key = company_key(company_id)
+    versions = get_versions([key, TEMPLATE_KEY])
+    etag = make_etag('compatibility', company_id,
+                     versions.get((key, 'catalog'), 0),
+                     versions.get((TEMPLATE_KEY, 'catalog'), 0))
+    return conditional_json(etag, lambda: get_price_book(company_id).compatibility.to_dict())
 
 @bp.route('/config', methods=['GET'])
 def get_config():
@@ -43,154 +91,196 @@ def get_config():
 @bp.route('/chassis-types', methods=['POST'])
 @admin_required
 def create_chassis_type():
-    data = request.json
-    data['company_id'] = session.get('company_id')
-    chassis = ChassisType(**data)
-    db.session.add(chassis)
-    db.session.commit()
-    return jsonify(chassis.to_dict()), 201
+    return _create_entry(ChassisType)
 
 @bp.route('/chassis-types/<int:id>', methods=['PUT'])
 @admin_required
 def update_chassis_type(id):
-    company_id = session.get('company_id')
-    chassis = ChassisType.query.filter_by(id=id, company_id=company_id).first_or_404()
-    data = request.json
-    for key, value in data.items():
-        if key != 'company_id':
-            setattr(chassis, key, value)
-    db.session.commit()
-    return jsonify(chassis.to_dict())
+    return _update_entry(ChassisType, id)
 
 @bp.route('/chassis-types/<int:id>', methods=['DELETE'])
 @admin_required
 def delete_chassis_type(id):
-    company_id = session.get('company_id')
-    chassis = ChassisType.query.filter_by(id=id, company_id=company_id).first_or_404()
-    db.session.delete(chassis)
-    db.session.commit()
-    return jsonify({'success': True})
+    return _delete_entry(ChassisType, id)
 
 @bp.route('/profile-series', methods=['POST'])
 @admin_required
 def create_profile_series():
-    data = request.json
-    data['company_id'] = session.get('company_id')
-    series = ProfileSeries(**data)
-    db.session.add(series)
-    db.session.commit()
-    return jsonify(series.to_dict()), 201
+    return _create_entry(ProfileSeries)
 
 @bp.route('/profile-series/<int:id>', methods=['PUT'])
 @admin_required
 def update_profile_series(id):
-    company_id = session.get('company_id')
-    series = ProfileSeries.query.filter_by(id=id, company_id=company_id).first_or_404()
-    data = request.json
-    for key, value in data.items():
-        if key != 'company_id':
-            setattr(series, key, value)
-    db.session.commit()
-    return jsonify(series.to_dict())
+    return _update_entry(ProfileSeries, id)
 
 @bp.route('/profile-series/<int:id>', methods=['DELETE'])
 @admin_required
 def delete_profile_series(id):
-    company_id = session.get('company_id')
-    series = ProfileSeries.query.filter_by(id=id, company_id=company_id).first_or_404()
-    db.session.delete(series)
-    db.session.commit()
-    return jsonify({'success': True})
+    return _delete_entry(ProfileSeries, id)
 
 @bp.route('/glazing-types', methods=['POST'])
 @admin_required
 def create_glazing_type():
-    data = request.json
-    data['company_id'] = session.get('company_id')
-    glazing = GlazingType(**data)
-    db.session.add(glazing)
-    db.session.commit()
-    return jsonify(glazing.to_dict()), 201
+    return _create_entry(GlazingType)
 
 @bp.route('/glazing-types/<int:id>', methods=['PUT'])
 @admin_required
 def update_glazing_type(id):
-    company_id = session.get('company_id')
-    glazing = GlazingType.query.filter_by(id=id, company_id=company_id).first_or_404()
-    data = request.json
-    for key, value in data.items():
-        if key != 'company_id':
-            setattr(glazing, key, value)
-    db.session.commit()
-    return jsonify(glazing.to_dict())
+    return _update_entry(GlazingType, id)
 
 @bp.route('/glazing-types/<int:id>', methods=['DELETE'])
 @admin_required
 def delete_glazing_type(id):
-    company_id = session.get('company_id')
-    glazing = GlazingType.query.filter_by(id=id, company_id=company_id).first_or_404()
-    db.session.delete(glazing)
-    db.session.commit()
-    return jsonify({'success': True})
+    return _delete_entry(GlazingType, id)
 
 @bp.route('/finishes', methods=['POST'])
 @admin_required
 def create_finish():
-    data = request.json
-    data['company_id'] = session.get('company_id')
-    finish = Finish(**data)
-    db.session.add(finish)
-    db.session.commit()
-    return jsonify(finish.to_dict()), 201
+    return _create_entry(Finish)
 
 @bp.route('/finishes/<int:id>', methods=['PUT'])
 @admin_required
 def update_finish(id):
-    company_id = session.get('company_id')
-    finish = Finish.query.filter_by(id=id, company_id=company_id).first_or_404()
-    data = request.json
-    for key, value in data.items():
-        if key != 'company_id':
-            setattr(finish, key, value)
-    db.session.commit()
-    return jsonify(finish.to_dict())
+    return _update_entry(Finish, id)
 
 @bp.route('/finishes/<int:id>', methods=['DELETE'])
 @admin_required
 def delete_finish(id):
-    company_id = session.get('company_id')
-    finish = Finish.query.filter_by(id=id, company_id=company_id).first_or_404()
-    db.session.delete(finish)
-    db.session.commit()
-    return jsonify({'success': True})
+    return _delete_entry(Finish, id)
 
 @bp.route('/accessories', methods=['POST'])
 @admin_required
 def create_accessory():
-    data = request.json
-    data['company_id'] = session.get('company_id')
-    accessory = Accessory(**data)
-    db.session.add(accessory)
-    db.session.commit()
-    return jsonify(accessory.to_dict()), 201
+    return _create_entry(Accessory)
 
 @bp.route('/accessories/<int:id>', methods=['PUT'])
 @admin_required
 def update_accessory(id):
+    return _update_entry(Accessory, id)
+
+@bp.route('/accessories/<int:id>', methods=['DELETE'])
+@admin_required
+def delete_accessory(id):
+    return _delete_entry(Accessory, id)
+
+@bp.route('/<entity>/bulk', methods=['POST'])
+@admin_required
+def bulk_catalog(entity):
+    """Upserts and deletes keyed by name, applied in one transaction"""
+    model = CATALOG_MODELS.get(entity)
+    if model is None:
+        return jsonify({'error': f'Unknown catalog entity: {entity}'}), 404
+
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+
+    company_id = session.get('company_id')
+    try:
+        results, applied = bulk_apply(model, company_id, data.get('upserts', []), data.get('deletes', []))
+    except BulkError as e:
+        return jsonify({'error': str(e)}), 400
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    if not applied:
+        db.session.rollback()
+        return jsonify({'error': 'Invalid rows, nothing was applied', 'summary': summary, 'results': results}), 400
+
+    bump_version(company_id)
+    db.session.commit()
+    return jsonify({'summary': summary, 'results': results})
+
+@bp.route('/<entity>/import', methods=['POST'])
+@admin_required
+def import_catalog_file(entity):
+    """CSV/XLSX upload, upserted by name in chunks within one transaction"""
+    model = CATALOG_MODELS.get(entity)
+    if model is None:
+        return jsonify({'error': f'Unknown catalog entity: {entity}'}), 404
+
+    file = request.files.get('file')
+    if file is None or not file.filename:
+        return jsonify({'error': 'No file provided'}), 400
+    fmt = detect_format(file.filename, request.args.get('format'))
+    if fmt is None:
+        return jsonify({'error': 'File must be a .csv or .xlsx file'}), 400
+
     company_id = session.get('company_id')
-    accessory = Accessory.query.filter_by(id=id, company_id=company_id).first_or_404()
-    data = request.json
+    try:
+        summary, errors = import_catalog(model, company_id, file.stream, fmt)
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    if any(status != 'error' for status in summary):
+        bump_version(company_id)
+    db.session.commit()
+    return jsonify({'summary': summary, 'errors': errors, 'errors_truncated': summary.get('error', 0) > len(errors)})
+
+@bp.route('/<entity>/export', methods=['GET'])
+@login_required
+def export_catalog_file(entity):
+    """Catalog as CSV/XLSX, streamed batch by batch"""
+    model = CATALOG_MODELS.get(entity)
+    if model is None:
+        return jsonify({'error': f'Unknown catalog entity: {entity}'}), 404
+    fmt = detect_format(None, request.args.get('format', 'csv'))
+    if fmt is None:
+        return jsonify({'error': 'Format must be csv or xlsx'}), 400
+
+    generator = export_catalog(model, session.get('company_id'), fmt)
+    return current_app.response_class(
+        stream_with_context(generator),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{entity}.{fmt}"'}
+    )
+
+@bp.route('/pricing-rules', methods=['GET'])
+@login_required
+def get_pricing_rules():
+    company_id = session.get('company_id')
+    rules = Pricing.query.filter_by(company_id=company_id).order_by(
+        Pricing.category, Pricing.subcategory, Pricing.min_quantity).all()
+    return jsonify([r.to_dict() for r in rules])
+
+@bp.route('/pricing-rules', methods=['POST'])
+@admin_required
+def create_pricing_rule():
+    data = request.get_json(silent=True)
+    error = rule_values_error(data, creating=True)
+    if error:
+        return jsonify({'error': error}), 400
+    rule = Pricing(company_id=session.get('company_id'), **data)
+    db.session.add(rule)
+    bump_version(rule.company_id)
+    db.session.commit()
+    return jsonify(rule.to_dict()), 201
+
+@bp.route('/pricing-rules/<int:id>', methods=['PUT'])
+@admin_required
+def update_pricing_rule(id):
+    company_id = session.get('company_id')
+    rule = Pricing.query.filter_by(id=id, company_id=company_id).first_or_404()
+    data = request.get_json(silent=True)
+    error = rule_values_error(data, creating=False)
+    if error:
+        return jsonify({'error': error}), 400
     for key, value in data.items():
-        if key != 'company_id':
-            setattr(accessory, key, value)
+        setattr(rule, key, value)
+    bump_version(company_id)
     db.session.commit()
-    return jsonify(accessory.to_dict())
+    return jsonify(rule.to_dict())
 
-@bp.route('/accessories/<int:id>', methods=['DELETE'])
+@bp.route('/pricing-rules/<int:id>', methods=['DELETE'])
 @admin_required
-def delete_accessory(id):
+def delete_pricing_rule(id):
     company_id = session.get('company_id')
-    accessory = Accessory.query.filter_by(id=id, company_id=company_id).first_or_404()
-    db.session.delete(accessory)
+    rule = Pricing.query.filter_by(id=id, company_id=company_id).first_or_404()
+    db.session.delete(rule)
+    bump_version(company_id)
     db.session.commit()
     return jsonify({'success': True})
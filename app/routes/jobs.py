@@ -0,0 +1,42 @@
+from flask import Blueprint, jsonify, session, send_file
+from app.models import BackgroundJob
+from app.routes.auth import login_required
+from app import db
+from app.services.jobs import fail_stale_jobs, is_stale
+import json
+import os
+
+bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+def _get_job(job_id):
+    query = BackgroundJob.query.filter_by(id=job_id)
+    if session.get('role') != 'super_admin':
+        query = query.filter_by(company_id=session.get('company_id'))
+    job = query.first_or_404()
+    # A job lost with its worker would otherwise be polled as 'running' forever
+    if is_stale(job):
+        fail_stale_jobs()
+        db.session.refresh(job)
+    return job
+
+@bp.route('/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    return jsonify(_get_job(job_id).to_dict())
+
+@bp.route('/<job_id>/result', methods=['GET'])
+@login_required
+def get_job_result(job_id):
+    job = _get_job(job_id)
+
+    if job.status != 'completed' or not job.result_path:
+        return jsonify({'error': 'Job result is not available', 'status': job.status}), 409
+    if not os.path.exists(job.result_path):
+        return jsonify({'error': 'Job result file not found'}), 404
+
+    summary = json.loads(job.summary) if job.summary else {}
+    return send_file(
+        os.path.abspath(job.result_path),
+        as_attachment=True,
+        download_name=summary.get('download_name') or os.path.basename(job.result_path)
+    )
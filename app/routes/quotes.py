@@ -1,123 +1,103 @@
-from flask import Blueprint, request, jsonify
-from app.models import Quote, ChassisType, ProfileSeries, GlazingType, Finish, Accessory, Config, Setting
-from app.routes.auth import login_required
+from flask import Blueprint, current_app, request, jsonify, stream_with_context
+from app.models import Quote, QuoteItem
+from app.routes.auth import login_required, admin_required
 from app import db
+from app.services.pricing import get_price_book, cached_price_item, price_batch, PricingError
+from app.services.price_matrix import build_price_matrix
+from app.services.jobs import start_job, start_process_job, find_active_job
+from app.services.repricing import run_reprice_job
+from app.services.quote_items import MULTI_ITEM_LABEL, detail_items_values, is_multi_item, item_values, item_payload
+from app.services.quote_numbers import allocate_quote_number
+from app.services.rollups import record_quote
+from app.services.quote_stats import quote_stats, recent_quotes
+from app.services.versions import bump_version
+from app.services.pdf_renderer import quote_document
+from app.services.pdf_cache import PdfTooLargeError, document_key, lookup, quote_pdf, render_checked, render_job
+from app.services.pdf_export import ExportFilterError, company_header, export_quote_ids, stream_pdf_zip
 from datetime import datetime
 import json
 import io
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+import os
 from flask import send_file
 
 bp = Blueprint('quotes', __name__, url_prefix='/api/quotes')
 
+MAX_BATCH_ITEMS = 500
+
+# Quotes with more articles than this render in a worker process when the client asks for ?async=1
+PDF_INLINE_MAX_ITEMS = int(os.environ.get('PDF_INLINE_MAX_ITEMS', 50))
+
 @bp.route('/calculate', methods=['POST'])
 @login_required
 def calculate_price():
+    from flask import session
     data = request.json or {}
     
-    # Validate and convert required fields
+    book = get_price_book(session.get('company_id'))
+    
     try:
-        width_mm = float(data.get('width', 0))
-        height_mm = float(data.get('height', 0))
-    except (ValueError, TypeError):
-        return jsonify({'error': 'Width and height must be valid numbers'}), 400
-    
-    if width_mm <= 0 or height_mm <= 0:
-        return jsonify({'error': 'Width and height must be greater than 0'}), 400
-    
-    chassis_type = data.get('chassisType')
-    profile_series = data.get('profileSeries')
-    glazing_type = data.get('glazingType')
-    finish = data.get('finish')
-    accessories = data.get('accessories', {})
-    discount = data.get('discount', 0)
-    
-    if not chassis_type:
-        return jsonify({'error': 'Chassis type is required'}), 400
-    
-    chassis_limits = ChassisType.query.filter_by(name=chassis_type).first()
-    if not chassis_limits:
-        return jsonify({'error': f'Invalid chassis type: {chassis_type}'}), 400
-    
-    if not (chassis_limits.min_width <= width_mm <= chassis_limits.max_width):
-        return jsonify({'error': f'Width must be between {chassis_limits.min_width} and {chassis_limits.max_width} mm'}), 400
-    if not (chassis_limits.min_height <= height_mm <= chassis_limits.max_height):
-        return jsonify({'error': f'Height must be between {chassis_limits.min_height} and {chassis_limits.max_height} mm'}), 400
-    
-    surface_m2 = (width_mm * height_mm) / 1000000
-    perimeter_m = 2 * (width_mm + height_mm) / 1000
-    
-    vat_config = Config.query.filter_by(key='vat_rate').first()
-    loss_config = Config.query.filter_by(key='loss_coefficient').first()
-    
-    vat_rate = float(vat_config.value) / 100 if vat_config else 0.20
-    loss_coef = float(loss_config.value) if loss_config else 1.1
-    
-    glazing_obj = GlazingType.query.filter_by(name=glazing_type).first()
-    surface_price = glazing_obj.price_per_m2 if glazing_obj else 100.0
-    
-    profile_obj = ProfileSeries.query.filter_by(name=profile_series).first()
-    linear_price = profile_obj.price_per_meter if profile_obj else 50.0
-    
-    finish_obj = Finish.query.filter_by(name=finish).first()
-    finish_coef = finish_obj.price_coefficient if finish_obj else 1.0
-    
-    base_surface = surface_m2 * surface_price * loss_coef
-    base_linear = perimeter_m * linear_price
-    
-    accessories_total = 0
-    accessories_detail = []
-    # accessories is now a dict: {accessoryName: quantity}
-    for acc_name, quantity in accessories.items():
-        acc_obj = Accessory.query.filter_by(name=acc_name).first()
-        if acc_obj and quantity > 0:
-            price = acc_obj.unit_price * quantity
-            accessories_total += price
-            accessories_detail.append({
-                'name': acc_name,
-                'quantity': quantity,
-                'unit_price': round(acc_obj.unit_price, 2),
-                'total_price': round(price, 2)
-            })
-    
-    subtotal = (base_surface + base_linear + accessories_total) * finish_coef
-    
-    labor_config = Config.query.filter_by(key='labor_cost').first()
-    labor_price = float(labor_config.value) if labor_config else 50.0
-    
-    total_before_discount = subtotal + labor_price
-    discount_amount = total_before_discount * (discount / 100)
-    total_ht = total_before_discount - discount_amount
-    total_ttc = total_ht * (1 + vat_rate)
-    
-    breakdown = {
-        'surface_m2': round(surface_m2, 3),
-        'perimeter_m': round(perimeter_m, 2),
-        'base_price': round(base_surface + base_linear, 2),
-        'glazing_cost': round(base_surface, 2),
-        'profile_cost': round(base_linear, 2),
-        'accessories': accessories_detail,
-        'accessories_cost': round(accessories_total, 2),
-        'finish_coefficient': finish_coef,
-        'finish_supplement': round((base_surface + base_linear) * (finish_coef - 1), 2),
-        'subtotal': round(subtotal, 2),
-        'labor': round(labor_price, 2),
-        'total_before_discount': round(total_before_discount, 2),
-        'discount_percent': discount,
-        'discount_amount': round(discount_amount, 2),
-        'total_ht': round(total_ht, 2),
-        'vat_rate': round(vat_rate * 100, 2),
-        'vat_amount': round(total_ttc - total_ht, 2),
-        'total_price': round(total_ttc, 2)
-    }
+        breakdown = cached_price_item(book, data)
+    except PricingError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify(breakdown)
 
+@bp.route('/calculate-batch', methods=['POST'])
+@login_required
+def calculate_batch():
+    from flask import session
+    data = request.json or {}
+    items = data.get('items')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Items list is required'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'Too many items (max {MAX_BATCH_ITEMS})'}), 400
+    
+    book = get_price_book(session.get('company_id'))
+    results, totals = price_batch(book, items)
+    
+    return jsonify({'items': results, 'totals': totals})
+
+@bp.route('/price-matrix', methods=['POST'])
+@login_required
+def price_matrix():
+    from flask import session
+    data = request.json or {}
+    
+    book = get_price_book(session.get('company_id'))
+    
+    try:
+        widths, heights, price_ht, price_ttc = build_price_matrix(book, data)
+    except PricingError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'chassisType': data.get('chassisType'),
+        'profileSeries': data.get('profileSeries'),
+        'glazingType': data.get('glazingType'),
+        'finish': data.get('finish'),
+        'vat_rate': round(book.vat_rate * 100, 2),
+        'widths': widths.astype(int).tolist(),
+        'heights': heights.astype(int).tolist(),
+        'price_ht': price_ht.tolist(),
+        'price_ttc': price_ttc.tolist()
+    })
+
+@bp.route('/reprice-jobs', methods=['POST'])
+@admin_required
+def start_reprice_job():
+    from flask import session
+    company_id = session.get('company_id')
+    
+    # One repricing run per company at a time
+    active = find_active_job('reprice', company_id)
+    if active:
+        return jsonify({'error': 'A repricing job is already running', 'job': active.to_dict()}), 409
+    
+    job = start_job('reprice', company_id, session.get('user_id'), run_reprice_job, company_id)
+    return jsonify(job.to_dict()), 202
+
 @bp.route('', methods=['POST'])
 @login_required
 def create_quote():
@@ -127,29 +107,55 @@ def create_quote():
     
     company_id = session.get('company_id')
     
-    today = datetime.now().strftime('%Y%m%d')
-    quote_date = datetime.now().strftime('%Y-%m-%d')
-    
-    # Get the last quote number for today to avoid duplicates
-    prefix = f"DEV-{today}-"
-    if company_id:
-        last_quote = Quote.query.filter(
-            Quote.company_id == company_id,
-            Quote.quote_number.like(f"{prefix}%")
-        ).order_by(Quote.quote_number.desc()).first()
-    else:
-        last_quote = Quote.query.filter(
-            Quote.company_id.is_(None),
-            Quote.quote_number.like(f"{prefix}%")
-        ).order_by(Quote.quote_number.desc()).first()
-    
-    if last_quote:
-        # Extract the sequence number and increment
-        last_number = int(last_quote.quote_number.split('-')[-1])
-        quote_number = f"{prefix}{last_number + 1:04d}"
+    # Raw item specs only: price them server-side with the same engine as /calculate
+    items = data.get('items')
+    if items is not None:
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Items list is required'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f'Too many items (max {MAX_BATCH_ITEMS})'}), 400
+        
+        book = get_price_book(company_id)
+        results, totals = price_batch(book, items)
+        
+        errors = [r for r in results if 'error' in r]
+        if errors:
+            return jsonify({'error': 'Some items could not be priced', 'items': errors}), 400
+        
+        quote_items = [
+            QuoteItem(**item_values(position, item, result['quantity'], result['breakdown']))
+            for position, (item, result) in enumerate(zip(items, results))
+        ]
+        breakdown = {
+            'total_ht': totals['total_ht'],
+            'vat_amount': totals['vat_amount'],
+            'total_price': totals['total_price']
+        }
+        data = {
+            **data,
+            'chassisType': f'Devis multiple ({len(items)} articles)',
+            'width': 0,
+            'height': 0,
+            'profileSeries': MULTI_ITEM_LABEL,
+            'glazingType': MULTI_ITEM_LABEL,
+            'finish': MULTI_ITEM_LABEL,
+            'accessories': {}
+        }
     else:
-        # First quote of the day
-        quote_number = f"{prefix}0001"
+        # Priced client-side: a multi-article quote lists its articles in the breakdown
+        legacy_items = detail_items_values(breakdown.get('items'))
+        if legacy_items:
+            quote_items = [QuoteItem(**values) for values in legacy_items]
+        else:
+            quote_items = [QuoteItem(**item_values(0, data, 1, breakdown))]
+        # Articles live in quote_items, not in the details JSON
+        breakdown = {key: value for key, value in breakdown.items() if key != 'items'}
+    
+    now = datetime.now()
+    quote_date = now.strftime('%Y-%m-%d')
+    
+    # Atomic per-company daily counter: concurrent saves never share a number
+    quote_number = allocate_quote_number(company_id, now.strftime('%Y%m%d'))
     
     # Store accessories as JSON with quantities
     accessories_data = data.get('accessories', {})
@@ -177,10 +183,15 @@ def create_quote():
         price_ht=breakdown.get('total_ht', 0),
         price_ttc=breakdown.get('total_price', 0),
         details=json.dumps(details),
-        company_id=company_id
+        client_name=details['client_name'],
+        item_count=len(quote_items),
+        company_id=company_id,
+        items=quote_items
     )
     
     db.session.add(quote)
+    record_quote(quote)
+    bump_version(company_id, scope='quotes')
     db.session.commit()
     
     return jsonify({'quote_number': quote_number, 'quote_id': quote.id})
@@ -189,110 +200,14 @@ def create_quote():
 @login_required
 def get_quotes_stats():
     from flask import session
-    from datetime import timedelta
-    company_id = session.get('company_id')
-    role = session.get('role')
-    
-    if role == 'super_admin':
-        query = Quote.query
-    elif company_id:
-        query = Quote.query.filter_by(company_id=company_id)
-    else:
-        query = Quote.query.filter_by(company_id=None)
-    
-    total = query.count()
-    
-    now = datetime.now()
-    current_month = now.strftime('%Y-%m')
-    this_month_quotes = query.filter(Quote.quote_date.like(f'{current_month}%')).all()
-    this_month_count = len(this_month_quotes)
-    this_month_amount = sum(q.price_ttc for q in this_month_quotes)
-    
-    week_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
-    this_week_quotes = query.filter(Quote.quote_date >= week_start).all()
-    this_week_count = len(this_week_quotes)
-    this_week_amount = sum(q.price_ttc for q in this_week_quotes)
-    
-    if role == 'super_admin':
-        total_amount = db.session.query(db.func.sum(Quote.price_ttc)).scalar() or 0
-    else:
-        total_amount = db.session.query(db.func.sum(Quote.price_ttc)).filter(
-            Quote.company_id == company_id
-        ).scalar() or 0
-    
-    total_items = 0
-    top_client = None
-    
-    all_quotes = query.all()
-    
-    if all_quotes:
-        client_count = {}
-        
-        for quote in all_quotes:
-            try:
-                details = json.loads(quote.details) if quote.details else {}
-                items = details.get('items', [])
-                total_items += len(items) if items else 1
-                
-                client_name = details.get('client_name', '')
-                if client_name and client_name != '-':
-                    client_count[client_name] = client_count.get(client_name, 0) + 1
-            except:
-                total_items += 1
-        
-        if client_count:
-            top_client = max(client_count.items(), key=lambda x: x[1])[0]
-    
-    return jsonify({
-        'total': total,
-        'totalAmount': round(total_amount, 2),
-        'thisMonth': this_month_count,
-        'thisMonthAmount': round(this_month_amount, 2),
-        'thisWeek': this_week_count,
-        'thisWeekAmount': round(this_week_amount, 2),
-        'totalItems': total_items,
-        'topClient': top_client or '-'
-    })
+    return jsonify(quote_stats(session.get('company_id'), session.get('role')))
 
 @bp.route('/recent', methods=['GET'])
 @login_required
 def get_recent_quotes():
     from flask import session
     limit = request.args.get('limit', 10, type=int)
-    company_id = session.get('company_id')
-    role = session.get('role')
-    
-    if role == 'super_admin':
-        query = Quote.query
-    elif company_id:
-        query = Quote.query.filter_by(company_id=company_id)
-    else:
-        query = Quote.query.filter_by(company_id=None)
-    
-    quotes = query.order_by(Quote.created_at.desc()).limit(limit).all()
-    
-    result = []
-    for quote in quotes:
-        try:
-            details = json.loads(quote.details) if quote.details else {}
-            client_name = details.get('client_name', '-')
-        except:
-            client_name = '-'
-        
-        chassis_type_obj = ChassisType.query.filter_by(name=quote.chassis_type).first()
-        chassis_type_name = chassis_type_obj.name if chassis_type_obj else quote.chassis_type
-            
-        result.append({
-            'id': quote.id,
-            'quote_number': quote.quote_number,
-            'quote_date': quote.quote_date,
-            'total_price': round(quote.price_ttc, 2),
-            'chassis_type_name': chassis_type_name,
-            'client_name': client_name,
-            'created_at': quote.created_at.isoformat() if quote.created_at else None
-        })
-    
-    return jsonify(result)
+    return jsonify(recent_quotes(session.get('company_id'), session.get('role'), limit))
 
 @bp.route('/<int:quote_id>', methods=['GET'])
 @login_required
@@ -309,6 +224,9 @@ def get_quote(quote_id):
     try:
         details = json.loads(quote.details) if quote.details else {}
         accessories = json.loads(quote.accessories) if quote.accessories else {}
+        # Single-chassis quotes keep their original shape (quote columns only)
+        if is_multi_item(quote) and quote.items:
+            details['items'] = [item_payload(item) for item in quote.items]
         
         return jsonify({
             'id': quote.id,
@@ -344,6 +262,8 @@ def delete_quote(quote_id):
     
     try:
         db.session.delete(quote)
+        record_quote(quote, sign=-1)
+        bump_version(quote.company_id, scope='quotes')
         db.session.commit()
         return jsonify({'message': 'Quote deleted successfully'}), 200
     except Exception as e:
@@ -362,281 +282,55 @@ def generate_pdf(quote_id):
     if role != 'super_admin' and quote.company_id != company_id:
         return jsonify({'error': 'Access denied'}), 403
     
-    # Get company info from settings
-    company_settings = Setting.query.filter_by(section='company', company_id=quote.company_id).all()
-    company_info = {s.key: s.value for s in company_settings}
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=20*mm, leftMargin=20*mm, topMargin=15*mm, bottomMargin=20*mm)
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Header with new layout
-    breakdown = json.loads(quote.details)
-    
-    # Style for large quote number
-    quote_number_style = ParagraphStyle(
-        'QuoteNumber',
-        parent=styles['Normal'],
-        fontSize=22,
-        textColor=colors.HexColor('#1a5490'),
-        fontName='Helvetica-Bold',
-        leading=26
-    )
-    
-    # Company info (left side)
-    company_name = company_info.get('company_name', 'MENUISERIE ALUMINIUM')
-    company_address = company_info.get('company_address', '')
-    company_phone = company_info.get('company_phone', '')
-    company_email = company_info.get('company_email', '')
-    
-    company_text = f"<b>{company_name}</b><br/>"
-    if company_address:
-        company_text += f"{company_address}<br/>"
-    if company_phone:
-        company_text += f"Tél: {company_phone}<br/>"
-    if company_email:
-        company_text += f"Email: {company_email}"
-    
-    # Client info (right side)
-    client_name = breakdown.get('client_name', '')
-    client_email = breakdown.get('client_email', '')
-    client_phone = breakdown.get('client_phone', '')
-    
-    client_text = "<b>CLIENT</b><br/>"
-    if client_name:
-        client_text += f"{client_name}<br/>"
-    if client_phone:
-        client_text += f"Tél: {client_phone}<br/>"
-    if client_email:
-        client_text += f"Email: {client_email}"
-    
-    # Date and validity (right side, bottom aligned)
-    date_validity_style = ParagraphStyle(
-        'DateValidity',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_RIGHT
-    )
-    
-    date_validity_text = f"<b>Date:</b> {quote.quote_date}<br/><b>Validité:</b> 30 jours"
-    
-    # Build header as 2-row, 2-column table
-    # Row 1: Devis N° (left) | Date/Validité (right)
-    # Row 2: Info Entreprise (left) | Info Client (right)
+    document = quote_document(quote, company_header(quote.company_id))
+    key = document_key(document)
     
-    header_data = [
-        [
-            Paragraph(f"Devis N°: {quote.quote_number}", quote_number_style),
-            Paragraph(date_validity_text, date_validity_style)
-        ],
-        [
-            Paragraph(company_text, styles['Normal']),
-            Paragraph(client_text, styles['Normal'])
-        ]
-    ]
-    
-    header_table = Table(header_data, colWidths=[85*mm, 85*mm])
-    header_table.setStyle(TableStyle([
-        ('LEFTPADDING', (0, 0), (0, -1), 0),
-        ('RIGHTPADDING', (1, 0), (1, -1), 0),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONTSIZE', (0, 1), (0, 1), 9),
-        ('FONTSIZE', (1, 1), (1, 1), 9),
-        ('TOPPADDING', (0, 1), (-1, 1), 8),
-    ]))
-    
-    elements.append(header_table)
-    elements.append(Spacer(1, 10*mm))
-    
-    # Check if this is a multi-item quote
-    items = breakdown.get('items', [])
-    
-    if items:
-        # Multi-item quote
-        elements.append(Paragraph('Articles du devis', styles['Heading2']))
-        elements.append(Spacer(1, 5*mm))
-        
-        # Create summary table with all items
-        summary_data = [['#', 'Type', 'Dimensions', 'Qté', 'Prix (MAD)']]
-        
-        for idx, item in enumerate(items, 1):
-            item_type = item.get('chassisType', '')
-            dimensions = f"{item.get('width', 0)} × {item.get('height', 0)} mm"
-            item_breakdown = item.get('breakdown', {})
-            quantity = item.get('quantity', 1)
-            unit_price = item_breakdown.get('total_price', 0)
-            total_price = unit_price * quantity
-            price = f"{total_price:.2f}"
-            summary_data.append([str(idx), item_type, dimensions, str(quantity), price])
-        
-        summary_table = Table(summary_data, colWidths=[12*mm, 55*mm, 45*mm, 15*mm, 35*mm])
-        summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f0f0f0')),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        elements.append(summary_table)
-        elements.append(Spacer(1, 10*mm))
-        
-        # Detailed section for each item
-        for idx, item in enumerate(items, 1):
-            elements.append(Paragraph(f'Article {idx} - {item.get("chassisType", "")}', styles['Heading3']))
-            elements.append(Spacer(1, 3*mm))
-            
-            accessories_dict = item.get('accessories', {})
-            accessories_list = [f"{name} (Qté: {qty})" for name, qty in accessories_dict.items()]
-            accessories_text = ', '.join(accessories_list) if accessories_list else 'Aucun'
-            
-            item_breakdown = item.get('breakdown', {})
-            quantity = item.get('quantity', 1)
-            details_data = [
-                ['Type de châssis:', Paragraph(item.get('chassisType', ''), styles['Normal'])],
-                ['Dimensions:', f"{item.get('width', 0)} mm × {item.get('height', 0)} mm"],
-                ['Surface:', f"{item_breakdown.get('surface_m2', 0)} m²"],
-                ['Périmètre:', f"{item_breakdown.get('perimeter_m', 0)} m"],
-                ['Série de profilés:', Paragraph(item.get('profileSeries', ''), styles['Normal'])],
-                ['Type de vitrage:', Paragraph(item.get('glazingType', ''), styles['Normal'])],
-                ['Finition:', Paragraph(item.get('finish', ''), styles['Normal'])],
-                ['Accessoires:', Paragraph(accessories_text, styles['Normal'])],
-                ['Quantité:', str(quantity)]
-            ]
-            
-            details_table = Table(details_data, colWidths=[50*mm, 120*mm])
-            details_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ]))
-            elements.append(details_table)
-            elements.append(Spacer(1, 5*mm))
-            
-            # Price breakdown for this item
-            item_breakdown = item.get('breakdown', {})
-            unit_price = item_breakdown.get('total_price', 0)
-            total_item_price = unit_price * quantity
-            item_price_data = [
-                ['Prix de base', f"{item_breakdown.get('base_price', 0):.2f} MAD"],
-                ['Vitrage', f"{item_breakdown.get('glazing_cost', 0):.2f} MAD"],
-                ['Accessoires', f"{item_breakdown.get('accessories_cost', 0):.2f} MAD"],
-                ['Supplément finition', f"{item_breakdown.get('finish_supplement', 0):.2f} MAD"],
-                ['Prix unitaire', f"{unit_price:.2f} MAD"],
-                ['Quantité', f"× {quantity}"],
-                ['Total article', f"{total_item_price:.2f} MAD"]
-            ]
-            
-            item_price_table = Table(item_price_data, colWidths=[120*mm, 50*mm])
-            item_price_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e0e0e0')),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            elements.append(item_price_table)
-            elements.append(Spacer(1, 8*mm))
-        
-        # Global total
-        elements.append(Paragraph('Total du devis', styles['Heading2']))
-        elements.append(Spacer(1, 5*mm))
-        
-        total_price = sum(item.get('breakdown', {}).get('total_price', 0) * item.get('quantity', 1) for item in items)
-        total_data = [
-            ['TOTAL TTC', f"{total_price:.2f} MAD"]
-        ]
-        
-        total_table = Table(total_data, colWidths=[120*mm, 50*mm])
-        total_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#3B82F6')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ]))
-        elements.append(total_table)
-        
+    # The cache key is the ETag: a client holding this version needs no render at all
+    if request.if_none_match.contains(key):
+        response = current_app.response_class(status=304)
     else:
-        # Single-item quote (backwards compatibility)
-        elements.append(Paragraph('Détails du châssis', styles['Heading2']))
-        elements.append(Spacer(1, 5*mm))
-        
-        accessories_dict = json.loads(quote.accessories) if quote.accessories else {}
-        accessories_list = [f"{name} (Qté: {qty})" for name, qty in accessories_dict.items()]
-        accessories_text = ', '.join(accessories_list) if accessories_list else 'Aucun'
-        
-        details_data = [
-            ['Type de châssis:', Paragraph(quote.chassis_type, styles['Normal'])],
-            ['Dimensions:', f"{quote.width} mm × {quote.height} mm"],
-            ['Surface:', f"{breakdown['surface_m2']} m²"],
-            ['Périmètre:', f"{breakdown['perimeter_m']} m"],
-            ['Série de profilés:', Paragraph(quote.profile_series, styles['Normal'])],
-            ['Type de vitrage:', Paragraph(quote.glazing_type, styles['Normal'])],
-            ['Finition:', Paragraph(quote.finish, styles['Normal'])],
-            ['Accessoires:', Paragraph(accessories_text, styles['Normal'])]
-        ]
-        
-        details_table = Table(details_data, colWidths=[50*mm, 120*mm])
-        details_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ]))
-        elements.append(details_table)
-        elements.append(Spacer(1, 10*mm))
-        
-        elements.append(Paragraph('Détail du prix', styles['Heading2']))
-        elements.append(Spacer(1, 5*mm))
+        download_name = f'devis_{quote.quote_number}.pdf'
         
-        price_data = [
-            ['Description', 'Montant (MAD)'],
-            ['Prix de base', f"{breakdown.get('base_price', 0):.2f} MAD"],
-            ['Vitrage', f"{breakdown.get('glazing_cost', 0):.2f} MAD"],
-            ['Accessoires', f"{breakdown.get('accessories_cost', 0):.2f} MAD"],
-            ['Supplément finition', f"{breakdown.get('finish_supplement', 0):.2f} MAD"],
-            ['Total TTC', f"{breakdown.get('total_price', 0):.2f} MAD"]
-        ]
+        # Opt-in async mode: large quotes not yet cached render in a worker process
+        if (request.args.get('async') in ('1', 'true') and len(document['items']) > PDF_INLINE_MAX_ITEMS
+                and lookup(key) is None):
+            job = start_process_job('pdf', quote.company_id, session.get('user_id'),
+                                    render_job, document, key, download_name)
+            return jsonify(job.to_dict()), 202
         
-        price_table = Table(price_data, colWidths=[120*mm, 50*mm])
-        price_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f0f0f0')),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e0e0e0')),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        elements.append(price_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    
-    pdf_size = len(buffer.getvalue())
-    if pdf_size > 500000:
-        return jsonify({'error': f'PDF too large ({pdf_size/1000:.1f}KB > 500KB limit)'}), 507
-    
-    return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name=f'devis_{quote.quote_number}.pdf')
+        try:
+            _, path = quote_pdf(document, key)
+            response = send_file(os.path.abspath(path), mimetype='application/pdf', as_attachment=True,
+                                 download_name=download_name, etag=key, conditional=True)
+        except PdfTooLargeError as e:
+            return jsonify({'error': str(e)}), 507
+        except FileNotFoundError:
+            # Evicted by another worker between lookup and send
+            response = send_file(io.BytesIO(render_checked(document)), mimetype='application/pdf',
+                                 as_attachment=True, download_name=download_name)
+    
+    response.set_etag(key)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/export/pdf-zip', methods=['POST'])
+@login_required
+def export_pdf_zip():
+    """PDFs of every quote matching the filter, streamed as one ZIP"""
+    from flask import session
+    data = request.json or {}
+    
+    try:
+        quote_ids = export_quote_ids(session.get('company_id'), session.get('role'), data)
+    except ExportFilterError as e:
+        return jsonify({'error': str(e)}), 400
+    if not quote_ids:
+        return jsonify({'error': 'No quotes match the filter'}), 404
+    
+    period = '_'.join(filter(None, (data.get('date_from'), data.get('date_to'))))
+    filename = f'devis_{period}.zip' if period else 'devis.zip'
+    return current_app.response_class(
+        stream_with_context(stream_pdf_zip(quote_ids)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
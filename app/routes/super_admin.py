@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify, session
-from app.models import Company, User, Quote, Settings, AppSettings, ActivityLog, ChassisType, ProfileSeries, GlazingType, Finish, Accessory
+from app.models import Company, User, QuoteDailyRollup, Settings, AppSettings, ActivityLog
 from app import db
 from app.routes.auth import super_admin_required, login_required
 from datetime import datetime
@@ -7,73 +7,9 @@ from werkzeug.security import generate_password_hash
 from app.crypto_utils import encrypt_data, decrypt_data
 from app.services.backup import BackupService
 from app.services.updater import UpdateService
-
-def copy_catalog_to_company(company_id):
-    """Copy template catalog (company_id=NULL) to a new company"""
-    try:
-        # Copy chassis types
-        template_chassis = ChassisType.query.filter_by(company_id=None).all()
-        for chassis in template_chassis:
-            new_chassis = ChassisType(
-                company_id=company_id,
-                name=chassis.name,
-                description=chassis.description,
-                min_width=chassis.min_width,
-                max_width=chassis.max_width,
-                min_height=chassis.min_height,
-                max_height=chassis.max_height
-            )
-            db.session.add(new_chassis)
-        
-        # Copy profile series
-        template_profiles = ProfileSeries.query.filter_by(company_id=None).all()
-        for profile in template_profiles:
-            new_profile = ProfileSeries(
-                company_id=company_id,
-                name=profile.name,
-                description=profile.description,
-                price_per_meter=profile.price_per_meter
-            )
-            db.session.add(new_profile)
-        
-        # Copy glazing types
-        template_glazing = GlazingType.query.filter_by(company_id=None).all()
-        for glazing in template_glazing:
-            new_glazing = GlazingType(
-                company_id=company_id,
-                name=glazing.name,
-                description=glazing.description,
-                thickness_mm=glazing.thickness_mm,
-                price_per_m2=glazing.price_per_m2
-            )
-            db.session.add(new_glazing)
-        
-        # Copy finishes
-        template_finishes = Finish.query.filter_by(company_id=None).all()
-        for finish in template_finishes:
-            new_finish = Finish(
-                company_id=company_id,
-                name=finish.name,
-                description=finish.description,
-                price_coefficient=finish.price_coefficient
-            )
-            db.session.add(new_finish)
-        
-        # Copy accessories
-        template_accessories = Accessory.query.filter_by(company_id=None).all()
-        for accessory in template_accessories:
-            new_accessory = Accessory(
-                company_id=company_id,
-                name=accessory.name,
-                unit_price=accessory.unit_price,
-                incompatible_series=accessory.incompatible_series
-            )
-            db.session.add(new_accessory)
-        
-        return True
-    except Exception as e:
-        print(f"Error copying catalog: {e}")
-        return False
+from app.services.pricing import pricing_cache
+from app.services.cache import TTLCache
+import os
 
 def log_activity(action, description=None):
     try:
@@ -95,26 +31,79 @@ def log_activity(action, description=None):
 
 bp = Blueprint('super_admin', __name__, url_prefix='/api/super-admin')
 
+STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', '10'))
+
+platform_stats_cache = TTLCache(STATS_CACHE_TTL)
+
+COMPANIES_PAGE_SIZE = 50
+MAX_COMPANIES_PAGE_SIZE = 200
+
+def _encode_company_cursor(company):
+    return f"{company.created_at.isoformat()},{company.id}"
+
+def _decode_company_cursor(cursor):
+    created_at, company_id = cursor.rsplit(',', 1)
+    return datetime.fromisoformat(created_at), int(company_id)
+
 @bp.route('/companies', methods=['GET'])
 @super_admin_required
 def get_companies():
-    companies = Company.query.order_by(Company.created_at.desc()).all()
+    limit = min(max(request.args.get('limit', COMPANIES_PAGE_SIZE, type=int), 1), MAX_COMPANIES_PAGE_SIZE)
+    status = request.args.get('status')
+    search = (request.args.get('q') or '').strip()
+    cursor = request.args.get('cursor')
+    
+    # Per-company counts as correlated subqueries: evaluated only for the rows of the page
+    admin_count = db.select(db.func.count(User.id)).where(
+        User.company_id == Company.id, User.role == 'admin'
+    ).scalar_subquery()
+    user_count = db.select(db.func.count(User.id)).where(
+        User.company_id == Company.id, User.role == 'user'
+    ).scalar_subquery()
+    quote_count = db.select(
+        db.func.coalesce(db.func.sum(QuoteDailyRollup.quote_count), 0)
+    ).where(QuoteDailyRollup.company_key == Company.id).scalar_subquery()
+    
+    query = db.session.query(
+        Company,
+        admin_count.label('admin_count'),
+        user_count.label('user_count'),
+        quote_count.label('quote_count')
+    )
+    
+    if status and status != 'all':
+        query = query.filter(Company.status == status)
+    if search:
+        # % and _ typed by the user are literal characters, not wildcards
+        pattern = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(Company.name.ilike(f'%{pattern}%', escape='\\'))
+    if cursor:
+        try:
+            created_at, company_id = _decode_company_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(db.or_(
+            Company.created_at < created_at,
+            db.and_(Company.created_at == created_at, Company.id < company_id)
+        ))
+    
+    rows = query.order_by(Company.created_at.desc(), Company.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
     companies_data = []
-    for company in companies:
+    for company, admins, users, quotes in rows:
         company_dict = company.to_dict()
-        
-        admin_count = User.query.filter_by(company_id=company.id, role='admin').count()
-        user_count = User.query.filter_by(company_id=company.id, role='user').count()
-        quote_count = Quote.query.filter_by(company_id=company.id).count()
-        
-        company_dict['admin_count'] = admin_count
-        company_dict['user_count'] = user_count
-        company_dict['quote_count'] = quote_count
-        
+        company_dict['admin_count'] = admins
+        company_dict['user_count'] = users
+        company_dict['quote_count'] = quotes
         companies_data.append(company_dict)
     
-    return jsonify(companies_data)
+    return jsonify({
+        'companies': companies_data,
+        'next_cursor': _encode_company_cursor(rows[-1][0]) if has_more else None,
+        'has_more': has_more
+    })
 
 @bp.route('/companies/<int:company_id>/approve', methods=['POST'])
 @super_admin_required
@@ -173,38 +162,53 @@ def deactivate_company(company_id):
     
     return jsonify({'success': True, 'company': company.to_dict()})
 
-@bp.route('/stats', methods=['GET'])
-@super_admin_required
-def get_stats():
-    from datetime import datetime, timedelta
-    
-    total_companies = Company.query.count()
-    active_companies = Company.query.filter_by(status='approved').count()
-    pending_companies = Company.query.filter_by(status='pending').count()
-    suspended_companies = Company.query.filter_by(status='suspended').count()
-    
-    total_users = User.query.filter(User.role != 'super_admin').count()
-    total_admins = User.query.filter_by(role='admin').count()
-    
-    total_quotes = Quote.query.count()
-    total_amount = db.session.query(db.func.sum(Quote.price_ttc)).scalar() or 0
+def _compute_platform_stats():
+    from datetime import timedelta
     
     now = datetime.now()
     current_month = now.strftime('%Y-%m')
-    month_quotes = Quote.query.filter(Quote.quote_date.like(f'{current_month}%')).count()
-    
-    month_quotes_list = Quote.query.filter(Quote.quote_date.like(f'{current_month}%')).all()
-    month_amount = sum(q.price_ttc for q in month_quotes_list)
-    
     week_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
-    week_quotes = Quote.query.filter(Quote.quote_date >= week_start).count()
     
-    week_quotes_list = Quote.query.filter(Quote.quote_date >= week_start).all()
-    week_amount = sum(q.price_ttc for q in week_quotes_list)
+    def count_if(condition):
+        return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+    
+    def sum_if(condition, column):
+        return db.func.coalesce(db.func.sum(db.case((condition, column), else_=0)), 0)
+    
+    companies = db.select(
+        db.func.count(Company.id).label('total'),
+        count_if(Company.status == 'approved').label('active'),
+        count_if(Company.status == 'pending').label('pending'),
+        count_if(Company.status == 'suspended').label('suspended')
+    ).subquery()
+    
+    users = db.select(
+        count_if(User.role != 'super_admin').label('total'),
+        count_if(User.role == 'admin').label('admins')
+    ).subquery()
+    
+    in_month = QuoteDailyRollup.day.between(f'{current_month}-01', f'{current_month}-31')
+    in_week = QuoteDailyRollup.day >= week_start
+    quotes = db.select(
+        db.func.coalesce(db.func.sum(QuoteDailyRollup.quote_count), 0).label('total'),
+        db.func.coalesce(db.func.sum(QuoteDailyRollup.total_ttc), 0).label('amount'),
+        sum_if(in_month, QuoteDailyRollup.quote_count).label('month'),
+        sum_if(in_month, QuoteDailyRollup.total_ttc).label('month_amount'),
+        sum_if(in_week, QuoteDailyRollup.quote_count).label('week'),
+        sum_if(in_week, QuoteDailyRollup.total_ttc).label('week_amount')
+    ).subquery()
+    
+    # One round trip: three single-row aggregates cross-joined
+    row = db.session.execute(db.select(companies, users, quotes).select_from(
+        companies.join(users, db.true()).join(quotes, db.true())
+    )).one()
+    (total_companies, active_companies, pending_companies, suspended_companies,
+     total_users, total_admins,
+     total_quotes, total_amount, month_quotes, month_amount, week_quotes, week_amount) = row
     
     avg_quote_amount = total_amount / total_quotes if total_quotes > 0 else 0
     
-    return jsonify({
+    return {
         'total_companies': total_companies,
         'active_companies': active_companies,
         'pending_companies': pending_companies,
@@ -218,7 +222,27 @@ def get_stats():
         'week_quotes': week_quotes,
         'week_amount': round(week_amount, 2),
         'avg_quote_amount': round(avg_quote_amount, 2)
-    })
+    }
+
+@bp.route('/stats', methods=['GET'])
+@super_admin_required
+def get_stats():
+    # Concurrent admin tabs share one computation per STATS_CACHE_TTL window
+    return jsonify(platform_stats_cache.get_or_compute('platform', _compute_platform_stats))
+
+@bp.route('/pricing-cache', methods=['GET'])
+@super_admin_required
+def get_pricing_cache_stats():
+    return jsonify(pricing_cache.stats())
+
+@bp.route('/pricing-cache/clear', methods=['POST'])
+@super_admin_required
+def clear_pricing_cache():
+    pricing_cache.clear()
+    
+    log_activity('pricing_cache_cleared', 'Cleared pricing result cache')
+    
+    return jsonify({'success': True})
 
 @bp.route('/companies/create', methods=['POST'])
 @super_admin_required
@@ -271,9 +295,8 @@ def create_company_with_admin():
         admin.is_active = True
         db.session.add(admin)
         
-        # Copy template catalog to the new company
-        if not copy_catalog_to_company(company.id):
-            raise Exception("Failed to copy catalog template")
+        # No catalog copy: the company reads the template catalog and only
+        # stores the rows it overrides (catalog_inherits defaults to True)
         
         db.session.commit()
         
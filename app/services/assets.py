@@ -0,0 +1,102 @@
+import hashlib
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory, url_for
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Pre-compressed siblings written by build_css.py, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_manifest = {'mtime': None, 'assets': {}}
+_content_hashes = {}
+
+
+def _source_mtime(sources):
+    mtimes = [os.path.getmtime(os.path.join(STATIC_DIR, source))
+              for source in sources if os.path.exists(os.path.join(STATIC_DIR, source))]
+    return max(mtimes, default=0)
+
+
+def load_manifest():
+    """Manifeste du dernier build (nom logique -> fichier haché)
+
+    Relu quand le fichier change. Une entrée dont une source est plus récente
+    que le build (mise à jour git sans rebuild) est ignorée : asset_url
+    retombe alors sur le fichier source.
+    """
+    try:
+        mtime = os.path.getmtime(MANIFEST_PATH)
+    except OSError:
+        _manifest.update(mtime=None, assets={})
+        return _manifest['assets']
+
+    if mtime != _manifest['mtime']:
+        with open(MANIFEST_PATH, encoding='utf-8') as f:
+            data = json.load(f)
+        assets = {}
+        for name, entry in data.get('assets', {}).items():
+            if _source_mtime(entry.get('sources', [name])) <= mtime:
+                assets[name] = entry['file']
+        _manifest.update(mtime=mtime, assets=assets)
+    return _manifest['assets']
+
+
+def _content_hash(name):
+    path = os.path.join(STATIC_DIR, name)
+    mtime = os.path.getmtime(path)
+    cached = _content_hashes.get(name)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, hashlib.sha256(f.read()).hexdigest()[:10])
+        _content_hashes[name] = cached
+    return cached[1]
+
+
+def asset_url(name):
+    """URL fingerprintée d'un asset statique ('js/app.js', 'css/styles.css')
+
+    Fichier haché du manifeste si le build est à jour, sinon le fichier
+    source avec ?v=<hash du contenu> : l'URL change dès que le contenu change,
+    ce qui permet le cache immuable dans les deux cas.
+    """
+    built = load_manifest().get(name)
+    if built:
+        return url_for('dist_asset', filename=built)
+    try:
+        return url_for('static', filename=name, v=_content_hash(name))
+    except OSError:
+        return url_for('static', filename=name)
+
+
+def send_dist_asset(filename):
+    """Sert un fichier de static/dist, en .br ou .gz pré-compressé si le
+    client l'accepte et que le build l'a produit"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def send_service_worker():
+    """Service worker généré par le build (liste de pré-cache issue du
+    manifeste), ou le fichier source en l'absence de build"""
+    directory = DIST_DIR if os.path.isfile(os.path.join(DIST_DIR, 'sw.js')) else STATIC_DIR
+    return send_from_directory(directory, 'sw.js', mimetype='application/javascript')
+
+
+def init_assets(app):
+    app.add_url_rule('/static/dist/<path:filename>', 'dist_asset', send_dist_asset)
+    app.add_url_rule('/sw.js', 'service_worker', send_service_worker)
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -0,0 +1,351 @@
+import csv
+import io
+import itertools
+import os
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+from app import db
+from app.services.catalog_overlay import MAX_BULK_ROWS, bulk_apply, inherits_template, value_columns
+from app.services.zip_stream import ChunkSink
+
+IMPORT_CHUNK_SIZE = min(int(os.environ.get('CATALOG_IMPORT_CHUNK_SIZE', '1000')), MAX_BULK_ROWS)
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 200
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+_SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+# Characters XML 1.0 cannot carry, even escaped
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class ImportFormatError(ValueError):
+    """Fichier d'import illisible ou en-têtes invalides (renvoyée en 400)"""
+
+
+def detect_format(filename, requested=None):
+    """'csv' ou 'xlsx' d'après le paramètre format ou l'extension, sinon None"""
+    fmt = (requested or os.path.splitext(filename or '')[1].lstrip('.')).lower()
+    return fmt if fmt in FORMATS else None
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _visible_select(model, company_id):
+    """SELECT des colonnes métier du catalogue vu par l'entreprise, trié par nom
+
+    Même surcouche que catalog_rows, mais calculée en SQL pour pouvoir être
+    lue par lots sans charger tout le catalogue.
+    """
+    table = model.__table__
+    columns = [table.c[name] for name in value_columns(model)]
+    if company_id is None:
+        return db.select(*columns).where(table.c.company_id.is_(None)).order_by(table.c.name)
+
+    own = db.select(*columns).where(table.c.company_id == company_id, table.c.is_hidden.is_(False))
+    if not inherits_template(company_id):
+        return own.order_by(table.c.name)
+
+    # Two NOT EXISTS rather than one with OR, so each probe uses an index
+    override = table.alias('override')
+    overridden = db.select(override.c.id).where(
+        override.c.company_id == company_id, override.c.template_id == table.c.id).exists()
+    renamed = db.select(override.c.id).where(
+        override.c.company_id == company_id, override.c.name == table.c.name).exists()
+    inherited = db.select(*columns).where(table.c.company_id.is_(None), ~overridden, ~renamed)
+    merged = db.union_all(own, inherited).subquery()
+    return db.select(merged).order_by(merged.c.name)
+
+
+def _batches(model, company_id):
+    result = db.session.execute(_visible_select(model, company_id),
+                                execution_options={'yield_per': EXPORT_BATCH_SIZE})
+    return result.partitions()
+
+
+def export_csv(model, company_id):
+    """Générateur du catalogue en CSV (UTF-8 avec BOM pour Excel), un lot à la fois"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(value_columns(model))
+    yield buffer.getvalue().encode('utf-8')
+
+    for rows in _batches(model, company_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value!r}</v></c>'
+    text = escape(_XML_INVALID.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def _xlsx_parts(sheet_name):
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/worksheet"/>'
+            '</Relationships>'),
+    }
+
+
+def export_xlsx(model, company_id):
+    """Générateur du catalogue en XLSX : la feuille est écrite et compressée
+    un lot à la fois dans une archive zip diffusée au fil de l'eau"""
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _xlsx_parts(model.__tablename__).items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                         + _xlsx_row(value_columns(model))).encode('utf-8'))
+            yield sink.drain()
+            for rows in _batches(model, company_id):
+                sheet.write(''.join(_xlsx_row(row) for row in rows).encode('utf-8'))
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def export_catalog(model, company_id, fmt):
+    return export_xlsx(model, company_id) if fmt == 'xlsx' else export_csv(model, company_id)
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def _csv_rows(stream):
+    """(ligne, cellules) d'un CSV UTF-8, séparateur ',' ou ';' (Excel FR)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    header = text.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    reader = csv.reader(itertools.chain([header], text), delimiter=delimiter)
+    for cells in reader:
+        yield reader.line_num, cells
+
+
+def _column_index(reference):
+    letters = re.match(r'[A-Z]+', reference or '')
+    if not letters:
+        return None
+    index = 0
+    for letter in letters.group():
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _first_sheet_path(archive):
+    try:
+        with archive.open('xl/workbook.xml') as workbook:
+            sheet = next(element for _, element in iterparse(workbook) if element.tag == _SHEET_NS + 'sheet')
+        relation_id = sheet.get(_REL_NS + 'id')
+        with archive.open('xl/_rels/workbook.xml.rels') as rels:
+            for _, element in iterparse(rels):
+                if element.tag == _PKG_REL_NS + 'Relationship' and element.get('Id') == relation_id:
+                    target = element.get('Target')
+                    return target.lstrip('/') if target.startswith('/') else 'xl/' + target
+    except (KeyError, StopIteration):
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _xlsx_rows(stream):
+    """(ligne, cellules) de la première feuille d'un XLSX, lue en flux
+
+    Seule la table des chaînes partagées est gardée en mémoire ; chaque
+    ligne de la feuille est libérée dès qu'elle a été lue.
+    """
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise ImportFormatError('File is not a valid XLSX workbook')
+
+    shared = []
+    if 'xl/sharedStrings.xml' in archive.namelist():
+        with archive.open('xl/sharedStrings.xml') as strings:
+            for _, element in iterparse(strings):
+                if element.tag == _SHEET_NS + 'si':
+                    shared.append(''.join(text.text or '' for text in element.iter(_SHEET_NS + 't')))
+                    element.clear()
+
+    try:
+        sheet = archive.open(_first_sheet_path(archive))
+    except KeyError:
+        raise ImportFormatError('XLSX workbook has no worksheet')
+
+    with sheet:
+        sheet_data = None
+        line = 0
+        for event, element in iterparse(sheet, events=('start', 'end')):
+            if event == 'start':
+                if element.tag == _SHEET_NS + 'sheetData':
+                    sheet_data = element
+                continue
+            if element.tag != _SHEET_NS + 'row':
+                continue
+
+            line = int(element.get('r') or line + 1)
+            cells = []
+            for position, cell in enumerate(element.iter(_SHEET_NS + 'c')):
+                index = _column_index(cell.get('r'))
+                index = position if index is None else index
+                kind = cell.get('t')
+                value = cell.find(_SHEET_NS + 'v')
+                if kind == 'inlineStr':
+                    text = ''.join(part.text or '' for part in cell.iter(_SHEET_NS + 't'))
+                elif value is None:
+                    text = None
+                elif kind == 's':
+                    text = shared[int(value.text)]
+                else:
+                    text = value.text
+                cells.extend([None] * (index + 1 - len(cells)))
+                cells[index] = text
+            yield line, cells
+
+            element.clear()
+            if sheet_data is not None:
+                sheet_data.clear()
+
+
+_SKIP = object()
+
+
+def _convert(column, raw):
+    """Valeur d'une cellule pour la colonne ; cellule vide = champ non fourni"""
+    if raw is None or (isinstance(raw, str) and not raw.strip()):
+        return _SKIP
+    raw = raw.strip()
+    python_type = column.type.python_type
+    if python_type in (int, float):
+        # French spreadsheets: '1 234,50'
+        number = float(re.sub(r'[\s\xa0\u202f]', '', raw).replace(',', '.'))
+        if python_type is int:
+            if number != int(number):
+                raise ValueError(f"'{column.name}' must be an integer")
+            return int(number)
+        return number
+    return raw
+
+
+def import_catalog(model, company_id, stream, fmt):
+    """Importe un fichier CSV/XLSX en upserts keyés par nom
+
+    Le fichier est lu ligne à ligne et écrit par lots de IMPORT_CHUNK_SIZE
+    via bulk_apply, dans la transaction courante (l'appelant incrémente la
+    version et valide). Les lignes invalides sont écartées et rapportées
+    avec leur numéro. Retourne (compteurs par statut, erreurs).
+    """
+    rows = _xlsx_rows(stream) if fmt == 'xlsx' else _csv_rows(stream)
+    table_columns = model.__table__.columns
+    summary, errors = {}, []
+
+    def report(line, name, error):
+        summary['error'] = summary.get('error', 0) + 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line, 'name': name, 'error': error})
+
+    try:
+        _, header = next(rows, (None, None))
+        if not header:
+            raise ImportFormatError('File is empty')
+        header = [(cell or '').strip().lower() for cell in header]
+        allowed = set(value_columns(model))
+        unknown = [name for name in header if name and name not in allowed]
+        if 'name' not in header or unknown:
+            raise ImportFormatError(f"Columns must include 'name' and be among: {', '.join(value_columns(model))}"
+                                    + (f" (unknown: {', '.join(unknown)})" if unknown else ''))
+
+        chunk, lines, seen = [], [], set()
+
+        def flush():
+            results, _ = bulk_apply(model, company_id, chunk, [], partial=True)
+            for line, result in zip(lines, results):
+                if result['status'] == 'error':
+                    report(line, result['name'], result['error'])
+                else:
+                    summary[result['status']] = summary.get(result['status'], 0) + 1
+            # Rows read by bulk_apply are not needed anymore
+            db.session.expunge_all()
+            chunk.clear()
+            lines.clear()
+
+        for line, cells in rows:
+            if not any(cell and str(cell).strip() for cell in cells):
+                continue
+            record = {}
+            try:
+                for name, raw in zip(header, cells):
+                    if name:
+                        value = _convert(table_columns[name], raw)
+                        if value is not _SKIP:
+                            record[name] = value
+            except ValueError as e:
+                message = str(e) if str(e).startswith("'") else f"'{name}' must be a number"
+                report(line, record.get('name') or None, message)
+                continue
+
+            name = record.get('name')
+            if name in seen:
+                report(line, name, 'Name appears more than once in the file')
+                continue
+            if name is not None:
+                seen.add(name)
+            chunk.append(record)
+            lines.append(line)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush()
+        if chunk:
+            flush()
+    except UnicodeDecodeError:
+        raise ImportFormatError('CSV file must be UTF-8 encoded')
+    except csv.Error as e:
+        raise ImportFormatError(f'Invalid CSV: {e}')
+
+    return summary, errors
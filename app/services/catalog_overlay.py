@@ -0,0 +1,348 @@
+import os
+from app import db
+from app.models import ChassisType, ProfileSeries, GlazingType, Finish, Accessory, Company
+from app.services.cache import LRUCache
+from app.services.versions import TEMPLATE_KEY, bump_version, company_key, get_versions
+
+CATALOG_MODELS = {
+    'chassis-types': ChassisType,
+    'profile-series': ProfileSeries,
+    'glazing-types': GlazingType,
+    'finishes': Finish,
+    'accessories': Accessory,
+}
+
+# Columns a client can never set directly
+PROTECTED_COLUMNS = ('id', 'company_id', 'template_id', 'is_hidden')
+
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', '1024'))
+
+catalog_cache = LRUCache(CATALOG_CACHE_SIZE)
+
+MAX_BULK_ROWS = 1000
+
+
+class BulkError(ValueError):
+    """Requête bulk invalide dans son ensemble (renvoyée en 400)"""
+
+
+def value_columns(model):
+    """Colonnes métier d'une table du catalogue (copiées lors d'une surcharge)"""
+    return [column.name for column in model.__table__.columns if column.name not in PROTECTED_COLUMNS]
+
+
+def inherits_template(company_id):
+    """L'entreprise lit-elle le catalogue modèle à travers ses surcharges ?"""
+    if company_id is None:
+        return False
+    return bool(db.session.query(Company.catalog_inherits).filter_by(id=company_id).scalar())
+
+
+def _visible_rows(model, company_id):
+    if company_id is None:
+        return model.query.filter(model.company_id.is_(None)).order_by(model.id).all()
+    if not inherits_template(company_id):
+        return model.query.filter_by(company_id=company_id, is_hidden=False).order_by(model.id).all()
+
+    rows = model.query.filter(db.or_(model.company_id.is_(None), model.company_id == company_id)).all()
+    own = [row for row in rows if row.company_id == company_id]
+    shadowed_ids = {row.template_id for row in own if row.template_id}
+    shadowed_names = {row.name for row in own}
+
+    visible = [row for row in rows if row.company_id is None
+               and row.id not in shadowed_ids and row.name not in shadowed_names]
+    visible += [row for row in own if not row.is_hidden]
+    # An override takes the place of the template row it replaces
+    return sorted(visible, key=lambda row: (row.template_id or row.id, row.id))
+
+
+def catalog_rows(model, company_id, versions=None):
+    """Catalogue vu par l'entreprise : lignes modèles non surchargées + ses
+    propres lignes, sous forme de dicts to_dict() (à ne pas modifier)
+
+    Mis en cache par version du catalogue de l'entreprise et du modèle :
+    une écriture de l'un ou de l'autre change la clé.
+    """
+    key = company_key(company_id)
+    if versions is None:
+        versions = get_versions([key, TEMPLATE_KEY])
+    cache_key = (model.__tablename__, key,
+                 versions.get((key, 'catalog'), 0),
+                 versions.get((TEMPLATE_KEY, 'catalog'), 0))
+
+    rows = catalog_cache.get(cache_key)
+    if rows is None:
+        rows = [row.to_dict() for row in _visible_rows(model, company_id)]
+        catalog_cache.set(cache_key, rows)
+    return rows
+
+
+def find_entry(model, entry_id, company_id):
+    """Ligne visible par l'entreprise : la sienne ou une ligne modèle héritée"""
+    entry = db.session.get(model, entry_id)
+    if entry is None:
+        return None
+    if entry.company_id == company_id:
+        return entry
+    if entry.company_id is None and inherits_template(company_id):
+        return entry
+    return None
+
+
+def _materialize(model, template, company_id):
+    """Copie-sur-écriture : surcharge existante de la ligne modèle, ou nouvelle copie"""
+    override = model.query.filter(
+        model.company_id == company_id,
+        db.or_(model.template_id == template.id, model.name == template.name)
+    ).first()
+    if override is None:
+        override = model(company_id=company_id, template_id=template.id,
+                         **{column: getattr(template, column) for column in value_columns(model)})
+        db.session.add(override)
+    return override
+
+
+def create_entry(model, company_id, data):
+    """Ajoute une ligne au catalogue de l'entreprise
+
+    Un nom déjà masqué est réactivé ; un nom présent dans le modèle devient
+    une surcharge de cette ligne.
+    """
+    values = {key: value for key, value in data.items() if key not in PROTECTED_COLUMNS}
+    entry = None
+    if company_id is not None:
+        entry = model.query.filter_by(company_id=company_id, name=values.get('name'), is_hidden=True).first()
+
+    if entry is None:
+        entry = model(company_id=company_id, **values)
+        if inherits_template(company_id):
+            entry.template_id = db.session.query(model.id).filter_by(
+                company_id=None, name=values.get('name')).scalar()
+        db.session.add(entry)
+    else:
+        for key, value in values.items():
+            setattr(entry, key, value)
+        entry.is_hidden = False
+    return entry
+
+
+def update_entry(model, entry, company_id, data):
+    """Modifie une ligne ; une ligne modèle est d'abord copiée pour l'entreprise"""
+    if entry.company_id is None and company_id is not None:
+        entry = _materialize(model, entry, company_id)
+    for key, value in data.items():
+        if key not in PROTECTED_COLUMNS:
+            setattr(entry, key, value)
+    return entry
+
+
+def delete_entry(model, entry, company_id):
+    """Supprime une ligne du catalogue de l'entreprise
+
+    Une ligne héritée ou surchargée est masquée (la ligne modèle reste pour
+    les autres entreprises). Supprimer une ligne modèle détache ses
+    surcharges et efface ses masques.
+    """
+    if company_id is not None and (entry.company_id is None or entry.template_id is not None):
+        if entry.company_id is None:
+            entry = _materialize(model, entry, company_id)
+        entry.is_hidden = True
+        return
+
+    if entry.company_id is None:
+        model.query.filter(model.template_id == entry.id, model.is_hidden.is_(True)).delete(synchronize_session=False)
+        model.query.filter(model.template_id == entry.id).update({'template_id': None}, synchronize_session=False)
+    db.session.delete(entry)
+
+
+def compact_company_catalog(company):
+    """Convertit une entreprise à catalogue copié en surcouche du modèle
+
+    Les copies identiques à leur ligne modèle sont supprimées, les copies
+    modifiées deviennent des surcharges et les lignes modèles que
+    l'entreprise avait supprimées sont masquées. Retourne (supprimées, masquées).
+    """
+    removed = hidden = 0
+    for model in CATALOG_MODELS.values():
+        columns = value_columns(model)
+        templates = {row.name: row for row in model.query.filter_by(company_id=None)}
+        own = {row.name: row for row in model.query.filter_by(company_id=company.id)}
+
+        for name, row in own.items():
+            template = templates.get(name)
+            if template is None:
+                continue
+            if not row.is_hidden and all(getattr(row, column) == getattr(template, column) for column in columns):
+                db.session.delete(row)
+                removed += 1
+            else:
+                row.template_id = template.id
+
+        for name, template in templates.items():
+            if name not in own:
+                db.session.add(model(company_id=company.id, template_id=template.id, is_hidden=True,
+                                     **{column: getattr(template, column) for column in columns}))
+                hidden += 1
+
+    company.catalog_inherits = True
+    bump_version(company.id)
+    return removed, hidden
+
+
+def _value_error(model, values, creating):
+    """Message d'erreur pour des valeurs de ligne invalides, ou None"""
+    columns = model.__table__.columns
+    for key, value in values.items():
+        if key in PROTECTED_COLUMNS or key not in columns:
+            return f"Unknown field '{key}'"
+        column = columns[key]
+        if value is None:
+            if not column.nullable:
+                return f"'{key}' is required"
+            continue
+        expected = column.type.python_type
+        if expected in (int, float):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return f"'{key}' must be a number"
+            if expected is int and value != int(value):
+                return f"'{key}' must be an integer"
+        elif not isinstance(value, str):
+            return f"'{key}' must be a string"
+
+    if creating:
+        missing = [column.name for column in columns
+                   if column.name not in PROTECTED_COLUMNS and column.name not in values
+                   and not column.nullable and column.default is None and column.server_default is None]
+        if missing:
+            return f"Missing field(s): {', '.join(missing)}"
+    return None
+
+
+def bulk_apply(model, company_id, upserts, deletes, partial=False):
+    """Applique des upserts et suppressions keyés par nom, en SQL ensembliste
+
+    Une seule requête lit les lignes concernées (de l'entreprise et du
+    modèle) ; les écritures sont un INSERT multi-lignes, un UPDATE groupé par
+    clé primaire et un UPDATE/DELETE par liste d'ids. Par défaut rien n'est
+    écrit si une ligne est invalide ; avec partial=True les lignes invalides
+    sont seulement écartées. Retourne (résultats par ligne, True si appliqué) ;
+    l'appelant incrémente la version et valide la transaction.
+    """
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        raise BulkError("'upserts' and 'deletes' must be arrays")
+    if len(upserts) + len(deletes) > MAX_BULK_ROWS:
+        raise BulkError(f'At most {MAX_BULK_ROWS} rows per request')
+
+    names = [row.get('name') if isinstance(row, dict) else None for row in upserts] + list(deletes)
+    lookup = {name for name in names if isinstance(name, str) and name}
+    owner = model.company_id.is_(None) if company_id is None else model.company_id == company_id
+    if inherits_template(company_id):
+        owner = db.or_(owner, model.company_id.is_(None))
+    rows = model.query.filter(owner, model.name.in_(lookup)).all() if lookup else []
+    own = {row.name: row for row in rows if row.company_id == company_id}
+    templates = {row.name: row for row in rows if row.company_id is None and company_id is not None}
+
+    columns = value_columns(model)
+    name_length = model.__table__.c.name.type.length
+    results, inserts, updates, hide_ids, delete_ids = [], [], [], [], []
+    seen = set()
+
+    def check_name(name):
+        if not isinstance(name, str) or not name.strip():
+            return "'name' must be a non-empty string"
+        if name_length and len(name) > name_length:
+            return f"'name' is longer than {name_length} characters"
+        if name in seen:
+            return 'Name appears more than once in the request'
+        return None
+
+    for row in upserts:
+        name = row.get('name') if isinstance(row, dict) else None
+        result = {'name': name, 'action': 'upsert'}
+        results.append(result)
+        error = 'Row must be an object' if not isinstance(row, dict) else check_name(name)
+        if isinstance(name, str):
+            seen.add(name)
+        if error:
+            result.update(status='error', error=error)
+            continue
+
+        values = {key: value for key, value in row.items() if key != 'name'}
+        existing = own.get(name)
+        template = templates.get(name)
+        if existing is not None:
+            op, status = {'id': existing.id, 'is_hidden': False, **values}, 'created' if existing.is_hidden else 'updated'
+            error = _value_error(model, values, creating=False)
+        elif template is not None:
+            # Copy-on-write override of the inherited template row
+            values = {**{column: getattr(template, column) for column in columns}, **values}
+            op, status = {'company_id': company_id, 'template_id': template.id, 'is_hidden': False, **values}, 'updated'
+            error = _value_error(model, values, creating=True)
+        else:
+            values['name'] = name
+            op, status = {'company_id': company_id, 'template_id': None, 'is_hidden': False, **values}, 'created'
+            error = _value_error(model, values, creating=True)
+
+        if error:
+            result.update(status='error', error=error)
+        elif existing is not None:
+            result.update(status=status, id=existing.id)
+            updates.append(op)
+        else:
+            result.update(status=status)
+            inserts.append(op)
+
+    for name in deletes:
+        result = {'name': name, 'action': 'delete'}
+        results.append(result)
+        error = check_name(name)
+        if isinstance(name, str):
+            seen.add(name)
+        if error:
+            result.update(status='error', error=error)
+            continue
+
+        existing = own.get(name)
+        template = templates.get(name)
+        if existing is not None and not existing.is_hidden:
+            result.update(status='deleted', id=existing.id)
+            if template is not None or (company_id is not None and existing.template_id):
+                hide_ids.append(existing.id)
+            else:
+                delete_ids.append(existing.id)
+        elif existing is None and template is not None:
+            result.update(status='deleted')
+            inserts.append({'company_id': company_id, 'template_id': template.id, 'is_hidden': True,
+                            **{column: getattr(template, column) for column in columns}})
+        else:
+            result.update(status='not_found')
+
+    if not partial and any(result['status'] == 'error' for result in results):
+        return results, False
+
+    if inserts:
+        db.session.execute(db.insert(model), inserts)
+    if updates:
+        db.session.execute(db.update(model), updates)
+    if hide_ids:
+        db.session.execute(db.update(model).where(model.id.in_(hide_ids)).values(is_hidden=True)
+                           .execution_options(synchronize_session=False))
+    if delete_ids:
+        if company_id is None:
+            # Deleted template rows: overrides become standalone, hiding rows go
+            db.session.execute(db.delete(model).where(model.template_id.in_(delete_ids), model.is_hidden.is_(True))
+                               .execution_options(synchronize_session=False))
+            db.session.execute(db.update(model).where(model.template_id.in_(delete_ids)).values(template_id=None)
+                               .execution_options(synchronize_session=False))
+        db.session.execute(db.delete(model).where(model.id.in_(delete_ids))
+                           .execution_options(synchronize_session=False))
+
+    inserted = [result for result in results
+                if result['action'] == 'upsert' and result['status'] != 'error' and 'id' not in result]
+    if inserted:
+        ids = dict(db.session.query(model.name, model.id).filter(
+            model.company_id.is_(None) if company_id is None else model.company_id == company_id,
+            model.name.in_([result['name'] for result in inserted])))
+        for result in inserted:
+            result['id'] = ids.get(result['name'])
+    return results, True
@@ -0,0 +1,60 @@
+import re
+
+# incompatible_series is free text: one or more series names separated by
+# commas, semicolons, pipes or line breaks
+_SEPARATORS = re.compile(r'[,;|\n]+')
+
+
+def _normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+def parse_series_list(text):
+    """Noms de séries listés dans un champ incompatible_series, normalisés
+    (casse et espaces ignorés)"""
+    if not text:
+        return []
+    return [_normalize(part) for part in _SEPARATORS.split(text) if part.strip()]
+
+
+class CompatibilityIndex:
+    """Matrice d'incompatibilité accessoire × série de profilé
+
+    Chaque série reçoit un numéro de bit (ordre alphabétique) ; chaque
+    accessoire porte un masque (entier Python) des séries avec lesquelles il
+    est incompatible. Le test d'une sélection est un décalage de bits, quel
+    que soit la taille du catalogue. Les noms de séries inconnus du
+    catalogue de l'entreprise sont ignorés.
+    """
+
+    __slots__ = ('series', 'series_bit', 'masks')
+
+    def __init__(self, series_names, accessories):
+        self.series = tuple(sorted(series_names))
+        self.series_bit = {name: bit for bit, name in enumerate(self.series)}
+        bits = {_normalize(name): bit for name, bit in self.series_bit.items()}
+
+        masks = {}
+        for name, incompatible_series in accessories:
+            mask = 0
+            for series in parse_series_list(incompatible_series):
+                bit = bits.get(series)
+                if bit is not None:
+                    mask |= 1 << bit
+            if mask:
+                masks[name] = mask
+        self.masks = masks
+
+    def is_compatible(self, accessory, series):
+        bit = self.series_bit.get(series)
+        if bit is None:
+            return True
+        return not (self.masks.get(accessory, 0) >> bit) & 1
+
+    def to_dict(self):
+        """Forme compacte pour le client : liste des séries (index = bit) et
+        masque hexadécimal des seuls accessoires ayant une incompatibilité"""
+        return {
+            'series': list(self.series),
+            'incompatible': {name: format(mask, 'x') for name, mask in sorted(self.masks.items())}
+        }
@@ -0,0 +1,84 @@
+import hashlib
+import re
+from flask import request, jsonify, current_app
+
+
+def make_etag(*parts):
+    """ETag fort dérivé des versions de données qui déterminent une réponse"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_json(etag, build):
+    """Réponse JSON conditionnelle : 304 si le client détient déjà cette
+    version, sinon build() n'est appelé que pour construire le corps
+
+    private, no-cache : le navigateur garde la réponse mais la revalide à
+    chaque chargement.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+PUBLIC_REVALIDATE = 'public, no-cache'
+PRIVATE_REVALIDATE = 'private, no-cache'
+NO_STORE = 'no-store'
+
+# GET endpoints whose data is not sensitive and changes rarely: cached by the
+# browser, revalidated with ETag on every use
+REVALIDATED_API_PREFIXES = ('/api/catalog/', '/api/bootstrap/', '/api/languages/')
+
+# name.<hash>.ext produced by the asset build
+_HASHED_FILENAME = re.compile(r'\.[0-9a-f]{8,}\.[a-z0-9]+$')
+
+
+def is_fingerprinted(path, args):
+    """Asset dont l'URL change avec le contenu (nom haché ou ?v=…)"""
+    return bool(_HASHED_FILENAME.search(path)) or 'v' in args
+
+
+def cache_policy(path, method, args):
+    """Cache-Control selon la classe de route
+
+    - /static fingerprinté : immuable un an
+    - /static non fingerprinté, service worker : revalidé à chaque usage
+    - API catalogue / bootstrap / langues (GET) : privé, revalidé par ETag
+    - autres API : no-store (données de session, devis, comptes…)
+    - pages HTML : privé, revalidé
+    """
+    if path.startswith('/static/'):
+        return IMMUTABLE if is_fingerprinted(path, args) else PUBLIC_REVALIDATE
+    if path == '/sw.js':
+        return PUBLIC_REVALIDATE
+    if path.startswith('/api/'):
+        if method in ('GET', 'HEAD') and path.startswith(REVALIDATED_API_PREFIXES):
+            return PRIVATE_REVALIDATE
+        return NO_STORE
+    return PRIVATE_REVALIDATE
+
+
+def apply_cache_policy(response):
+    """Hook after_request : pose Cache-Control (sauf si la vue l'a déjà fait)
+    et rend conditionnelles les réponses revalidées qui n'ont pas d'ETag"""
+    # send_file marks files 'no-cache' on its own: static routes always follow the policy
+    is_file = request.path.startswith('/static/') or request.path == '/sw.js'
+    if is_file or 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = cache_policy(request.path, request.method, request.args)
+
+    cache_control = response.headers['Cache-Control']
+    if cache_control == NO_STORE:
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+    elif ('no-cache' in cache_control and request.method in ('GET', 'HEAD')
+          and response.status_code == 200 and not response.is_streamed
+          and not response.direct_passthrough and 'ETag' not in response.headers):
+        # Body-hash ETag for pages and JSON that have no cheaper validator
+        response.add_etag()
+        response.make_conditional(request)
+    return response
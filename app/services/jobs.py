@@ -0,0 +1,219 @@
+import os
+import json
+import shutil
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from flask import current_app
+from app import db
+from app.models import BackgroundJob
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_PROCESSES = int(os.environ.get('JOB_PROCESSES', 2))
+JOBS_DIR = os.environ.get('JOBS_DIR', 'job_results')
+# Seconds without a heartbeat after which an active job is considered lost
+# (worker restarted or killed while it ran)
+JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 900))
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+
+# CPU-bound jobs (PDF rendering) run in worker processes, created on first use.
+# 'spawn': the web process is multi-threaded, forking it is not safe.
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+class JobProgress:
+    """Publie l'avancement d'une tâche en base, lisible via /api/jobs/<id>"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def update(self, progress, total=None):
+        values = {'progress': progress, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['total'] = total
+        BackgroundJob.query.filter_by(id=self.job_id).update(values)
+        db.session.commit()
+
+    def result_path(self, extension):
+        """Chemin du fichier résultat de la tâche dans JOBS_DIR"""
+        Path(JOBS_DIR).mkdir(parents=True, exist_ok=True)
+        return os.path.join(JOBS_DIR, f'{self.job_id}.{extension}')
+
+
+def _stale_cutoff():
+    return datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+
+
+def is_stale(job):
+    """La tâche est-elle active sans signe de vie depuis JOB_STALE_AFTER ?"""
+    last_seen = job.heartbeat_at or job.started_at or job.created_at
+    return job.status in ACTIVE_STATUSES and last_seen is not None and last_seen < _stale_cutoff()
+
+
+def fail_stale_jobs():
+    """Passe en échec les tâches actives sans signe de vie depuis JOB_STALE_AFTER
+
+    Les tâches vivent dans la mémoire du worker web : après un redémarrage,
+    celles qui étaient en cours restaient 'running' indéfiniment. Le dernier
+    signe de vie est le heartbeat, à défaut le démarrage puis la création.
+    """
+    cutoff = _stale_cutoff()
+    last_seen = db.func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.started_at, BackgroundJob.created_at)
+    stale = BackgroundJob.query.filter(
+        BackgroundJob.status.in_(ACTIVE_STATUSES),
+        last_seen < cutoff
+    ).update({
+        'status': 'failed',
+        'error': 'Interrupted: no progress reported, the worker running it was probably restarted',
+        'finished_at': datetime.utcnow()
+    }, synchronize_session=False)
+    if stale:
+        db.session.commit()
+    return stale
+
+
+def find_active_job(kind, company_id):
+    fail_stale_jobs()
+    return BackgroundJob.query.filter(
+        BackgroundJob.kind == kind,
+        BackgroundJob.company_id.is_(None) if company_id is None else BackgroundJob.company_id == company_id,
+        BackgroundJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+
+
+def start_job(kind, company_id, user_id, target, *args):
+    """Enregistre une tâche et l'exécute hors du worker web
+
+    target(progress, *args) reçoit un JobProgress et retourne
+    (résumé, chemin du résultat). La tâche tourne dans un pool de
+    JOB_WORKERS threads avec son propre contexte d'application.
+    """
+    job = BackgroundJob(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        company_id=company_id,
+        created_by=user_id,
+        status='pending'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _executor.submit(_run_job, app, job.id, target, args)
+    return job
+
+
+def _run_job(app, job_id, target, args):
+    with app.app_context():
+        # A job that waited past JOB_STALE_AFTER was already failed: leave it
+        started = BackgroundJob.query.filter_by(id=job_id, status='pending').update({
+            'status': 'running',
+            'started_at': datetime.utcnow(),
+            'heartbeat_at': datetime.utcnow()
+        })
+        db.session.commit()
+        if not started:
+            return
+
+        try:
+            summary, result_path = target(JobProgress(job_id), *args)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Background job {job_id} failed: {e}")
+            values = {'status': 'failed', 'error': str(e)}
+        else:
+            values = {
+                'status': 'completed',
+                'summary': json.dumps(summary),
+                'result_path': result_path
+            }
+
+        values['finished_at'] = datetime.utcnow()
+        BackgroundJob.query.filter_by(id=job_id).update(values)
+        db.session.commit()
+
+
+def _get_process_pool(broken=None):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool is broken:
+            _process_pool = ProcessPoolExecutor(max_workers=JOB_PROCESSES,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return _process_pool
+
+
+def submit_process(target, *args):
+    """Soumet target(*args) au pool de processus de calcul ; retourne le Future"""
+    pool = _get_process_pool()
+    try:
+        return pool.submit(target, *args)
+    except BrokenProcessPool:
+        # A worker process died (OOM kill...): start a fresh pool once
+        return _get_process_pool(broken=pool).submit(target, *args)
+
+
+def start_process_job(kind, company_id, user_id, target, *args):
+    """Enregistre une tâche CPU et l'exécute dans un processus de calcul
+
+    target(*args) doit être une fonction de module (sérialisable) sans accès
+    à la base ; elle retourne (résumé, chemin du résultat). L'état de la
+    tâche est mis à jour à la fin par le processus web, qui place le résultat
+    dans JOBS_DIR. Le pool compte JOB_PROCESSES processus par worker web.
+    """
+    job = BackgroundJob(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        company_id=company_id,
+        created_by=user_id,
+        status='running',
+        started_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    future = submit_process(target, *args)
+    future.add_done_callback(partial(_finish_process_job, app, job.id))
+    return job
+
+
+def _keep_result(job_id, path):
+    """Lien (ou copie) du résultat dans JOBS_DIR : le fichier rendu peut vivre
+    dans un cache et en être évincé avant son téléchargement"""
+    extension = os.path.splitext(path)[1].lstrip('.') or 'bin'
+    kept = JobProgress(job_id).result_path(extension)
+    try:
+        os.link(path, kept)
+    except OSError:
+        # Other filesystem, or links not supported
+        shutil.copyfile(path, kept)
+    return kept
+
+
+def _finish_process_job(app, job_id, future):
+    with app.app_context():
+        try:
+            summary, result_path = future.result()
+            result_path = _keep_result(job_id, result_path)
+        except Exception as e:
+            print(f"Background job {job_id} failed: {e}")
+            values = {'status': 'failed', 'error': str(e)}
+        else:
+            values = {
+                'status': 'completed',
+                'summary': json.dumps(summary),
+                'result_path': result_path
+            }
+
+        values['finished_at'] = datetime.utcnow()
+        BackgroundJob.query.filter_by(id=job_id).update(values)
+        db.session.commit()
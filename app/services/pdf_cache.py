@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from app.services.pdf_renderer import MAX_PDF_SIZE, RENDERER_VERSION, render_quote_pdf
+
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', 'pdf_cache')
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+_evict_lock = threading.Lock()
+
+
+class PdfTooLargeError(Exception):
+    """PDF rendu au-delà de MAX_PDF_SIZE (renvoyé en 507, jamais mis en cache)"""
+
+    def __init__(self, size):
+        super().__init__(f'PDF too large ({size/1000:.1f}KB > {MAX_PDF_SIZE/1000:.0f}KB limit)')
+        self.size = size
+
+    def __reduce__(self):
+        # Raised in render worker processes: pickled back with its size
+        return PdfTooLargeError, (self.size,)
+
+
+def document_key(document):
+    """Clé de contenu d'un devis à rendre (sert aussi d'ETag)
+
+    Le document contient tout ce qui apparaît sur le PDF (devis, articles,
+    en-tête de l'entreprise) : toute modification change la clé, l'ancienne
+    entrée n'est plus lue et finit évincée.
+    """
+    payload = json.dumps([RENDERER_VERSION, document], sort_keys=True, ensure_ascii=False,
+                         separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    return os.path.join(PDF_CACHE_DIR, f'{key}.pdf')
+
+
+def lookup(key):
+    """Chemin du PDF en cache, ou None
+
+    Un accès remet la date de modification du fichier à maintenant : c'est
+    elle qui ordonne l'éviction, partagée par tous les processus.
+    """
+    path = _path(key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def _evict():
+    """Supprime les PDF les moins récemment utilisés au-delà de PDF_CACHE_MAX_BYTES"""
+    with _evict_lock:
+        entries = []
+        total = 0
+        with os.scandir(PDF_CACHE_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= PDF_CACHE_MAX_BYTES:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= PDF_CACHE_MAX_BYTES:
+                break
+
+
+def store(key, pdf):
+    """Écrit un PDF dans le cache (écriture atomique) et retourne son chemin"""
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf)
+        os.replace(tmp_path, _path(key))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _evict()
+    return _path(key)
+
+
+def render_checked(document):
+    """Rend le PDF d'un document, en refusant ceux qui dépassent MAX_PDF_SIZE"""
+    pdf = render_quote_pdf(document)
+    if len(pdf) > MAX_PDF_SIZE:
+        raise PdfTooLargeError(len(pdf))
+    return pdf
+
+
+def quote_pdf(document, key=None):
+    """(clé, chemin) du PDF d'un document, rendu seulement s'il n'est pas en cache"""
+    key = key or document_key(document)
+    path = lookup(key)
+    if path is None:
+        path = store(key, render_checked(document))
+    return key, path
+
+
+def render_job(document, key, download_name):
+    """Tâche de rendu exécutée dans un processus de calcul (start_process_job)"""
+    _, path = quote_pdf(document, key)
+    summary = {
+        'quote_number': document['quote_number'],
+        'size': os.path.getsize(path),
+        'download_name': download_name
+    }
+    return summary, path
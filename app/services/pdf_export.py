@@ -0,0 +1,165 @@
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import Quote, Setting
+from app.services.jobs import JOB_PROCESSES, submit_process
+from app.services.pdf_cache import PdfTooLargeError, document_key, lookup, render_checked, render_job
+from app.services.pdf_renderer import quote_document
+from app.services.zip_stream import ChunkSink
+
+PDF_ZIP_MAX_QUOTES = int(os.environ.get('PDF_ZIP_MAX_QUOTES', 1000))
+# Quotes (with their articles) loaded per query while the archive is written
+LOAD_CHUNK_SIZE = 50
+# Renders queued in the process pool at once: enough to keep every process busy
+MAX_IN_FLIGHT = JOB_PROCESSES * 2
+
+
+class ExportFilterError(ValueError):
+    """Filtre d'export invalide (renvoyé en 400)"""
+
+
+def company_header(company_id):
+    """Paramètres 'company' affichés en tête des PDF"""
+    settings = Setting.query.filter_by(section='company', company_id=company_id).all()
+    return {s.key: s.value for s in settings}
+
+
+def _date(value, field):
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ExportFilterError(f'{field} must be a date (YYYY-MM-DD)')
+
+
+def export_quote_ids(company_id, role, filters):
+    """Ids des devis à exporter, par date puis numéro
+
+    filters : date_from / date_to (YYYY-MM-DD, inclus) et/ou ids. Au moins un
+    critère est exigé ; au-delà de PDF_ZIP_MAX_QUOTES devis l'export est
+    refusé. Hors super admin, limité aux devis de l'entreprise.
+    """
+    date_from = _date(filters.get('date_from'), 'date_from')
+    date_to = _date(filters.get('date_to'), 'date_to')
+    ids = filters.get('ids')
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        raise ExportFilterError('ids must be a list of quote ids')
+    if date_from is None and date_to is None and not ids:
+        raise ExportFilterError('A date range or a list of ids is required')
+
+    query = db.select(Quote.id)
+    if role != 'super_admin':
+        query = query.where(Quote.company_id == company_id)
+    if date_from:
+        query = query.where(Quote.quote_date >= date_from)
+    if date_to:
+        query = query.where(Quote.quote_date <= date_to)
+    if ids:
+        query = query.where(Quote.id.in_(ids))
+
+    quote_ids = db.session.scalars(query.order_by(Quote.quote_date, Quote.quote_number)
+                                   .limit(PDF_ZIP_MAX_QUOTES + 1)).all()
+    if len(quote_ids) > PDF_ZIP_MAX_QUOTES:
+        raise ExportFilterError(f'Too many quotes (max {PDF_ZIP_MAX_QUOTES}), narrow the filter')
+    return quote_ids
+
+
+def _documents(quote_ids):
+    """(nom dans l'archive, document, clé de cache) de chaque devis, chargés par paquets"""
+    headers = {}
+    names = set()
+    for start in range(0, len(quote_ids), LOAD_CHUNK_SIZE):
+        chunk = quote_ids[start:start + LOAD_CHUNK_SIZE]
+        quotes = {q.id: q for q in Quote.query.options(selectinload(Quote.items))
+                  .filter(Quote.id.in_(chunk))}
+        for quote_id in chunk:
+            quote = quotes.get(quote_id)
+            if quote is None:
+                continue
+            if quote.company_id not in headers:
+                headers[quote.company_id] = company_header(quote.company_id)
+
+            # Numbers are per company: a cross-company export can repeat them
+            name = f'devis_{quote.quote_number}.pdf'
+            if name in names:
+                name = f'devis_{quote.quote_number}_{quote.id}.pdf'
+            names.add(name)
+
+            document = quote_document(quote, headers[quote.company_id])
+            yield name, document, document_key(document)
+        db.session.expunge_all()
+
+
+def stream_pdf_zip(quote_ids):
+    """Générateur d'une archive zip des PDF des devis
+
+    Les PDF déjà en cache sont repris tels quels ; les autres sont rendus en
+    parallèle dans le pool de processus de calcul et ajoutés à l'archive
+    dans l'ordre où ils se terminent. Au plus MAX_IN_FLIGHT rendus sont en
+    attente et chaque PDF quitte la mémoire dès qu'il est écrit. Les devis
+    impossibles à rendre sont listés dans erreurs.txt.
+    """
+    sink = ChunkSink()
+    pending = {}
+    errors = []
+
+    def add(archive, name, path, document):
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+        except FileNotFoundError:
+            # Evicted from the cache since it was rendered
+            pdf = render_checked(document)
+        archive.writestr(name, pdf)
+
+    def failed(name, error):
+        # A failed render (worker crash, unreadable data…) must not cut the archive short
+        if isinstance(error, PdfTooLargeError):
+            errors.append(f'{name}: {error}')
+            return
+        print(f"PDF export: rendering {name} failed: {error!r}")
+        errors.append(f'{name}: rendering failed ({type(error).__name__})')
+
+    def collect(archive, futures):
+        for future in futures:
+            name, document = pending.pop(future)
+            try:
+                _, path = future.result()
+                add(archive, name, path, document)
+            except Exception as e:
+                failed(name, e)
+
+    try:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, document, key in _documents(quote_ids):
+                path = lookup(key)
+                if path is not None:
+                    try:
+                        add(archive, name, path, document)
+                    except Exception as e:
+                        failed(name, e)
+                    yield sink.drain()
+                    continue
+
+                pending[submit_process(render_job, document, key, name)] = (name, document)
+                if len(pending) >= MAX_IN_FLIGHT:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(archive, done)
+                    yield sink.drain()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(archive, done)
+                yield sink.drain()
+
+            if errors:
+                archive.writestr('erreurs.txt', '\n'.join(errors) + '\n')
+        yield sink.drain()
+    finally:
+        # Client gone: drop the renders that have not started
+        for future in pending:
+            future.cancel()
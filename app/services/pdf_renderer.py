@@ -0,0 +1,337 @@
+import io
+import json
+import threading
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from app.services.quote_items import is_multi_item, item_payload
+
+MAX_PDF_SIZE = 500000
+# Part of the PDF cache key: bump when the layout changes so cached PDFs are re-rendered
+RENDERER_VERSION = 1
+
+PRIMARY_COLOR = colors.HexColor('#1a5490')
+HEADER_BACKGROUND = colors.HexColor('#f0f0f0')
+TOTAL_BACKGROUND = colors.HexColor('#e0e0e0')
+GRAND_TOTAL_BACKGROUND = colors.HexColor('#3B82F6')
+
+FONTS = ('Helvetica', 'Helvetica-Bold')
+
+
+class PdfStyles:
+    """Styles de paragraphe et de tableau d'un devis
+
+    Construits une fois par processus (get_styles) : ils ne dépendent pas du
+    devis, et ReportLab ne les modifie pas pendant le rendu.
+    """
+
+    def __init__(self):
+        sample = getSampleStyleSheet()
+        self.normal = sample['Normal']
+        self.heading2 = sample['Heading2']
+        self.heading3 = sample['Heading3']
+        self.quote_number = ParagraphStyle(
+            'QuoteNumber',
+            parent=self.normal,
+            fontSize=22,
+            textColor=PRIMARY_COLOR,
+            fontName='Helvetica-Bold',
+            leading=26
+        )
+        self.date_validity = ParagraphStyle(
+            'DateValidity',
+            parent=self.normal,
+            fontSize=9,
+            alignment=TA_RIGHT
+        )
+
+        self.header_table = TableStyle([
+            ('LEFTPADDING', (0, 0), (0, -1), 0),
+            ('RIGHTPADDING', (1, 0), (1, -1), 0),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 1), (0, 1), 9),
+            ('FONTSIZE', (1, 1), (1, 1), 9),
+            ('TOPPADDING', (0, 1), (-1, 1), 8),
+        ])
+        self.summary_table = TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), HEADER_BACKGROUND),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ])
+        self.item_details_table = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (0, -1), HEADER_BACKGROUND),
+        ])
+        self.item_price_table = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, -1), (-1, -1), TOTAL_BACKGROUND),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ])
+        self.grand_total_table = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('BACKGROUND', (0, 0), (-1, -1), GRAND_TOTAL_BACKGROUND),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+        ])
+        self.details_table = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (0, -1), HEADER_BACKGROUND),
+        ])
+        self.price_table = TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), HEADER_BACKGROUND),
+            ('BACKGROUND', (0, -1), (-1, -1), TOTAL_BACKGROUND),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ])
+
+        # Font metrics are loaded lazily on first use: pay that once too
+        for font in FONTS:
+            pdfmetrics.getFont(font)
+
+
+_styles = None
+_styles_lock = threading.Lock()
+
+
+def get_styles():
+    """Styles partagés par tous les rendus du processus"""
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                _styles = PdfStyles()
+    return _styles
+
+
+def quote_document(quote, company_info):
+    """Données d'un devis nécessaires au rendu, sous forme de dict JSON
+
+    Le rendu ne touche plus à la base : le document peut être haché, mis en
+    cache ou rendu dans un autre processus.
+    """
+    breakdown = json.loads(quote.details) if quote.details else {}
+    # A single-chassis quote keeps the single-item layout
+    items = [item_payload(item) for item in quote.items] if is_multi_item(quote) else []
+    return {
+        'quote_number': quote.quote_number,
+        'quote_date': quote.quote_date,
+        'company': {
+            'name': company_info.get('company_name', 'MENUISERIE ALUMINIUM'),
+            'address': company_info.get('company_address', ''),
+            'phone': company_info.get('company_phone', ''),
+            'email': company_info.get('company_email', '')
+        },
+        'client': {
+            'name': breakdown.get('client_name', ''),
+            'phone': breakdown.get('client_phone', ''),
+            'email': breakdown.get('client_email', '')
+        },
+        # Article lines come from quote_items (details['items'] for quotes not yet backfilled)
+        'items': items or breakdown.get('items', []),
+        # Single-item quote (backwards compatibility)
+        'single': {
+            'chassisType': quote.chassis_type,
+            'width': quote.width,
+            'height': quote.height,
+            'profileSeries': quote.profile_series,
+            'glazingType': quote.glazing_type,
+            'finish': quote.finish,
+            'accessories': json.loads(quote.accessories) if quote.accessories else {},
+            'breakdown': breakdown
+        }
+    }
+
+
+def _accessories_text(accessories):
+    accessories_list = [f"{name} (Qté: {qty})" for name, qty in accessories.items()]
+    return ', '.join(accessories_list) if accessories_list else 'Aucun'
+
+
+def _header(document, styles):
+    company = document['company']
+    company_text = f"<b>{company['name']}</b><br/>"
+    if company['address']:
+        company_text += f"{company['address']}<br/>"
+    if company['phone']:
+        company_text += f"Tél: {company['phone']}<br/>"
+    if company['email']:
+        company_text += f"Email: {company['email']}"
+
+    client = document['client']
+    client_text = "<b>CLIENT</b><br/>"
+    if client['name']:
+        client_text += f"{client['name']}<br/>"
+    if client['phone']:
+        client_text += f"Tél: {client['phone']}<br/>"
+    if client['email']:
+        client_text += f"Email: {client['email']}"
+
+    date_validity_text = f"<b>Date:</b> {document['quote_date']}<br/><b>Validité:</b> 30 jours"
+
+    # Row 1: Devis N° (left) | Date/Validité (right)
+    # Row 2: Info Entreprise (left) | Info Client (right)
+    header_data = [
+        [
+            Paragraph(f"Devis N°: {document['quote_number']}", styles.quote_number),
+            Paragraph(date_validity_text, styles.date_validity)
+        ],
+        [
+            Paragraph(company_text, styles.normal),
+            Paragraph(client_text, styles.normal)
+        ]
+    ]
+    header_table = Table(header_data, colWidths=[85*mm, 85*mm])
+    header_table.setStyle(styles.header_table)
+    return [header_table, Spacer(1, 10*mm)]
+
+
+def _multi_item_body(items, styles):
+    elements = [Paragraph('Articles du devis', styles.heading2), Spacer(1, 5*mm)]
+
+    summary_data = [['#', 'Type', 'Dimensions', 'Qté', 'Prix (MAD)']]
+    for idx, item in enumerate(items, 1):
+        quantity = item.get('quantity', 1)
+        total_price = item.get('breakdown', {}).get('total_price', 0) * quantity
+        summary_data.append([
+            str(idx),
+            item.get('chassisType', ''),
+            f"{item.get('width', 0)} × {item.get('height', 0)} mm",
+            str(quantity),
+            f"{total_price:.2f}"
+        ])
+
+    summary_table = Table(summary_data, colWidths=[12*mm, 55*mm, 45*mm, 15*mm, 35*mm])
+    summary_table.setStyle(styles.summary_table)
+    elements += [summary_table, Spacer(1, 10*mm)]
+
+    # Detailed section for each item
+    for idx, item in enumerate(items, 1):
+        elements += [Paragraph(f'Article {idx} - {item.get("chassisType", "")}', styles.heading3),
+                     Spacer(1, 3*mm)]
+
+        item_breakdown = item.get('breakdown', {})
+        quantity = item.get('quantity', 1)
+        details_data = [
+            ['Type de châssis:', Paragraph(item.get('chassisType') or '', styles.normal)],
+            ['Dimensions:', f"{item.get('width', 0)} mm × {item.get('height', 0)} mm"],
+            ['Surface:', f"{item_breakdown.get('surface_m2', 0)} m²"],
+            ['Périmètre:', f"{item_breakdown.get('perimeter_m', 0)} m"],
+            ['Série de profilés:', Paragraph(item.get('profileSeries') or '', styles.normal)],
+            ['Type de vitrage:', Paragraph(item.get('glazingType') or '', styles.normal)],
+            ['Finition:', Paragraph(item.get('finish') or '', styles.normal)],
+            ['Accessoires:', Paragraph(_accessories_text(item.get('accessories', {})), styles.normal)],
+            ['Quantité:', str(quantity)]
+        ]
+        details_table = Table(details_data, colWidths=[50*mm, 120*mm])
+        details_table.setStyle(styles.item_details_table)
+        elements += [details_table, Spacer(1, 5*mm)]
+
+        unit_price = item_breakdown.get('total_price', 0)
+        item_price_data = [
+            ['Prix de base', f"{item_breakdown.get('base_price', 0):.2f} MAD"],
+            ['Vitrage', f"{item_breakdown.get('glazing_cost', 0):.2f} MAD"],
+            ['Accessoires', f"{item_breakdown.get('accessories_cost', 0):.2f} MAD"],
+            ['Supplément finition', f"{item_breakdown.get('finish_supplement', 0):.2f} MAD"],
+            ['Prix unitaire', f"{unit_price:.2f} MAD"],
+            ['Quantité', f"× {quantity}"],
+            ['Total article', f"{unit_price * quantity:.2f} MAD"]
+        ]
+        item_price_table = Table(item_price_data, colWidths=[120*mm, 50*mm])
+        item_price_table.setStyle(styles.item_price_table)
+        elements += [item_price_table, Spacer(1, 8*mm)]
+
+    elements += [Paragraph('Total du devis', styles.heading2), Spacer(1, 5*mm)]
+
+    total_price = sum(item.get('breakdown', {}).get('total_price', 0) * item.get('quantity', 1) for item in items)
+    total_table = Table([['TOTAL TTC', f"{total_price:.2f} MAD"]], colWidths=[120*mm, 50*mm])
+    total_table.setStyle(styles.grand_total_table)
+    elements.append(total_table)
+    return elements
+
+
+def _single_item_body(single, styles):
+    breakdown = single['breakdown']
+    elements = [Paragraph('Détails du châssis', styles.heading2), Spacer(1, 5*mm)]
+
+    details_data = [
+        ['Type de châssis:', Paragraph(single['chassisType'], styles.normal)],
+        ['Dimensions:', f"{single['width']} mm × {single['height']} mm"],
+        ['Surface:', f"{breakdown['surface_m2']} m²"],
+        ['Périmètre:', f"{breakdown['perimeter_m']} m"],
+        ['Série de profilés:', Paragraph(single['profileSeries'], styles.normal)],
+        ['Type de vitrage:', Paragraph(single['glazingType'], styles.normal)],
+        ['Finition:', Paragraph(single['finish'], styles.normal)],
+        ['Accessoires:', Paragraph(_accessories_text(single['accessories']), styles.normal)]
+    ]
+    details_table = Table(details_data, colWidths=[50*mm, 120*mm])
+    details_table.setStyle(styles.details_table)
+    elements += [details_table, Spacer(1, 10*mm)]
+
+    elements += [Paragraph('Détail du prix', styles.heading2), Spacer(1, 5*mm)]
+    price_data = [
+        ['Description', 'Montant (MAD)'],
+        ['Prix de base', f"{breakdown.get('base_price', 0):.2f} MAD"],
+        ['Vitrage', f"{breakdown.get('glazing_cost', 0):.2f} MAD"],
+        ['Accessoires', f"{breakdown.get('accessories_cost', 0):.2f} MAD"],
+        ['Supplément finition', f"{breakdown.get('finish_supplement', 0):.2f} MAD"],
+        ['Total TTC', f"{breakdown.get('total_price', 0):.2f} MAD"]
+    ]
+    price_table = Table(price_data, colWidths=[120*mm, 50*mm])
+    price_table.setStyle(styles.price_table)
+    elements.append(price_table)
+    return elements
+
+
+def render_quote_pdf(document, styles=None):
+    """Rend le PDF d'un devis (document issu de quote_document) en octets
+
+    styles : styles à utiliser, ceux du processus par défaut.
+    """
+    styles = styles or get_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=20*mm, leftMargin=20*mm,
+                            topMargin=15*mm, bottomMargin=20*mm)
+
+    elements = _header(document, styles)
+    if document['items']:
+        elements += _multi_item_body(document['items'], styles)
+    else:
+        elements += _single_item_body(document['single'], styles)
+
+    doc.build(elements)
+    return buffer.getvalue()
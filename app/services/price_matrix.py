@@ -0,0 +1,84 @@
+import numpy as np
+from app.services.pricing import PricingError, resolve_rates
+
+DEFAULT_STEP_MM = 50
+MAX_MATRIX_CELLS = 250000
+
+
+def _axis(start, stop, step):
+    """Valeurs de la grille de start à stop inclus, par pas de step"""
+    values = np.arange(start, stop + 1, step, dtype=np.float64)
+    if values.size == 0 or values[-1] != stop:
+        values = np.append(values, float(stop))
+    return values
+
+
+def _rule_amounts(rule, surface_m2, perimeter_m):
+    """Équivalent vectorisé de RateRule.amount pour un article"""
+    measure = rule.measure(surface_m2, perimeter_m)
+    if len(rule.rates) == 1:
+        return rule.rates[0] * measure
+    index = np.searchsorted(rule.thresholds, measure, side='right') - 1
+    return np.asarray(rule.rates)[np.maximum(index, 0)] * measure
+
+
+def build_price_matrix(book, data):
+    """Calcule la grille de prix largeur × hauteur d'une configuration
+
+    Applique la même formule que price_item (surface × prix m² × coef. de
+    perte + périmètre × prix ml + accessoires, × coef. finition,
+    + suppléments, + main d'œuvre, remise, TVA) sous forme d'opérations
+    vectorisées NumPy.
+    Retourne (largeurs, hauteurs, matrice HT, matrice TTC) ; les matrices
+    sont indexées [hauteur][largeur].
+    """
+    chassis_type = data.get('chassisType')
+    if not chassis_type:
+        raise PricingError('Chassis type is required')
+
+    chassis = book.chassis_types.get(chassis_type)
+    if not chassis:
+        raise PricingError(f'Invalid chassis type: {chassis_type}')
+
+    try:
+        step = int(data.get('step', DEFAULT_STEP_MM))
+        width_min = int(data.get('widthMin', chassis.min_width))
+        width_max = int(data.get('widthMax', chassis.max_width))
+        height_min = int(data.get('heightMin', chassis.min_height))
+        height_max = int(data.get('heightMax', chassis.max_height))
+        discount = float(data.get('discount', 0))
+    except (ValueError, TypeError):
+        raise PricingError('Step, bounds and discount must be valid numbers')
+
+    if step <= 0:
+        raise PricingError('Step must be greater than 0')
+    if not (chassis.min_width <= width_min <= width_max <= chassis.max_width):
+        raise PricingError(f'Width must be between {chassis.min_width} and {chassis.max_width} mm')
+    if not (chassis.min_height <= height_min <= height_max <= chassis.max_height):
+        raise PricingError(f'Height must be between {chassis.min_height} and {chassis.max_height} mm')
+
+    widths = _axis(width_min, width_max, step)
+    heights = _axis(height_min, height_max, step)
+    if widths.size * heights.size > MAX_MATRIX_CELLS:
+        raise PricingError(f'Matrix too large ({widths.size * heights.size} cells > {MAX_MATRIX_CELLS})')
+
+    rates = resolve_rates(book, data)
+
+    w = widths[np.newaxis, :]
+    h = heights[:, np.newaxis]
+
+    surface_m2 = (w * h) / 1000000
+    perimeter_m = 2 * (w + h) / 1000
+
+    base_surface = _rule_amounts(rates['surface_rule'], surface_m2, perimeter_m) * book.loss_coefficient
+    base_linear = _rule_amounts(rates['linear_rule'], surface_m2, perimeter_m)
+
+    subtotal = (base_surface + base_linear + rates['accessories_total']) * rates['finish_coefficient']
+    surcharges_total = 0
+    for _, rule in book.surcharges:
+        surcharges_total = surcharges_total + _rule_amounts(rule, surface_m2, perimeter_m)
+    total_before_discount = subtotal + surcharges_total + _rule_amounts(book.labor_rule, surface_m2, perimeter_m)
+    total_ht = total_before_discount - total_before_discount * (discount / 100)
+    total_ttc = total_ht * (1 + book.vat_rate)
+
+    return widths, heights, np.round(total_ht, 2), np.round(total_ttc, 2)
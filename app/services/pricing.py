@@ -0,0 +1,420 @@
+import json
+import os
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from app import db
+from app.models import ChassisType, ProfileSeries, GlazingType, Finish, Accessory, Config
+from app.services.cache import LRUCache
+from app.services.catalog_overlay import catalog_rows
+from app.services.compatibility import CompatibilityIndex
+from app.services.pricing_rules import RateRule, compile_rules, rule_key
+from app.services.versions import TEMPLATE_KEY, bump_version, company_key, get_versions, on_versions_committed
+
+DEFAULT_VAT_RATE = 0.20
+DEFAULT_LOSS_COEFFICIENT = 1.1
+DEFAULT_LABOR_COST = 50.0
+DEFAULT_SURFACE_PRICE = 100.0
+DEFAULT_LINEAR_PRICE = 50.0
+DEFAULT_FINISH_COEFFICIENT = 1.0
+
+ChassisEntry = namedtuple('ChassisEntry', 'name min_width max_width min_height max_height')
+ProfileEntry = namedtuple('ProfileEntry', 'name price_per_meter')
+GlazingEntry = namedtuple('GlazingEntry', 'name price_per_m2')
+FinishEntry = namedtuple('FinishEntry', 'name price_coefficient')
+AccessoryEntry = namedtuple('AccessoryEntry', 'name unit_price incompatible_series')
+
+DEFAULT_SURFACE_RULE = RateRule.flat('m2', DEFAULT_SURFACE_PRICE)
+DEFAULT_LINEAR_RULE = RateRule.flat('ml', DEFAULT_LINEAR_PRICE)
+
+
+class PricingError(ValueError):
+    """Erreur de validation d'une demande de prix (renvoyée en 400)"""
+
+
+def _number(value, message):
+    """Nombre fourni par le client (les chaînes numériques sont acceptées),
+    PricingError(message) sinon"""
+    if isinstance(value, bool):
+        raise PricingError(message)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        raise PricingError(message)
+
+
+class PriceBook:
+    """Catalogue tarifaire compilé et immuable d'une entreprise
+
+    Le catalogue est celui que voit l'entreprise : lignes du catalogue
+    modèle (company_id NULL) qu'elle n'a ni surchargées ni masquées, plus
+    les siennes. Les règles Pricing servent de
+    repli aux éléments absents du catalogue ; pour la main d'œuvre et le
+    coefficient de perte elles priment sur Config, puis sur les valeurs
+    par défaut. Les champs incompatible_series des accessoires sont compilés
+    en un CompatibilityIndex.
+    """
+
+    __slots__ = ('company_id', 'version', 'chassis_types', 'profile_series',
+                 'glazing_types', 'finishes', 'accessories', 'compatibility', 'rules',
+                 'surcharges', 'vat_rate', 'loss_coefficient', 'labor_rule')
+
+    def __init__(self, company_id, version, chassis_types, profile_series,
+                 glazing_types, finishes, accessories, config, rules=None, surcharges=()):
+        rules = rules or {}
+        set_attr = object.__setattr__
+        set_attr(self, 'company_id', company_id)
+        set_attr(self, 'version', version)
+        set_attr(self, 'chassis_types', MappingProxyType(chassis_types))
+        set_attr(self, 'profile_series', MappingProxyType(profile_series))
+        set_attr(self, 'glazing_types', MappingProxyType(glazing_types))
+        set_attr(self, 'finishes', MappingProxyType(finishes))
+        set_attr(self, 'accessories', MappingProxyType(accessories))
+        set_attr(self, 'compatibility', CompatibilityIndex(
+            profile_series, ((a.name, a.incompatible_series) for a in accessories.values())))
+        set_attr(self, 'rules', MappingProxyType(rules))
+        set_attr(self, 'surcharges', tuple(surcharges))
+
+        vat_rate = config.get('vat_rate')
+        set_attr(self, 'vat_rate', float(vat_rate) / 100 if vat_rate is not None else DEFAULT_VAT_RATE)
+
+        loss_rule = rules.get(rule_key('loss_coefficient'))
+        loss_coefficient = config.get('loss_coefficient')
+        if loss_rule:
+            loss_coefficient = loss_rule.rate_for(0)
+        set_attr(self, 'loss_coefficient', float(loss_coefficient) if loss_coefficient is not None else DEFAULT_LOSS_COEFFICIENT)
+
+        labor_rule = rules.get(rule_key('labor'))
+        if not labor_rule:
+            labor_cost = config.get('labor_cost')
+            labor_rule = RateRule.flat('forfait', float(labor_cost) if labor_cost is not None else DEFAULT_LABOR_COST)
+        set_attr(self, 'labor_rule', labor_rule)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PriceBook is immutable')
+
+    @classmethod
+    def compile(cls, company_id, version):
+        """Charge le catalogue vu par l'entreprise (modèle + surcharges)"""
+        key = company_key(company_id)
+        versions = {(key, 'catalog'): version[0], (TEMPLATE_KEY, 'catalog'): version[1]}
+
+        def rows(model):
+            return catalog_rows(model, company_id, versions)
+
+        chassis_types = {
+            row['name']: ChassisEntry(row['name'], row['min_width'], row['max_width'],
+                                      row['min_height'], row['max_height'])
+            for row in rows(ChassisType)
+        }
+        profile_series = {
+            row['name']: ProfileEntry(row['name'], row['price_per_meter'])
+            for row in rows(ProfileSeries)
+        }
+        glazing_types = {
+            row['name']: GlazingEntry(row['name'], row['price_per_m2'])
+            for row in rows(GlazingType)
+        }
+        finishes = {
+            row['name']: FinishEntry(row['name'], row['price_coefficient'])
+            for row in rows(Finish)
+        }
+        accessories = {
+            row['name']: AccessoryEntry(row['name'], row['unit_price'], row['incompatible_series'])
+            for row in rows(Accessory)
+        }
+        config = {c.key: c.value for c in Config.query.filter(
+            Config.key.in_(['vat_rate', 'loss_coefficient', 'labor_cost'])).all()}
+        rules, surcharges = compile_rules(company_id)
+
+        return cls(company_id, version, chassis_types, profile_series,
+                   glazing_types, finishes, accessories, config, rules, surcharges)
+
+
+PRICING_CACHE_SIZE = int(os.environ.get('PRICING_CACHE_SIZE', '4096'))
+
+_books = {}
+_books_lock = threading.Lock()
+
+pricing_cache = LRUCache(PRICING_CACHE_SIZE)
+
+
+def _current_version(company_id):
+    key = company_key(company_id)
+    versions = get_versions([key, TEMPLATE_KEY])
+    return (
+        versions.get((key, 'catalog'), 0),
+        versions.get((TEMPLATE_KEY, 'catalog'), 0),
+        versions.get((TEMPLATE_KEY, 'config'), 0),
+    )
+
+
+def get_price_book(company_id):
+    """Retourne le catalogue compilé de l'entreprise depuis la mémoire du processus
+
+    À chaque appel, la version du catalogue en cache est comparée à celle
+    stockée en base (une seule lecture de data_versions) : une modification
+    faite par un autre processus n'est jamais servie en retard. Les écritures
+    du processus courant l'invalident en plus immédiatement au commit.
+    """
+    key = company_key(company_id)
+    version = _current_version(company_id)
+    cached = _books.get(key)
+    if cached and cached.version == version:
+        return cached
+
+    book = PriceBook.compile(company_id, version)
+    with _books_lock:
+        _books[key] = book
+    return book
+
+
+def set_config_value(key, value):
+    """Écrit une valeur de la table config (TVA, coefficient de perte, main
+    d'œuvre) dans la transaction courante
+
+    La version 'config' est incrémentée : tous les catalogues compilés, et
+    les prix mémorisés avec eux, sont recompilés après le commit.
+    """
+    config = Config.query.filter_by(key=key).first()
+    if config is None:
+        db.session.add(Config(key=key, value=str(value)))
+    else:
+        config.value = str(value)
+    bump_version(None, scope='config')
+
+
+def invalidate_price_books(keys=None):
+    """Supprime du cache les catalogues des entreprises données (tous si None)"""
+    with _books_lock:
+        if keys is None or TEMPLATE_KEY in keys:
+            _books.clear()
+        else:
+            for key in keys:
+                _books.pop(key, None)
+
+
+@on_versions_committed
+def _invalidate_committed(bumped):
+    invalidate_price_books({key for key, _ in bumped})
+
+
+def resolve_rates(book, data):
+    """Résout les tarifs unitaires d'une configuration (hors dimensions)
+
+    Un accessoire incompatible avec la série de profilé choisie est refusé
+    (PricingError).
+    """
+    glazing_type = data.get('glazingType')
+    profile_series = data.get('profileSeries')
+    glazing_obj = book.glazing_types.get(glazing_type)
+    profile_obj = book.profile_series.get(profile_series)
+    finish_obj = book.finishes.get(data.get('finish'))
+
+    if glazing_obj:
+        surface_rule = RateRule.flat('m2', glazing_obj.price_per_m2)
+    else:
+        surface_rule = book.rules.get(rule_key(glazing_type)) or DEFAULT_SURFACE_RULE
+
+    if profile_obj:
+        linear_rule = RateRule.flat('ml', profile_obj.price_per_meter)
+    else:
+        linear_rule = book.rules.get(rule_key(profile_series)) or DEFAULT_LINEAR_RULE
+
+    accessories = data.get('accessories') or {}
+    if not isinstance(accessories, dict):
+        raise PricingError('Accessories must be an object of {name: quantity}')
+
+    accessories_total = 0
+    accessories_detail = []
+    for acc_name, quantity in accessories.items():
+        quantity = _number(quantity, f'Quantity of accessory {acc_name} must be a valid number')
+        acc_obj = book.accessories.get(acc_name)
+        if acc_obj and quantity > 0:
+            if profile_obj and not book.compatibility.is_compatible(acc_name, profile_series):
+                raise PricingError(f'Accessory {acc_name} is not compatible with profile series {profile_series}')
+            price = acc_obj.unit_price * quantity
+            accessories_total += price
+            accessories_detail.append({
+                'name': acc_name,
+                'quantity': quantity,
+                'unit_price': round(acc_obj.unit_price, 2),
+                'total_price': round(price, 2)
+            })
+
+    return {
+        'surface_rule': surface_rule,
+        'linear_rule': linear_rule,
+        'finish_coefficient': finish_obj.price_coefficient if finish_obj else DEFAULT_FINISH_COEFFICIENT,
+        'accessories': accessories_detail,
+        'accessories_total': accessories_total
+    }
+
+
+def price_item(book, data):
+    """Calcule le détail du prix d'un article à partir du catalogue compilé"""
+    try:
+        width_mm = float(data.get('width', 0))
+        height_mm = float(data.get('height', 0))
+    except (ValueError, TypeError):
+        raise PricingError('Width and height must be valid numbers')
+
+    if width_mm <= 0 or height_mm <= 0:
+        raise PricingError('Width and height must be greater than 0')
+
+    chassis_type = data.get('chassisType')
+    discount = _number(data.get('discount') or 0, 'Discount must be a valid number')
+
+    if not chassis_type:
+        raise PricingError('Chassis type is required')
+    for field in ('chassisType', 'profileSeries', 'glazingType', 'finish'):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise PricingError(f'{field} must be a string')
+
+    chassis_limits = book.chassis_types.get(chassis_type)
+    if not chassis_limits:
+        raise PricingError(f'Invalid chassis type: {chassis_type}')
+
+    if not (chassis_limits.min_width <= width_mm <= chassis_limits.max_width):
+        raise PricingError(f'Width must be between {chassis_limits.min_width} and {chassis_limits.max_width} mm')
+    if not (chassis_limits.min_height <= height_mm <= chassis_limits.max_height):
+        raise PricingError(f'Height must be between {chassis_limits.min_height} and {chassis_limits.max_height} mm')
+
+    rates = resolve_rates(book, data)
+    finish_coef = rates['finish_coefficient']
+    accessories_total = rates['accessories_total']
+    vat_rate = book.vat_rate
+
+    surface_m2 = (width_mm * height_mm) / 1000000
+    perimeter_m = 2 * (width_mm + height_mm) / 1000
+
+    base_surface = rates['surface_rule'].amount(surface_m2, perimeter_m) * book.loss_coefficient
+    base_linear = rates['linear_rule'].amount(surface_m2, perimeter_m)
+
+    subtotal = (base_surface + base_linear + accessories_total) * finish_coef
+
+    surcharges_total = 0
+    surcharges_detail = []
+    for label, rule in book.surcharges:
+        amount = rule.amount(surface_m2, perimeter_m)
+        surcharges_total += amount
+        surcharges_detail.append({'name': label, 'amount': round(amount, 2)})
+
+    labor_price = book.labor_rule.amount(surface_m2, perimeter_m)
+
+    total_before_discount = subtotal + surcharges_total + labor_price
+    discount_amount = total_before_discount * (discount / 100)
+    total_ht = total_before_discount - discount_amount
+    total_ttc = total_ht * (1 + vat_rate)
+
+    return {
+        'surface_m2': round(surface_m2, 3),
+        'perimeter_m': round(perimeter_m, 2),
+        'base_price': round(base_surface + base_linear, 2),
+        'glazing_cost': round(base_surface, 2),
+        'profile_cost': round(base_linear, 2),
+        'accessories': rates['accessories'],
+        'accessories_cost': round(accessories_total, 2),
+        'finish_coefficient': finish_coef,
+        'finish_supplement': round((base_surface + base_linear) * (finish_coef - 1), 2),
+        'subtotal': round(subtotal, 2),
+        'surcharges': surcharges_detail,
+        'surcharges_cost': round(surcharges_total, 2),
+        'labor': round(labor_price, 2),
+        'total_before_discount': round(total_before_discount, 2),
+        'discount_percent': discount,
+        'discount_amount': round(discount_amount, 2),
+        'total_ht': round(total_ht, 2),
+        'vat_rate': round(vat_rate * 100, 2),
+        'vat_amount': round(total_ttc - total_ht, 2),
+        'total_price': round(total_ttc, 2)
+    }
+
+
+def _pricing_key(book, data):
+    """Clé normalisée d'une demande de prix, liée à la version du catalogue"""
+    try:
+        request_key = json.dumps([
+            float(data.get('width', 0)),
+            float(data.get('height', 0)),
+            data.get('chassisType'),
+            data.get('profileSeries'),
+            data.get('glazingType'),
+            data.get('finish'),
+            sorted((data.get('accessories') or {}).items()),
+            float(data.get('discount') or 0),
+        ], ensure_ascii=False)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return (company_key(book.company_id), book.version, request_key)
+
+
+def cached_price_item(book, data):
+    """price_item mémoïsé ; le résultat partagé ne doit pas être modifié"""
+    key = _pricing_key(book, data)
+    if key is None:
+        return price_item(book, data)
+
+    breakdown = pricing_cache.get(key)
+    if breakdown is None:
+        breakdown = price_item(book, data)
+        pricing_cache.set(key, breakdown)
+    return breakdown
+
+
+def price_batch(book, items, pricer=cached_price_item):
+    """Calcule plusieurs articles avec le même catalogue compilé
+
+    Les erreurs de validation sont rapportées article par article sans
+    interrompre le lot. Retourne (résultats, totaux). Les traitements de
+    masse passent pricer=price_item pour ne pas vider le cache des résultats.
+    """
+    results = []
+    total_ht = 0
+    total_ttc = 0
+    priced = 0
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'error': 'Item must be an object'})
+            continue
+
+        try:
+            quantity = int(item.get('quantity', 1))
+        except (ValueError, TypeError):
+            results.append({'index': index, 'error': 'Quantity must be a valid integer'})
+            continue
+        if quantity < 1:
+            results.append({'index': index, 'error': 'Quantity must be at least 1'})
+            continue
+
+        try:
+            breakdown = pricer(book, item)
+        except PricingError as e:
+            results.append({'index': index, 'error': str(e)})
+            continue
+
+        line_ht = breakdown['total_ht'] * quantity
+        line_ttc = breakdown['total_price'] * quantity
+        total_ht += line_ht
+        total_ttc += line_ttc
+        priced += 1
+
+        results.append({
+            'index': index,
+            'quantity': quantity,
+            'breakdown': breakdown,
+            'line_total_ht': round(line_ht, 2),
+            'line_total': round(line_ttc, 2)
+        })
+
+    totals = {
+        'items_priced': priced,
+        'items_failed': len(results) - priced,
+        'total_ht': round(total_ht, 2),
+        'vat_amount': round(total_ttc - total_ht, 2),
+        'total_price': round(total_ttc, 2)
+    }
+    return results, totals
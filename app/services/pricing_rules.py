@@ -0,0 +1,149 @@
+from bisect import bisect_right
+from app import db
+from app.models import Pricing
+
+UNIT_ALIASES = {
+    'm2': 'm2', 'm²': 'm2',
+    'ml': 'ml', 'm': 'ml',
+    'unit': 'unit', 'unité': 'unit', 'unite': 'unit', 'u': 'unit',
+    'forfait': 'forfait',
+}
+
+SURCHARGE_CATEGORY = 'surcharge'
+
+# Columns an admin may set on a pricing rule: (type, required on creation)
+RULE_FIELDS = {
+    'category': (str, True),
+    'subcategory': (str, False),
+    'unit': (str, True),
+    'price': (float, True),
+    'coefficient': (float, False),
+    'min_quantity': (float, False),
+}
+
+
+def normalize_unit(unit):
+    """Unité canonique (m2, ml, unit, forfait) ou None si inconnue"""
+    return UNIT_ALIASES.get((unit or '').strip().lower())
+
+
+def rule_values_error(values, creating):
+    """Message d'erreur pour les valeurs d'une règle tarifaire, ou None
+
+    Seules les colonnes de RULE_FIELDS sont acceptées ; les champs
+    facultatifs admettent null (min_quantity excepté).
+    """
+    if not isinstance(values, dict):
+        return 'Request body must be a JSON object'
+    for key, value in values.items():
+        if key not in RULE_FIELDS:
+            return f"Unknown field '{key}'"
+        expected, required = RULE_FIELDS[key]
+        if value is None:
+            if required or key == 'min_quantity':
+                return f"'{key}' is required"
+            continue
+        if expected is float:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return f"'{key}' must be a number"
+            if value < 0:
+                return f"'{key}' must not be negative"
+        elif not isinstance(value, str) or (required and not value.strip()):
+            return f"'{key}' must be a non-empty string" if required else f"'{key}' must be a string"
+
+    if creating:
+        missing = [key for key, (_, required) in RULE_FIELDS.items() if required and key not in values]
+        if missing:
+            return f"Missing field(s): {', '.join(missing)}"
+    if 'unit' in values and not normalize_unit(values['unit']):
+        return 'Unit must be one of m2, ml, unit, forfait'
+    return None
+
+
+def rule_key(category, subcategory=None):
+    return ((category or '').strip().lower(), (subcategory or '').strip().lower() or None)
+
+
+class RateRule:
+    """Tarif d'une composante, évalué selon son unité
+
+    - m2 : tarif × surface (m²)
+    - ml : tarif × périmètre (m)
+    - unit : tarif × nombre d'unités
+    - forfait : montant fixe
+
+    Les paliers (min_quantity croissants) rendent le tarif dégressif : le
+    palier retenu est le plus élevé dont le seuil est atteint par la mesure.
+    """
+
+    __slots__ = ('unit', 'thresholds', 'rates')
+
+    def __init__(self, unit, tiers):
+        tiers = sorted(tiers)
+        self.unit = unit
+        self.thresholds = tuple(threshold for threshold, _ in tiers)
+        self.rates = tuple(rate for _, rate in tiers)
+
+    @classmethod
+    def flat(cls, unit, rate):
+        return cls(unit, [(0, rate)])
+
+    def measure(self, surface_m2, perimeter_m, count=1):
+        if self.unit == 'm2':
+            return surface_m2
+        if self.unit == 'ml':
+            return perimeter_m
+        if self.unit == 'unit':
+            return count
+        return 1
+
+    def rate_for(self, measure):
+        index = bisect_right(self.thresholds, measure) - 1
+        return self.rates[max(index, 0)]
+
+    def amount(self, surface_m2, perimeter_m, count=1):
+        measure = self.measure(surface_m2, perimeter_m, count)
+        return self.rate_for(measure) * measure
+
+
+def compile_rules(company_id):
+    """Compile les lignes Pricing d'une entreprise en table de règles
+
+    Les règles de l'entreprise remplacent (paliers compris) les règles
+    globales de même catégorie/sous-catégorie. Retourne (règles, suppléments)
+    où règles est un dict {(catégorie, sous-catégorie): RateRule} et
+    suppléments une liste [(libellé, RateRule)].
+    """
+    query = db.session.query(
+        Pricing.company_id, Pricing.category, Pricing.subcategory, Pricing.unit,
+        Pricing.price, Pricing.coefficient, Pricing.min_quantity
+    )
+    if company_id is None:
+        query = query.filter(Pricing.company_id.is_(None))
+    else:
+        query = query.filter(db.or_(Pricing.company_id.is_(None), Pricing.company_id == company_id))
+
+    grouped = {}
+    for row in query.all():
+        unit = normalize_unit(row.unit)
+        if unit is None:
+            print(f"Ignoring pricing rule with unknown unit: {row.category} ({row.unit})")
+            continue
+        key = rule_key(row.category, row.subcategory)
+        rate = row.price * (row.coefficient if row.coefficient is not None else 1.0)
+        owner = 1 if row.company_id is not None else 0
+        grouped.setdefault(key, {}).setdefault(owner, []).append((unit, row.min_quantity or 0, rate))
+
+    rules = {}
+    for key, owners in grouped.items():
+        tiers = owners.get(1) or owners[0]
+        unit = tiers[0][0]
+        rules[key] = RateRule(unit, [(threshold, rate) for tier_unit, threshold, rate in tiers if tier_unit == unit])
+
+    surcharges = sorted(
+        ((subcategory or SURCHARGE_CATEGORY, rule)
+         for (category, subcategory), rule in rules.items()
+         if category == SURCHARGE_CATEGORY),
+        key=lambda surcharge: surcharge[0]
+    )
+    return rules, surcharges
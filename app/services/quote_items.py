@@ -0,0 +1,182 @@
+import json
+from app import db
+from app.models import Quote, QuoteItem
+
+CLIENT_FIELDS = ('client_name', 'client_email', 'client_phone', 'client_notes')
+
+# Profile/glazing/finish columns of a quote saved as a list of articles
+MULTI_ITEM_LABEL = 'Multiple'
+
+_LEGACY_COLUMNS = (
+    Quote.id, Quote.chassis_type, Quote.width, Quote.height, Quote.profile_series,
+    Quote.glazing_type, Quote.finish, Quote.accessories, Quote.discount_percent,
+    Quote.price_ht, Quote.price_ttc, Quote.details
+)
+
+
+def _int(value, default=0):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def item_values(position, spec, quantity, breakdown):
+    """Colonnes d'une ligne quote_items à partir d'une spécification d'article
+    (clés chassisType, width, … du calculateur) et de son détail de prix"""
+    breakdown = breakdown or {}
+    return {
+        'position': position,
+        'chassis_type': spec.get('chassisType') or spec.get('chassis_type') or '',
+        'width': _int(spec.get('width')),
+        'height': _int(spec.get('height')),
+        'profile_series': spec.get('profileSeries') or spec.get('profile_series'),
+        'glazing_type': spec.get('glazingType') or spec.get('glazing_type'),
+        'finish': spec.get('finish'),
+        'accessories': json.dumps(spec.get('accessories') or {}),
+        'discount_percent': breakdown.get('discount_percent', spec.get('discount')) or 0,
+        'quantity': max(_int(quantity, 1), 1),
+        'unit_price_ht': breakdown.get('total_ht', 0),
+        'unit_price_ttc': breakdown.get('total_price', 0),
+        'breakdown': json.dumps(breakdown)
+    }
+
+
+def is_multi_item(quote):
+    """Le devis a-t-il été créé comme devis multi-articles ?
+
+    Un devis simple a aussi sa ligne quote_items, mais reste présenté (API,
+    PDF) à partir des colonnes du devis, comme avant la table quote_items.
+    """
+    return (quote.item_count or 1) > 1 or quote.profile_series == MULTI_ITEM_LABEL
+
+
+def item_payload(item):
+    """Article au format historique de details['items'] (clés du calculateur)"""
+    return {
+        'chassisType': item.chassis_type,
+        'width': item.width,
+        'height': item.height,
+        'profileSeries': item.profile_series or '',
+        'glazingType': item.glazing_type or '',
+        'finish': item.finish or '',
+        'accessories': json.loads(item.accessories) if item.accessories else {},
+        'discount': item.discount_percent or 0,
+        'quantity': item.quantity,
+        'breakdown': json.loads(item.breakdown) if item.breakdown else {}
+    }
+
+
+def detail_items_values(items):
+    """Lignes quote_items des articles au format details['items'] (chaque
+    article porte sa quantité et son détail de prix) ; [] si ce n'est pas une liste"""
+    if not isinstance(items, list):
+        return []
+    return [
+        item_values(position, item, item.get('quantity', 1), item.get('breakdown'))
+        for position, item in enumerate(item for item in items if isinstance(item, dict))
+    ]
+
+
+def legacy_item_values(row, details):
+    """Lignes quote_items d'un devis enregistré avant la table quote_items
+
+    Les devis multiples sont repris de details['items'] ; un devis simple
+    devient un article unique à partir des colonnes du devis.
+    """
+    values = detail_items_values(details.get('items'))
+    if values:
+        return values
+
+    try:
+        accessories = json.loads(row.accessories) if row.accessories else {}
+    except ValueError:
+        accessories = {}
+    breakdown = {key: value for key, value in details.items() if key not in CLIENT_FIELDS}
+    breakdown.setdefault('total_ht', row.price_ht)
+    breakdown.setdefault('total_price', row.price_ttc)
+    spec = {
+        'chassisType': row.chassis_type,
+        'width': row.width,
+        'height': row.height,
+        'profileSeries': row.profile_series,
+        'glazingType': row.glazing_type,
+        'finish': row.finish,
+        'accessories': accessories,
+        'discount': row.discount_percent or 0
+    }
+    return [item_values(0, spec, 1, breakdown)]
+
+
+def backfill_quote_items(chunk_size=500, connection=None):
+    """Migre les devis enregistrés avant quote_items / client_name
+
+    Parcourt par paquets (pagination par id) les devis dont client_name
+    est NULL : crée leurs lignes quote_items si elles manquent, retire
+    'items' du JSON details et renseigne client_name et item_count.
+    Idempotent : les devis déjà migrés sont ignorés. Avec connection (une
+    migration Alembic), tout s'exécute dans la transaction de cette
+    connexion ; sinon chaque paquet est validé. Retourne
+    (devis migrés, lignes créées).
+    """
+    execute = (connection or db.session).execute
+    quote_table = Quote.__table__
+    update_quote = quote_table.update().where(
+        quote_table.c.id == db.bindparam('quote_key')
+    ).values(
+        details=db.bindparam('new_details'),
+        client_name=db.bindparam('new_client_name'),
+        item_count=db.bindparam('new_item_count')
+    )
+
+    existing_items = db.select(db.func.count(QuoteItem.id)).where(
+        QuoteItem.quote_id == Quote.id
+    ).scalar_subquery()
+
+    last_id = 0
+    quotes_done = 0
+    items_done = 0
+    while True:
+        rows = execute(db.select(*_LEGACY_COLUMNS, existing_items.label('existing_items')).where(
+            Quote.id > last_id,
+            Quote.client_name.is_(None)
+        ).order_by(Quote.id).limit(chunk_size)).all()
+        if not rows:
+            break
+
+        item_rows = []
+        quote_updates = []
+        for row in rows:
+            try:
+                details = json.loads(row.details) if row.details else {}
+                new_details = None
+            except ValueError:
+                # Unreadable JSON is kept as is
+                details = {}
+                new_details = row.details
+
+            item_count = row.existing_items
+            if not item_count:
+                values = legacy_item_values(row, details)
+                item_rows.extend({**value, 'quote_id': row.id} for value in values)
+                item_count = len(values)
+            details.pop('items', None)
+
+            quote_updates.append({
+                'quote_key': row.id,
+                'new_details': new_details or json.dumps(details),
+                'new_client_name': (details.get('client_name') or '')[:200],
+                'new_item_count': max(item_count, 1)
+            })
+
+        if item_rows:
+            execute(QuoteItem.__table__.insert(), item_rows)
+        execute(update_quote, quote_updates)
+        if connection is None:
+            db.session.commit()
+
+        quotes_done += len(rows)
+        items_done += len(item_rows)
+        last_id = rows[-1].id
+
+    return quotes_done, items_done
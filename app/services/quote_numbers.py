@@ -0,0 +1,77 @@
+from datetime import datetime
+from app import db
+from app.models import Quote, QuoteCounter
+from app.services.versions import company_key, dialect_insert
+
+QUOTE_NUMBER_PREFIX = 'DEV'
+
+_counters = QuoteCounter.__table__
+
+
+def format_quote_number(day, value):
+    return f"{QUOTE_NUMBER_PREFIX}-{day}-{value:04d}"
+
+
+def _increment(key, day):
+    """UPDATE … RETURNING sur le compteur existant, None s'il n'existe pas encore"""
+    return db.session.execute(
+        _counters.update()
+        .where(_counters.c.company_key == key, _counters.c.day == day)
+        .values(last_value=_counters.c.last_value + 1)
+        .returning(_counters.c.last_value)
+    ).scalar()
+
+
+def _last_legacy_number(company_id, day):
+    """Dernier numéro du jour attribué avant l'existence du compteur"""
+    prefix = f"{QUOTE_NUMBER_PREFIX}-{day}-"
+    owner = Quote.company_id.is_(None) if company_id is None else Quote.company_id == company_id
+    last_number = db.session.query(Quote.quote_number).filter(
+        owner,
+        Quote.quote_number.like(f"{prefix}%")
+    ).order_by(Quote.quote_number.desc()).limit(1).scalar()
+    return int(last_number.split('-')[-1]) if last_number else 0
+
+
+def _create(key, day, start):
+    """Crée le compteur du jour ; si un autre worker l'a créé entre-temps,
+    ON CONFLICT se replie sur l'incrément"""
+    insert = dialect_insert()
+    if insert is None:
+        counter = db.session.query(QuoteCounter).filter_by(
+            company_key=key, day=day
+        ).with_for_update().first()
+        if counter is None:
+            counter = QuoteCounter(company_key=key, day=day, last_value=start)
+            db.session.add(counter)
+        else:
+            counter.last_value += 1
+        db.session.flush()
+        return counter.last_value
+
+    stmt = insert(_counters).values(company_key=key, day=day, last_value=start)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['company_key', 'day'],
+        set_={'last_value': _counters.c.last_value + 1}
+    ).returning(_counters.c.last_value)
+    return db.session.execute(stmt).scalar()
+
+
+def allocate_quote_number(company_id, day=None):
+    """Attribue le prochain numéro DEV-AAAAMMJJ-NNNN de l'entreprise, sans réessai
+
+    L'incrément est une seule instruction atomique (UPDATE … RETURNING, ou
+    INSERT … ON CONFLICT DO UPDATE … RETURNING à la création du compteur) :
+    la ligne (entreprise, jour) reste verrouillée jusqu'au commit du devis,
+    deux enregistrements simultanés obtiennent donc deux numéros distincts.
+    Sous SQLite, cette écriture ouvre la transaction et prend immédiatement
+    le verrou d'écriture (équivalent de BEGIN IMMEDIATE). Le compteur est
+    amorcé avec le dernier numéro du jour déjà présent dans quotes.
+    """
+    day = day or datetime.now().strftime('%Y%m%d')
+    key = company_key(company_id)
+
+    value = _increment(key, day)
+    if value is None:
+        value = _create(key, day, _last_legacy_number(company_id, day) + 1)
+    return format_quote_number(day, value)
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta
+from app import db
+from app.models import Quote, QuoteDailyRollup
+from app.services.versions import company_key
+
+MAX_RECENT_QUOTES = 500
+
+
+def _scoped_queries(company_id, role):
+    """Devis et agrégats journaliers visibles par l'utilisateur"""
+    if role == 'super_admin':
+        return Quote.query, QuoteDailyRollup.query
+    if company_id:
+        return (Quote.query.filter_by(company_id=company_id),
+                QuoteDailyRollup.query.filter_by(company_key=company_key(company_id)))
+    return (Quote.query.filter_by(company_id=None),
+            QuoteDailyRollup.query.filter_by(company_key=company_key(None)))
+
+
+def quote_stats(company_id, role):
+    """Indicateurs du tableau de bord, lus dans quote_daily_rollups
+
+    Seul le meilleur client interroge quotes, via l'index (company_id, client_name).
+    """
+    query, rollups = _scoped_queries(company_id, role)
+
+    now = datetime.now()
+    current_month = now.strftime('%Y-%m')
+    week_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
+
+    # Daily rollups are keyed by the ISO 'YYYY-MM-DD' quote date, so ranges compare lexically
+    in_month = QuoteDailyRollup.day.between(f'{current_month}-01', f'{current_month}-31')
+    in_week = QuoteDailyRollup.day >= week_start
+
+    totals = rollups.with_entities(
+        db.func.coalesce(db.func.sum(QuoteDailyRollup.quote_count), 0),
+        db.func.coalesce(db.func.sum(QuoteDailyRollup.total_ttc), 0),
+        db.func.coalesce(db.func.sum(db.case((in_month, QuoteDailyRollup.quote_count), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((in_month, QuoteDailyRollup.total_ttc), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((in_week, QuoteDailyRollup.quote_count), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((in_week, QuoteDailyRollup.total_ttc), else_=0)), 0),
+        db.func.coalesce(db.func.sum(QuoteDailyRollup.item_count), 0)
+    ).one()
+    (total, total_amount, this_month_count, this_month_amount,
+     this_week_count, this_week_amount, total_items) = totals
+
+    top_client = query.filter(
+        Quote.client_name.isnot(None),
+        Quote.client_name.notin_(['', '-'])
+    ).with_entities(Quote.client_name).group_by(Quote.client_name).order_by(
+        db.func.count(Quote.id).desc()
+    ).limit(1).scalar()
+
+    return {
+        'total': total,
+        'totalAmount': round(total_amount, 2),
+        'thisMonth': this_month_count,
+        'thisMonthAmount': round(this_month_amount, 2),
+        'thisWeek': this_week_count,
+        'thisWeekAmount': round(this_week_amount, 2),
+        'totalItems': total_items,
+        'topClient': top_client or '-'
+    }
+
+
+def recent_quotes(company_id, role, limit=10):
+    """Derniers devis (au plus MAX_RECENT_QUOTES), en une requête sur les
+    seules colonnes affichées"""
+    limit = min(max(limit or 10, 1), MAX_RECENT_QUOTES)
+    query, _ = _scoped_queries(company_id, role)
+
+    rows = query.with_entities(
+        Quote.id, Quote.quote_number, Quote.quote_date, Quote.price_ttc,
+        Quote.chassis_type, Quote.client_name, Quote.created_at
+    ).order_by(Quote.created_at.desc()).limit(limit).all()
+
+    # Quotes saved before client_name existed: one extra query for their details
+    legacy_ids = [row.id for row in rows if row.client_name is None]
+    legacy_clients = {}
+    if legacy_ids:
+        for quote_id, quote_details in db.session.query(Quote.id, Quote.details).filter(Quote.id.in_(legacy_ids)):
+            try:
+                details = json.loads(quote_details) if quote_details else {}
+                legacy_clients[quote_id] = details.get('client_name', '-')
+            except ValueError:
+                legacy_clients[quote_id] = '-'
+
+    result = []
+    for row in rows:
+        client_name = row.client_name if row.client_name is not None else legacy_clients.get(row.id, '-')
+        result.append({
+            'id': row.id,
+            'quote_number': row.quote_number,
+            'quote_date': row.quote_date,
+            'total_price': round(row.price_ttc, 2),
+            'chassis_type_name': row.chassis_type,
+            'client_name': client_name or '-',
+            'created_at': row.created_at.isoformat() if row.created_at else None
+        })
+    return result
@@ -0,0 +1,161 @@
+import os
+import json
+from app import db
+from app.models import Quote, QuoteItem
+from app.services.pricing import get_price_book, price_batch, price_item
+
+REPRICE_CHUNK_SIZE = int(os.environ.get('REPRICE_CHUNK_SIZE', 500))
+
+_QUOTE_COLUMNS = (
+    Quote.id, Quote.quote_number, Quote.chassis_type, Quote.width, Quote.height,
+    Quote.profile_series, Quote.glazing_type, Quote.finish, Quote.accessories,
+    Quote.discount_percent, Quote.price_ht, Quote.price_ttc, Quote.details
+)
+
+
+_ITEM_COLUMNS = (
+    QuoteItem.quote_id, QuoteItem.chassis_type, QuoteItem.width, QuoteItem.height,
+    QuoteItem.profile_series, QuoteItem.glazing_type, QuoteItem.finish,
+    QuoteItem.accessories, QuoteItem.discount_percent, QuoteItem.quantity
+)
+
+
+def _company_filter(company_id):
+    if company_id is None:
+        return Quote.company_id.is_(None)
+    return Quote.company_id == company_id
+
+
+def _iter_quote_chunks(company_id, chunk_size):
+    """Parcourt les devis par paquets, pagination par clé (id croissant)
+
+    Seules les colonnes utiles sont lues (pas d'objets ORM), la mémoire
+    reste constante quel que soit le nombre de devis.
+    """
+    last_id = 0
+    while True:
+        rows = db.session.query(*_QUOTE_COLUMNS).filter(
+            _company_filter(company_id),
+            Quote.id > last_id
+        ).order_by(Quote.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _load_item_specs(quote_ids):
+    """Articles des devis d'un paquet, lus en une requête dans quote_items"""
+    specs = {}
+    rows = db.session.query(*_ITEM_COLUMNS).filter(
+        QuoteItem.quote_id.in_(quote_ids)
+    ).order_by(QuoteItem.quote_id, QuoteItem.position)
+    for item in rows:
+        specs.setdefault(item.quote_id, []).append({
+            'chassisType': item.chassis_type,
+            'width': item.width,
+            'height': item.height,
+            'profileSeries': item.profile_series,
+            'glazingType': item.glazing_type,
+            'finish': item.finish,
+            'accessories': json.loads(item.accessories) if item.accessories else {},
+            'discount': item.discount_percent or 0,
+            'quantity': item.quantity
+        })
+    return specs
+
+
+def _legacy_item_specs(row):
+    """Articles d'un devis sans lignes quote_items : details['items'] ou,
+    pour un devis simple, la configuration enregistrée dans ses colonnes"""
+    try:
+        details = json.loads(row.details) if row.details else {}
+    except ValueError:
+        details = {}
+
+    items = details.get('items')
+    if items:
+        return items
+
+    try:
+        accessories = json.loads(row.accessories) if row.accessories else {}
+    except ValueError:
+        accessories = {}
+    return [{
+        'chassisType': row.chassis_type,
+        'width': row.width,
+        'height': row.height,
+        'profileSeries': row.profile_series,
+        'glazingType': row.glazing_type,
+        'finish': row.finish,
+        'accessories': accessories,
+        'discount': row.discount_percent or 0
+    }]
+
+
+def reprice_quote(book, row, specs=None):
+    """Ligne du rapport : ancien et nouveau montant HT/TTC d'un devis"""
+    if not specs:
+        specs = _legacy_item_specs(row)
+
+    results, totals = price_batch(book, specs, pricer=price_item)
+    entry = {
+        'quote_id': row.id,
+        'quote_number': row.quote_number,
+        'old_ht': round(row.price_ht, 2),
+        'old_ttc': round(row.price_ttc, 2),
+        'new_ht': totals['total_ht'],
+        'new_ttc': totals['total_price'],
+        'delta_ht': round(totals['total_ht'] - row.price_ht, 2),
+        'delta_ttc': round(totals['total_price'] - row.price_ttc, 2)
+    }
+    if totals['items_failed']:
+        entry['errors'] = [r for r in results if 'error' in r]
+    return entry
+
+
+def run_reprice_job(progress, company_id, chunk_size=REPRICE_CHUNK_SIZE):
+    """Recalcule tous les devis d'une entreprise avec le catalogue courant
+
+    Écrit un rapport JSON Lines (une ligne par devis) et retourne
+    (résumé, chemin du rapport).
+    """
+    total = db.session.query(db.func.count(Quote.id)).filter(_company_filter(company_id)).scalar()
+    progress.update(0, total)
+
+    book = get_price_book(company_id)
+    report_path = progress.result_path('jsonl')
+    tmp_path = report_path + '.tmp'
+
+    summary = {
+        'catalog_version': list(book.version),
+        'quotes': 0,
+        'changed': 0,
+        'failed': 0,
+        'old_total_ttc': 0,
+        'new_total_ttc': 0
+    }
+
+    with open(tmp_path, 'w', encoding='utf-8') as report:
+        for rows in _iter_quote_chunks(company_id, chunk_size):
+            item_specs = _load_item_specs([row.id for row in rows])
+            for row in rows:
+                entry = reprice_quote(book, row, item_specs.get(row.id))
+                report.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+                summary['quotes'] += 1
+                summary['old_total_ttc'] += row.price_ttc
+                summary['new_total_ttc'] += entry['new_ttc']
+                if 'errors' in entry:
+                    summary['failed'] += 1
+                elif entry['delta_ttc']:
+                    summary['changed'] += 1
+
+            progress.update(summary['quotes'])
+
+    os.replace(tmp_path, report_path)
+
+    summary['old_total_ttc'] = round(summary['old_total_ttc'], 2)
+    summary['new_total_ttc'] = round(summary['new_total_ttc'], 2)
+    summary['delta_ttc'] = round(summary['new_total_ttc'] - summary['old_total_ttc'], 2)
+    return summary, report_path
@@ -0,0 +1,66 @@
+from app import db
+from app.models import Quote, QuoteDailyRollup
+from app.services.versions import company_key, dialect_insert, bump_version
+
+_rollups = QuoteDailyRollup.__table__
+
+
+def record_quote(quote, sign=1):
+    """Répercute la création (sign=1) ou la suppression (sign=-1) d'un devis
+    sur son agrégat journalier, dans la transaction courante
+
+    L'incrément est un upsert atomique : deux enregistrements simultanés
+    le même jour ne perdent aucune mise à jour.
+    """
+    key = company_key(quote.company_id)
+    deltas = {
+        'quote_count': sign,
+        'total_ht': sign * (quote.price_ht or 0),
+        'total_ttc': sign * (quote.price_ttc or 0),
+        'item_count': sign * (quote.item_count or 1)
+    }
+
+    insert = dialect_insert()
+    if insert is None:
+        rollup = db.session.get(QuoteDailyRollup, (key, quote.quote_date), with_for_update=True)
+        if rollup is None:
+            rollup = QuoteDailyRollup(company_key=key, day=quote.quote_date,
+                                      quote_count=0, total_ht=0, total_ttc=0, item_count=0)
+            db.session.add(rollup)
+        for column, delta in deltas.items():
+            setattr(rollup, column, getattr(rollup, column) + delta)
+        return
+
+    stmt = insert(_rollups).values(company_key=key, day=quote.quote_date, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['company_key', 'day'],
+        set_={column: _rollups.c[column] + delta for column, delta in deltas.items()}
+    )
+    db.session.execute(stmt)
+
+
+def rebuild_rollups():
+    """Régénère quote_daily_rollups depuis l'historique des devis
+
+    Un seul INSERT … SELECT … GROUP BY, exécuté dans une transaction.
+    Retourne le nombre de lignes créées.
+    """
+    key = db.func.coalesce(Quote.company_id, 0)
+    grouped = db.select(
+        key,
+        Quote.quote_date,
+        db.func.count(Quote.id),
+        db.func.coalesce(db.func.sum(Quote.price_ht), 0),
+        db.func.coalesce(db.func.sum(Quote.price_ttc), 0),
+        db.func.coalesce(db.func.sum(Quote.item_count), 0)
+    ).group_by(key, Quote.quote_date)
+
+    db.session.execute(_rollups.delete())
+    result = db.session.execute(_rollups.insert().from_select(
+        ['company_key', 'day', 'quote_count', 'total_ht', 'total_ttc', 'item_count'],
+        grouped
+    ))
+    for (key,) in db.session.query(QuoteDailyRollup.company_key).distinct():
+        bump_version(key, scope='quotes')
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,79 @@
+from app import db
+from app.models import DataVersion
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+TEMPLATE_KEY = 0
+
+_commit_listeners = []
+
+
+def company_key(company_id):
+    """Clé de version d'une entreprise (0 = catalogue modèle / config globale)"""
+    return company_id or TEMPLATE_KEY
+
+
+def dialect_insert():
+    """insert() du dialecte courant (gère ON CONFLICT) ou None si non supporté"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def bump_version(company_id, scope='catalog'):
+    """Incrémente la version d'un périmètre de données dans la transaction courante
+
+    L'invalidation des caches locaux est différée jusqu'au commit, de sorte
+    qu'aucun autre thread ne reconstruise un cache sur des données non validées.
+    """
+    key = company_key(company_id)
+    insert = dialect_insert()
+
+    if insert is not None:
+        stmt = insert(DataVersion).values(company_key=key, scope=scope, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['company_key', 'scope'],
+            set_={'version': DataVersion.version + 1}
+        )
+        db.session.execute(stmt)
+    else:
+        row = db.session.get(DataVersion, (key, scope))
+        if row:
+            row.version = row.version + 1
+        else:
+            db.session.add(DataVersion(company_key=key, scope=scope, version=1))
+
+    db.session.info.setdefault('bumped_versions', set()).add((key, scope))
+
+
+def get_versions(keys):
+    """Retourne {(company_key, scope): version} pour les entreprises demandées"""
+    rows = db.session.query(
+        DataVersion.company_key, DataVersion.scope, DataVersion.version
+    ).filter(DataVersion.company_key.in_(set(keys))).all()
+    return {(row.company_key, row.scope): row.version for row in rows}
+
+
+def on_versions_committed(callback):
+    """Enregistre un callback appelé avec les (company_key, scope) validés"""
+    _commit_listeners.append(callback)
+    return callback
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_committed_versions(session):
+    bumped = session.info.pop('bumped_versions', None)
+    if not bumped:
+        return
+    for callback in _commit_listeners:
+        callback(bumped)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_bumped_versions(session):
+    session.info.pop('bumped_versions', None)
@@ -0,0 +1,23 @@
+class ChunkSink:
+    """Fichier en écriture seule où zipfile écrit ; les octets sont repris
+    par drain() au fil de l'eau (zipfile passe en mode non seekable)"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
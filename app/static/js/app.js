@@ -24,6 +24,8 @@ const state = {
         finishes: [],
         accessories: []
     },
+    // {series: [...], incompatible: {accessoryName: hexMask}}, bit i = series[i]
+    compatibility: { series: [], incompatible: {} },
     breakdown: null
 };
 
@@ -36,48 +38,37 @@ function formatMAD(amount) {
     }) + ' MAD';
 }
 
-// Authentication
-async function checkAuth() {
-    try {
-        const response = await fetch('/api/auth/check', { credentials: 'include' });
-        if (!response.ok) {
-            window.location.href = '/login.html';
-            return false;
-        }
-        return true;
-    } catch (error) {
-        window.location.href = '/login.html';
-        return false;
-    }
-}
-
 // Loading Indicator
 function showLoading(show) {
     document.getElementById('loading').style.display = show ? 'flex' : 'none';
 }
 
-// Load Catalog
+// Load Catalog: one request for the whole wizard, revalidated with its ETag
 async function loadCatalog() {
     try {
-        const [chassisTypes, profileSeries, glazingTypes, finishes, accessories] = await Promise.all([
-            fetch('/api/catalog/chassis-types', { credentials: 'include' }).then(r => r.json()),
-            fetch('/api/catalog/profile-series', { credentials: 'include' }).then(r => r.json()),
-            fetch('/api/catalog/glazing-types', { credentials: 'include' }).then(r => r.json()),
-            fetch('/api/catalog/finishes', { credentials: 'include' }).then(r => r.json()),
-            fetch('/api/catalog/accessories', { credentials: 'include' }).then(r => r.json())
-        ]);
+        const response = await fetch('/api/bootstrap/quote-wizard', { credentials: 'include' });
+        if (response.status === 401) {
+            window.location.href = '/login.html';
+            return false;
+        }
+        if (!response.ok) {
+            throw new Error('Failed to load catalog');
+        }
         
-        state.catalog = { chassisTypes, profileSeries, glazingTypes, finishes, accessories };
+        const data = await response.json();
+        state.catalog = data.catalog;
+        state.compatibility = data.compatibility || state.compatibility;
         
         renderChassisTypes();
         renderProfileSeries();
         renderGlazingTypes();
         renderFinishes();
         renderAccessories();
-        
+        return true;
     } catch (error) {
         console.error('Error loading catalog:', error);
         alert('Erreur lors du chargement du catalogue');
+        return false;
     }
 }
 
@@ -253,7 +244,7 @@ function renderAccessories() {
             categories[category].forEach(acc => {
                 const qty = state.data.accessories[acc.name] || 0;
                 html += `
-                    <div class="accessory-item-new" data-name="${acc.name}" data-price="${acc.unit_price}" data-incompatible="${acc.incompatible_series || ''}">
+                    <div class="accessory-item-new" data-name="${acc.name}" data-price="${acc.unit_price}">
                         <div class="accessory-details">
                             <div class="accessory-name">${acc.name}</div>
                             <div class="accessory-price">${formatMAD(acc.unit_price)}</div>
@@ -327,15 +318,21 @@ function updateAccessoryTotal() {
     }
 }
 
+// Same check as the server: bit of the selected series in the accessory mask
+function isAccessoryCompatible(name, series) {
+    const bit = state.compatibility.series.indexOf(series);
+    const mask = state.compatibility.incompatible[name];
+    if (bit < 0 || !mask) return true;
+    return ((BigInt('0x' + mask) >> BigInt(bit)) & 1n) === 0n;
+}
+
 function checkAccessoryCompatibility() {
     const container = document.getElementById('accessoriesOptions');
     const warning = document.getElementById('incompatibilityWarning');
     let hasIncompatibility = false;
     
     container.querySelectorAll('.accessory-item-new').forEach(item => {
-        const incompatible = item.dataset.incompatible;
-        
-        if (incompatible && incompatible === state.data.profileSeries) {
+        if (!isAccessoryCompatible(item.dataset.name, state.data.profileSeries)) {
             item.classList.add('disabled');
             const name = item.dataset.name;
             delete state.data.accessories[name];
@@ -604,6 +601,21 @@ function showToast(message, type = 'info') {
     }, 3000);
 }
 
+// Raw article spec priced by the server (/calculate-batch, quote save)
+function itemSpec(item) {
+    return {
+        chassisType: item.chassisType,
+        width: item.width,
+        height: item.height,
+        profileSeries: item.profileSeries,
+        glazingType: item.glazingType,
+        finish: item.finish,
+        accessories: item.accessories || {},
+        discount: item.discount || 0,
+        quantity: item.quantity || 1
+    };
+}
+
 // Calculate Price
 async function calculateAndShowSummary() {
     // Collect client data
@@ -620,10 +632,13 @@ async function calculateAndShowSummary() {
     showLoading(true);
     
     try {
-        const response = await fetch('/api/quotes/calculate', {
+        // The article being configured and those already in the quote are
+        // priced in one round trip: the list totals follow the catalog too
+        const others = state.items.filter((_, index) => index !== state.editingItemIndex);
+        const response = await fetch('/api/quotes/calculate-batch', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(state.data),
+            body: JSON.stringify({ items: [...others, state.data].map(itemSpec) }),
             credentials: 'include'
         });
         
@@ -632,7 +647,15 @@ async function calculateAndShowSummary() {
             throw new Error(error.error || 'Erreur lors du calcul');
         }
         
-        state.breakdown = await response.json();
+        const results = (await response.json()).items;
+        const current = results[results.length - 1];
+        if (current.error) throw new Error(current.error);
+        
+        others.forEach((item, index) => {
+            if (!results[index].error) item.breakdown = results[index].breakdown;
+        });
+        state.breakdown = current.breakdown;
+        updateItemsList();
         renderSummary();
         showStep(8);
         
@@ -954,35 +977,20 @@ async function saveQuote() {
     showLoading(true);
     
     try {
-        // Use the first item's client info and calculate total
+        // Send raw item specs only: the server prices them when saving
         const firstItem = state.items[0];
-        const totalPrice = state.items.reduce((sum, item) => {
-            const quantity = item.quantity || 1;
-            return sum + (item.breakdown.total_price * quantity);
-        }, 0);
         
         const response = await fetch('/api/quotes', {
             method: 'POST',
             credentials: 'include',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
-                chassisType: `Devis multiple (${state.items.length} articles)`,
-                width: 0,
-                height: 0,
-                profileSeries: 'Multiple',
-                glazingType: 'Multiple',
-                finish: 'Multiple',
-                accessories: {},
                 clientName: firstItem.clientName,
                 clientEmail: firstItem.clientEmail,
                 clientPhone: firstItem.clientPhone,
                 clientNotes: firstItem.clientNotes,
-                breakdown: {
-                    items: state.items,
-                    total_price: totalPrice
-                }
-            }),
-            credentials: 'include'
+                items: state.items.map(itemSpec)
+            })
         });
         
         if (!response.ok) throw new Error('Save failed');
@@ -1004,7 +1012,7 @@ async function saveQuote() {
 // Generate PDF
 async function generatePDF(quoteId) {
     try {
-        const response = await fetch(`/api/quotes/${quoteId}/pdf`, { credentials: 'include' });
+        const response = await fetchQuotePdf(quoteId);
         
         if (!response.ok) throw new Error('PDF generation failed');
         
@@ -1136,9 +1144,7 @@ if ('serviceWorker' in navigator) {
 
 // Initialize
 async function init() {
-    if (await checkAuth()) {
-        await loadCatalog();
-        
+    if (await loadCatalog()) {
         // Check if we're in edit mode
         const urlParams = new URLSearchParams(window.location.search);
         const editId = urlParams.get('edit');
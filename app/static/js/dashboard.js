@@ -1,13 +1,19 @@
-async function checkAuth() {
+// One request per page load: user, stats and recent quotes.
+// The browser revalidates with the ETag and gets a 304 when nothing changed.
+async function loadDashboardData() {
     try {
-        const response = await fetch('/api/auth/check', { credentials: 'include' });
-        const data = await response.json();
+        const response = await fetch('/api/bootstrap/dashboard', { credentials: 'include' });
         
-        if (!data.authenticated) {
+        if (response.status === 401) {
             window.location.href = '/login.html';
-            return null;
+            return;
+        }
+        if (!response.ok) {
+            throw new Error('Failed to load dashboard data');
         }
         
+        const data = await response.json();
+        
         if (data.user && data.user.role === 'admin') {
             const settingsBtn = document.getElementById('settingsBtn');
             if (settingsBtn) {
@@ -15,30 +21,8 @@ async function checkAuth() {
             }
         }
         
-        return data.user;
-    } catch (error) {
-        console.error('Auth check failed:', error);
-        window.location.href = '/login.html';
-        return null;
-    }
-}
-
-async function loadDashboardData() {
-    try {
-        const [statsResponse, quotesResponse] = await Promise.all([
-            fetch('/api/quotes/stats', { credentials: 'include' }),
-            fetch('/api/quotes/recent', { credentials: 'include' })
-        ]);
-
-        if (!statsResponse.ok || !quotesResponse.ok) {
-            throw new Error('Failed to load dashboard data');
-        }
-
-        const stats = await statsResponse.json();
-        const quotes = await quotesResponse.json();
-
-        updateMetrics(stats);
-        displayRecentQuotes(quotes);
+        updateMetrics(data.stats);
+        displayRecentQuotes(data.recent);
     } catch (error) {
         console.error('Error loading dashboard:', error);
         showError('Erreur lors du chargement des données');
@@ -327,7 +311,7 @@ async function deleteQuote(quoteId) {
 
 async function downloadPDF(quoteId) {
     try {
-        const response = await fetch(`/api/quotes/${quoteId}/pdf`, { credentials: 'include' });
+        const response = await fetchQuotePdf(quoteId);
         
         if (!response.ok) {
             throw new Error('Failed to download PDF');
@@ -544,9 +528,7 @@ document.querySelectorAll('.nav-item').forEach(item => {
 document.getElementById('saveProfile').addEventListener('click', saveProfile);
 
 async function init() {
-    if (await checkAuth()) {
-        await loadDashboardData();
-    }
+    await loadDashboardData();
 }
 
 init();
@@ -0,0 +1,32 @@
+// Background jobs shared by the quote wizard and the dashboard.
+// Loaded before app.js / dashboard.js.
+const JOB_POLL_INTERVAL_MS = 1000;
+// Past this, stop polling: the server fails jobs that stop reporting progress
+const JOB_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
+// Poll /api/jobs/<id> until the job completes, then fetch its result
+async function waitForJobResult(jobId) {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const statusResponse = await fetch(`/api/jobs/${jobId}`, { credentials: 'include' });
+        if (!statusResponse.ok) return statusResponse;
+        const status = await statusResponse.json();
+        if (status.status === 'completed') {
+            return fetch(`/api/jobs/${jobId}/result`, { credentials: 'include' });
+        }
+        if (status.status === 'failed') {
+            throw new Error(status.error || 'Background job failed');
+        }
+    }
+    throw new Error('Background job is taking too long');
+}
+
+// Large quotes render in a background job: poll it, then download its result
+async function fetchQuotePdf(quoteId) {
+    const response = await fetch(`/api/quotes/${quoteId}/pdf?async=1`, { credentials: 'include' });
+    if (response.status !== 202) return response;
+
+    const job = await response.json();
+    return waitForJobResult(job.id);
+}
@@ -49,10 +49,23 @@ function formatCurrency(amount) {
     }).format(amount || 0);
 }
 
-async function loadCompanies() {
+let companiesCursor = null;
+let companiesHasMore = false;
+let companiesSearch = '';
+let companiesSearchTimer = null;
+
+async function loadCompanies(append = false) {
     try {
-        const response = await fetch('/api/super-admin/companies', { credentials: 'include' });
-        companies = await response.json();
+        const params = new URLSearchParams({ status: currentFilter });
+        if (companiesSearch) params.set('q', companiesSearch);
+        if (append && companiesCursor) params.set('cursor', companiesCursor);
+        
+        const response = await fetch(`/api/super-admin/companies?${params}`, { credentials: 'include' });
+        const data = await response.json();
+        
+        companies = append ? companies.concat(data.companies) : data.companies;
+        companiesCursor = data.next_cursor;
+        companiesHasMore = data.has_more;
         renderCompanies();
     } catch (error) {
         console.error('Error loading companies:', error);
@@ -62,11 +75,10 @@ async function loadCompanies() {
 
 function renderCompanies() {
     const tbody = document.getElementById('companiesTableBody');
+    document.getElementById('loadMoreCompaniesBtn').style.display = companiesHasMore ? 'inline-block' : 'none';
     
-    let filteredCompanies = companies;
-    if (currentFilter !== 'all') {
-        filteredCompanies = companies.filter(c => c.status === currentFilter);
-    }
+    // Status and name filters are applied server-side
+    const filteredCompanies = companies;
     
     if (filteredCompanies.length === 0) {
         tbody.innerHTML = '<tr><td colspan="8" style="text-align: center;">Aucune entreprise trouvée</td></tr>';
@@ -221,10 +233,20 @@ document.querySelectorAll('.filter-buttons button').forEach(btn => {
         document.querySelectorAll('.filter-buttons button').forEach(b => b.classList.remove('active'));
         e.target.classList.add('active');
         currentFilter = e.target.dataset.filter;
-        renderCompanies();
+        loadCompanies();
     });
 });
 
+document.getElementById('companySearch').addEventListener('input', (e) => {
+    clearTimeout(companiesSearchTimer);
+    companiesSearchTimer = setTimeout(() => {
+        companiesSearch = e.target.value.trim();
+        loadCompanies();
+    }, 300);
+});
+
+document.getElementById('loadMoreCompaniesBtn').addEventListener('click', () => loadCompanies(true));
+
 // Add Company Modal
 let currentStep = 1;
 
@@ -403,17 +425,6 @@ async function loadActivityLogs(page = 1) {
         currentPage = page;
         totalPages = data.pages;
         
-        const companiesResponse = await fetch('/api/super-admin/companies', { credentials: 'include' });
-        const companies = await companiesResponse.json();
-        
-        companies.forEach(company => {
-            if (company.users) {
-                company.users.forEach(user => {
-                    usersMap[user.id] = user.full_name || user.username;
-                });
-            }
-        });
-        
         renderActivityLogs(data.logs);
         updatePagination();
     } catch (error) {
@@ -1,13 +1,8 @@
-const CACHE_NAME = 'devis-menuiserie-v2-20251004';
+// Development copy. `python build_css.py` writes dist/sw.js with the hashed
+// asset list from the manifest and a cache name derived from it.
+const CACHE_NAME = 'devis-menuiserie-dev';
 const urlsToCache = [
-  '/',
-  '/static/css/styles.css',
-  '/static/css/tailwind.css',
-  '/static/js/app.js',
-  '/static/js/dashboard.js',
-  '/static/js/settings.js',
-  '/static/js/profile.js',
-  '/static/js/super_admin.js'
+  '/'
 ];
 
 self.addEventListener('install', event => {
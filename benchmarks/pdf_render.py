@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Quote PDF rendering benchmark
+Renders 1-, 20- and 200-item quotes and reports ms per PDF with styles built
+for every render (previous behaviour of the PDF route) and with the
+process-wide styles of app.services.pdf_renderer
+
+    python benchmarks/pdf_render.py --sizes 1,20,200 --runs 20
+
+No database needed: quotes are synthetic documents.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.pdf_renderer import PdfStyles, get_styles, render_quote_pdf
+
+
+def make_document(item_count):
+    breakdown = {
+        'surface_m2': 1.2, 'perimeter_m': 4.4, 'base_price': 279.4, 'glazing_cost': 125.4,
+        'accessories_cost': 36.0, 'finish_supplement': 0.0, 'total_ht': 444.25, 'total_price': 533.1
+    }
+    items = [{
+        'chassisType': 'Fenêtre 2 vantaux', 'width': 1000 + i, 'height': 1200,
+        'profileSeries': 'Série Fine', 'glazingType': '4/16/4 Double', 'finish': 'Anodisé bronze',
+        'accessories': {'Crémone': 1, 'Charnière invisible (unité)': 4}, 'discount': 0,
+        'quantity': 1 + i % 3, 'breakdown': breakdown
+    } for i in range(item_count)]
+    return {
+        'quote_number': 'DEV-20240101-001',
+        'quote_date': '2024-01-01',
+        'company': {'name': 'Menuiserie Bench', 'address': '1 rue du Banc', 'phone': '0600000000',
+                    'email': 'bench@example.com'},
+        'client': {'name': 'Client Bench', 'phone': '0611111111', 'email': 'client@example.com'},
+        'items': items,
+        'single': None
+    }
+
+
+def measure(document, runs, fresh_styles):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        styles = PdfStyles() if fresh_styles else None
+        render_quote_pdf(document, styles)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,20,200', help='item counts to render')
+    parser.add_argument('--runs', type=int, default=20, help='renders per size and mode (default: 20)')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    # Warm-up: imports, font metrics, first-use caches inside ReportLab
+    get_styles()
+    render_quote_pdf(make_document(1))
+
+    print(f"{'items':>6}  {'per-render styles':>18}  {'hoisted styles':>15}  {'gain':>6}")
+    for size in sizes:
+        document = make_document(size)
+        before = measure(document, args.runs, fresh_styles=True)
+        after = measure(document, args.runs, fresh_styles=False)
+        print(f"{size:>6}  {before:>16.2f}ms  {after:>13.2f}ms  {(before - after) / before * 100:>5.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Dashboard stats latency benchmark
+Times GET /api/quotes/stats while the tenant grows
+
+    python benchmarks/stats_latency.py --sizes 1000,10000,50000
+
+Uses a throw-away SQLite file unless BENCH_DATABASE_URL is set.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp_dir = tempfile.mkdtemp(prefix='stats-latency-')
+os.environ['DATABASE_URL'] = os.environ.get(
+    'BENCH_DATABASE_URL', f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+)
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from app import create_app, db
+from app.models import Company, Quote, User
+from app.services.rollups import rebuild_rollups
+
+CLIENTS = [f'Client {i}' for i in range(500)]
+
+
+def insert_quotes(company_id, start, count):
+    today = datetime.now()
+    rows = []
+    for i in range(start, start + count):
+        items = random.randint(1, 5)
+        client_name = random.choice(CLIENTS)
+        rows.append({
+            'quote_number': f'BENCH-{company_id}-{i:07d}',
+            'quote_date': (today - timedelta(days=random.randint(0, 365))).strftime('%Y-%m-%d'),
+            'chassis_type': f'Devis multiple ({items} articles)',
+            'width': 0, 'height': 0, 'profile_series': 'Multiple', 'glazing_type': 'Multiple',
+            'finish': 'Multiple', 'accessories': '{}', 'discount_percent': 0,
+            'price_ht': 1000.0, 'price_ttc': 1200.0,
+            'details': json.dumps({'client_name': client_name, 'total_price': 1200.0}),
+            'client_name': client_name, 'item_count': items, 'company_id': company_id
+        })
+    db.session.execute(Quote.__table__.insert(), rows)
+    db.session.commit()
+    rebuild_rollups()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,50000', help='quote counts to measure')
+    parser.add_argument('--runs', type=int, default=7, help='requests per size (default: 7)')
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        company = Company(name=f'Bench {time.time()}', status='approved')
+        db.session.add(company)
+        db.session.flush()
+        user = User(username=f'bench{company.id}', email=f'bench{company.id}@example.com',
+                    role='admin', company_id=company.id)
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        company_id, username = company.id, user.username
+
+    client = app.test_client()
+    client.post('/api/auth/login', json={'username': username, 'password': 'bench'})
+
+    print(f"{'quotes':>8}  {'median':>9}  {'p95':>9}")
+    inserted = 0
+    for size in sizes:
+        with app.app_context():
+            insert_quotes(company_id, inserted, size - inserted)
+        inserted = size
+
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            response = client.get('/api/quotes/stats')
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.data
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{size:>8}  {statistics.median(timings) * 1000:>7.1f}ms  {p95 * 1000:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
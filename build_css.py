@@ -1,13 +1,52 @@
 #!/usr/bin/env python3
 """
 Tailwind CSS Build Script - 100% Python (No Node.js)
-Uses standalone Tailwind binary for CSS compilation
+Uses standalone Tailwind binary for CSS compilation, then builds the
+fingerprinted static assets served in production:
+
+- JS: one minified bundle per page script
+- CSS: unused rules stripped from styles.css, everything minified
+- name.<hash>.ext files in app/static/dist + manifest.json for asset_url()
+- .gz (and .br when the `brotli` package is installed) siblings
+- dist/sw.js with a precache list and cache name derived from the manifest
 """
+import gzip
+import hashlib
+import json
+import re
 import subprocess
 import sys
 import os
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path("app/static")
+DIST_DIR = STATIC_DIR / "dist"
+TEMPLATES_DIR = Path("app/templates")
+
+# Logical name -> sources concatenated in order. Pages each load a single
+# script and the scripts share global names (init, showToast, checkAuth...),
+# so they are bundled per page rather than into one file.
+JS_BUNDLES = {
+    "js/app.js": ["js/app.js"],
+    "js/dashboard.js": ["js/dashboard.js"],
+    "js/settings.js": ["js/settings.js"],
+    "js/profile.js": ["js/profile.js"],
+    "js/super_admin.js": ["js/super_admin.js"],
+    "js/i18n.js": ["js/i18n.js"],
+    "js/jobs.js": ["js/jobs.js"],
+}
+# Stylesheets; pruned ones lose the rules no template or script can match.
+# tailwind.css already comes out of the binary purged and minified.
+CSS_ASSETS = {
+    "css/styles.css": {"prune": True, "minify": True},
+    "css/tailwind.css": {"prune": False, "minify": False},
+}
+
 def build_css(minify=True, watch=False):
     """
     Compile Tailwind CSS using the standalone binary
@@ -53,9 +92,383 @@ def build_css(minify=True, watch=False):
         print("\n⏹️  Watch mode stopped")
         return 0
 
+# ---------------------------------------------------------------------------
+# JS minification
+# ---------------------------------------------------------------------------
+
+_JS_WORD = re.compile(r"[\w$]")
+_JS_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_JS_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new",
+                      "delete", "void", "throw", "instanceof", "yield", "await"}
+
+
+def _skip_string(src, i):
+    """Index just past the string literal starting at src[i]"""
+    quote = src[i]
+    i += 1
+    while i < len(src) and src[i] != quote:
+        i += 2 if src[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_template(src, i):
+    """Scan template text from src[i]; returns (end, True) at '${' or (end, False) past '`'"""
+    while i < len(src):
+        if src[i] == "\\":
+            i += 2
+        elif src[i] == "`":
+            return i + 1, False
+        elif src.startswith("${", i):
+            return i + 2, True
+        else:
+            i += 1
+    return i, False
+
+
+def _skip_regex(src, i):
+    i += 1
+    in_class = False
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(src) and src[i].isalpha():
+        i += 1
+    return i
+
+
+def minify_js(src):
+    """Drop comments and indentation, collapse blank lines
+
+    Line breaks are kept wherever the source had one, except next to
+    punctuation where they can't end a statement, so automatic semicolon
+    insertion behaves exactly as in the original.
+    """
+    out = []
+    last = ""          # previous token, to tell a regex literal from a division
+    pending = ""       # whitespace seen since the previous token
+    templates = []     # open braces inside each active ${...} substitution
+    i, n = 0, len(src)
+
+    def emit(text):
+        nonlocal pending
+        if out:
+            prev = out[-1][-1]
+            if "\n" in pending and prev not in "{[(,;:" and text[0] not in "}]),;":
+                out.append("\n")
+            elif pending and ((_JS_WORD.match(prev) and _JS_WORD.match(text[0]))
+                              or (prev in "+-" and text[0] == prev)):
+                out.append(" ")
+        pending = ""
+        out.append(text)
+
+    while i < n:
+        c = src[i]
+        if c in " \t\r\n":
+            pending += c
+            i += 1
+        elif src.startswith("//", i):
+            i = src.find("\n", i)
+            i = n if i == -1 else i
+        elif src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            pending += "\n" if "\n" in src[i:end] else " "
+            i = end
+        elif c in "'\"":
+            end = _skip_string(src, i)
+            emit(src[i:end])
+            last, i = "a", end
+        elif c == "`" or (c == "}" and templates and templates[-1] == 0):
+            if c == "}":
+                templates.pop()
+            end, substitution = _skip_template(src, i + 1)
+            emit(src[i:end])
+            if substitution:
+                templates.append(0)
+                last = "{"
+            else:
+                last = "a"
+            i = end
+        elif c == "/" and (not last or last in _JS_REGEX_AFTER or last in _JS_REGEX_KEYWORDS):
+            end = _skip_regex(src, i)
+            emit(src[i:end])
+            last, i = "a", end
+        elif _JS_WORD.match(c):
+            end = i
+            while end < n and _JS_WORD.match(src[end]):
+                end += 1
+            emit(src[i:end])
+            last, i = src[i:end], end
+        else:
+            if templates and c == "{":
+                templates[-1] += 1
+            elif templates and c == "}":
+                templates[-1] -= 1
+            emit(c)
+            last, i = c, i + 1
+    return "".join(out).strip() + "\n"
+
+
+# ---------------------------------------------------------------------------
+# CSS pruning and minification
+# ---------------------------------------------------------------------------
+
+_CSS_NAME = re.compile(r"[.#](-?[_a-zA-Z][\w-]*)")
+_CSS_NOT = re.compile(r":not\([^)]*\)")
+_GROUPING_AT_RULES = ("@media", "@supports", "@layer", "@container")
+
+
+def _css_block_end(css, i):
+    """Index of the '}' closing the block opened at css[i]"""
+    depth = 0
+    while i < len(css):
+        c = css[i]
+        if c in "'\"":
+            i = _skip_string(css, i)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(css)
+
+
+def _collapse(text):
+    """Collapse whitespace outside of string literals"""
+    parts = re.split(r"""('(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*")""", text)
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts)).strip()
+
+
+def _minify_declarations(block):
+    declarations, depth, quote, start = [], 0, None, 0
+    for i, c in enumerate(block):
+        if quote:
+            quote = None if c == quote and block[i - 1] != "\\" else quote
+        elif c in "'\"":
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == ";" and depth == 0:
+            declarations.append(block[start:i])
+            start = i + 1
+    declarations.append(block[start:])
+
+    result = []
+    for declaration in declarations:
+        declaration = _collapse(declaration)
+        if ":" in declaration:
+            prop, value = declaration.split(":", 1)
+            result.append(f"{prop.strip()}:{value.strip()}")
+    return ";".join(result)
+
+
+def _minify_selector(selector):
+    return re.sub(r"\s*([,>])\s*", r"\1", _collapse(selector))
+
+
+def _selector_is_used(selector, used):
+    for name in _CSS_NAME.findall(_CSS_NOT.sub("", selector)):
+        if name not in used and not any(name.startswith(prefix) for prefix in used["-prefixes"]):
+            return False
+    return True
+
+
+def collect_used_names():
+    """Every identifier-like token of the templates and scripts
+
+    Deliberately generous: a class built in JS ('status-' + x) leaves its
+    prefix behind, and any class starting with such a prefix is kept.
+    """
+    tokens = set()
+    sources = list(TEMPLATES_DIR.rglob("*.html")) + list((STATIC_DIR / "js").glob("*.js"))
+    sources += list(STATIC_DIR.glob("*.html"))
+    for path in sources:
+        tokens.update(re.findall(r"[A-Za-z_][\w-]*", path.read_text(encoding="utf-8")))
+    used = dict.fromkeys(tokens, True)
+    used["-prefixes"] = tuple(token for token in tokens if token.endswith("-"))
+    return used
+
+
+def minify_css(css, used=None):
+    """Minify a stylesheet; with `used`, drop rules whose selectors can't match"""
+    css = re.sub(r"/\*(?!!).*?\*/", "", css, flags=re.S)
+    out = []
+    i = 0
+    while i < len(css):
+        brace = css.find("{", i)
+        semicolon = css.find(";", i)
+        if brace == -1 and semicolon == -1:
+            break
+        if semicolon != -1 and (brace == -1 or semicolon < brace):
+            # @import / @charset statements
+            out.append(_collapse(css[i:semicolon + 1]))
+            i = semicolon + 1
+            continue
+
+        prelude = css[i:brace].strip()
+        end = _css_block_end(css, brace)
+        body = css[brace + 1:end]
+        i = end + 1
+
+        if prelude.startswith("/*!"):
+            comment_end = prelude.index("*/") + 2
+            out.append(prelude[:comment_end] + "\n")
+            prelude = prelude[comment_end:].strip()
+        if prelude.startswith(_GROUPING_AT_RULES):
+            inner = minify_css(body, used)
+            if inner:
+                out.append(f"{_collapse(prelude)}{{{inner}}}")
+        elif prelude.startswith("@"):
+            # @keyframes, @font-face, @page...: kept whole
+            out.append(f"{_collapse(prelude)}{{{_minify_nested(body)}}}")
+        else:
+            selectors = [s for s in (_minify_selector(s) for s in _split_selectors(prelude)) if s]
+            if used is not None:
+                selectors = [s for s in selectors if _selector_is_used(s, used)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{_minify_declarations(body)}}}")
+    return "".join(out)
+
+
+def _minify_nested(body):
+    if "{" not in body:
+        return _minify_declarations(body)
+    return minify_css(body)
+
+
+def _split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == "," and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+# ---------------------------------------------------------------------------
+# Fingerprinting, compression, service worker
+# ---------------------------------------------------------------------------
+
+def compress(path, content):
+    """Write .gz (and .br) siblings when they are smaller than the original"""
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content, quality=11)))
+    written = []
+    for suffix, data in variants:
+        if len(data) < len(content):
+            Path(str(path) + suffix).write_bytes(data)
+            written.append(suffix)
+    return written
+
+
+def write_asset(name, content, sources, manifest):
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    stem, ext = os.path.splitext(name)
+    built = f"{stem}.{digest}{ext}"
+    path = DIST_DIR / built
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    encodings = compress(path, content)
+    manifest[name] = {"file": built, "sources": sources}
+
+    original = sum((STATIC_DIR / source).stat().st_size for source in sources) / 1024
+    compressed = ""
+    if encodings:
+        smallest = min(Path(str(path) + suffix).stat().st_size for suffix in encodings)
+        compressed = f", {'/'.join(encodings)} {smallest / 1024:.1f}KB"
+    print(f"   {name:<20} -> dist/{built}  ({original:.1f}KB -> {len(content) / 1024:.1f}KB{compressed})")
+
+
+def write_service_worker(manifest):
+    """dist/sw.js: source sw.js with the hashed precache list and a cache
+    name that changes with any asset"""
+    source = (STATIC_DIR / "sw.js").read_text(encoding="utf-8")
+    files = sorted(entry["file"] for entry in manifest.values())
+    version = hashlib.sha256("\n".join(files).encode()).hexdigest()[:10]
+    urls = ["/"] + [f"/static/dist/{file}" for file in files]
+
+    # The source's "Development copy" header does not describe the built file
+    source = re.sub(r"\A(?://[^\n]*\n)+", "// Generated by build_css.py from app/static/sw.js: edit the source.\n", source, count=1)
+    source = re.sub(r"const CACHE_NAME = [^;]*;", f"const CACHE_NAME = 'devis-menuiserie-{version}';", source, count=1)
+    source = re.sub(r"const urlsToCache = \[[^\]]*\];",
+                    "const urlsToCache = " + json.dumps(urls, indent=2) + ";", source, count=1)
+    (DIST_DIR / "sw.js").write_text(source, encoding="utf-8")
+    print(f"   sw.js                -> dist/sw.js  (cache devis-menuiserie-{version}, {len(urls)} URLs)")
+
+
+def _remove_stale(keep):
+    """Delete build outputs that neither this build nor the previous one reference
+
+    The previous generation stays so that pages already loaded keep working.
+    """
+    for path in DIST_DIR.rglob("*"):
+        if path.is_file():
+            relative = path.relative_to(DIST_DIR).as_posix()
+            base = re.sub(r"\.(gz|br)$", "", relative)
+            if base not in keep and relative not in ("manifest.json", "sw.js"):
+                path.unlink()
+
+
+def build_assets():
+    """Bundle, minify, fingerprint and pre-compress JS/CSS into app/static/dist"""
+    print("📦 Static assets")
+    manifest_path = DIST_DIR / "manifest.json"
+    previous = {}
+    if manifest_path.exists():
+        previous = json.loads(manifest_path.read_text(encoding="utf-8")).get("assets", {})
+
+    manifest = {}
+    for name, sources in JS_BUNDLES.items():
+        bundle = ";\n".join(minify_js((STATIC_DIR / source).read_text(encoding="utf-8")) for source in sources)
+        write_asset(name, bundle.encode("utf-8"), sources, manifest)
+
+    used = collect_used_names()
+    for name, options in CSS_ASSETS.items():
+        source = STATIC_DIR / name
+        if not source.exists():
+            print(f"   ⚠️  {name} missing, skipped")
+            continue
+        css = source.read_text(encoding="utf-8")
+        if options["minify"]:
+            css = minify_css(css, used if options["prune"] else None)
+        write_asset(name, css.encode("utf-8"), [name], manifest)
+
+    manifest_path.write_text(json.dumps({"assets": manifest}, indent=2), encoding="utf-8")
+    write_service_worker(manifest)
+
+    keep = {entry["file"] for entry in manifest.values()} | {entry["file"] for entry in previous.values()}
+    _remove_stale(keep)
+    if brotli is None:
+        print("   ℹ️  pip install brotli to also emit .br files")
+    print(f"✅ Assets built in {DIST_DIR}/")
+    return 0
+
+
 if __name__ == "__main__":
     watch_mode = "--watch" in sys.argv or "-w" in sys.argv
     no_minify = "--no-minify" in sys.argv
+    assets_only = "--assets-only" in sys.argv
     
     if "--help" in sys.argv or "-h" in sys.argv:
         print("""
@@ -64,17 +477,26 @@ if __name__ == "__main__":
 Usage: python build_css.py [options]
 
 Options:
-  --watch, -w      Watch for changes and rebuild automatically
+  --watch, -w      Watch for changes and rebuild automatically (Tailwind only)
   --no-minify      Don't minify the output CSS
+  --assets-only    Skip Tailwind, only rebuild app/static/dist
   --help, -h       Show this help message
 
 Examples:
-  python build_css.py              # Build once, minified
+  python build_css.py              # Tailwind + fingerprinted assets
   python build_css.py --watch      # Watch mode
   python build_css.py --no-minify  # Build without minification
+  python build_css.py --assets-only
 
-Note: This script uses the standalone Tailwind binary (no Node.js required)
+Note: This script uses the standalone Tailwind binary (no Node.js required).
+Install the optional `brotli` package to also pre-compress assets as .br
         """)
         sys.exit(0)
     
-    sys.exit(build_css(minify=not no_minify, watch=watch_mode))
+    if assets_only:
+        sys.exit(build_assets())
+    
+    code = build_css(minify=not no_minify, watch=watch_mode)
+    if code or watch_mode:
+        sys.exit(code)
+    sys.exit(build_assets())
@@ -1,6 +1,8 @@
 from app import create_app, db
+from flask_migrate import upgrade
 from app.models import User, Company, AppSettings
 import os
+import click
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -13,6 +15,9 @@ def init_database():
     with app.app_context():
         # Create all tables
         db.create_all()
+        # create_all never alters existing tables: migrations add the missing
+        # columns and record the schema revision (no-op on a fresh database)
+        upgrade()
         print("✓ Database tables created")
         
         # Create default super admin if doesn't exist
@@ -53,6 +58,41 @@ def init_db():
     """Initialize the database (Flask CLI command)."""
     init_database()
 
+@app.cli.command()
+@click.option('--chunk-size', default=500, help='Quotes migrated per transaction.')
+def backfill_quote_items(chunk_size):
+    """Move quote articles into quote_items and fill client_name/item_count."""
+    from app.services.quote_items import backfill_quote_items as backfill
+    with app.app_context():
+        # quote_items and the new quote columns must exist first
+        upgrade()
+        quotes, items = backfill(chunk_size)
+    print(f"✓ {quotes} quotes migrated, {items} quote items created")
+
+@app.cli.command()
+def rebuild_quote_rollups():
+    """Regenerate quote_daily_rollups from the quotes table."""
+    from app.services.rollups import rebuild_rollups
+    with app.app_context():
+        upgrade()
+        rows = rebuild_rollups()
+    print(f"✓ {rows} daily rollups rebuilt")
+
+@app.cli.command()
+def compact_catalog():
+    """Turn copied company catalogs into overrides of the template catalog."""
+    from app.models import Company
+    from app.services.catalog_overlay import compact_company_catalog
+    with app.app_context():
+        # template_id / is_hidden / catalog_inherits must exist first
+        upgrade()
+        companies = Company.query.filter_by(catalog_inherits=False).all()
+        for company in companies:
+            removed, hidden = compact_company_catalog(company)
+            db.session.commit()
+            print(f"  {company.name}: {removed} copied rows removed, {hidden} template rows hidden")
+    print(f"✓ {len(companies)} company catalogs compacted")
+
 if __name__ == '__main__':
     # Auto-initialize database on first run
     with app.app_context():
@@ -0,0 +1,51 @@
+"""catalog overlay
+
+Company catalogs become overrides of the template catalog: template_id and
+is_hidden on the catalog tables, companies.catalog_inherits. Existing
+companies keep their copied catalog until `flask compact-catalog`.
+
+Revision ID: 517140491bae
+Revises: 53504ee62343
+Create Date: 2026-10-17 23:51:27.675175
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '517140491bae'
+down_revision = '53504ee62343'
+branch_labels = None
+depends_on = None
+
+
+CATALOG_TABLES = ('chassis_types', 'profile_series', 'glazing_types', 'finishes', 'accessories')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in CATALOG_TABLES:
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        if 'template_id' in columns and 'is_hidden' in columns:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            if 'template_id' not in columns:
+                batch_op.add_column(sa.Column('template_id', sa.Integer(), nullable=True))
+                batch_op.create_foreign_key(f'fk_{table}_template_id', table, ['template_id'], ['id'])
+                batch_op.create_index(f'ix_{table}_template_id', ['template_id'])
+            if 'is_hidden' not in columns:
+                batch_op.add_column(sa.Column('is_hidden', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    if 'catalog_inherits' not in {column['name'] for column in inspector.get_columns('companies')}:
+        op.add_column('companies', sa.Column('catalog_inherits', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    op.drop_column('companies', 'catalog_inherits')
+    for table in CATALOG_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_template_id')
+            batch_op.drop_constraint(f'fk_{table}_template_id', type_='foreignkey')
+            batch_op.drop_column('is_hidden')
+            batch_op.drop_column('template_id')
@@ -0,0 +1,31 @@
+"""company listing indexes
+
+Keyset pagination of the companies list and per-company user counts.
+
+Revision ID: 53504ee62343
+Revises: b13bf9e28460
+Create Date: 2026-10-17 23:51:25.044566
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '53504ee62343'
+down_revision = 'b13bf9e28460'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'ix_companies_created_id' not in {index['name'] for index in inspector.get_indexes('companies')}:
+        op.create_index('ix_companies_created_id', 'companies', ['created_at', 'id'])
+    if 'ix_users_company_id' not in {index['name'] for index in inspector.get_indexes('users')}:
+        op.create_index('ix_users_company_id', 'users', ['company_id'])
+
+
+def downgrade():
+    op.drop_index('ix_users_company_id', table_name='users')
+    op.drop_index('ix_companies_created_id', table_name='companies')
@@ -0,0 +1,77 @@
+"""quote items and summary columns
+
+Quote articles move to quote_items; quotes get client_name / item_count and
+the dashboard and recent-feed indexes. Existing quotes are migrated in
+batches; `flask backfill-quote-items` does the same for quotes left behind.
+
+Revision ID: 7e63b65a8a61
+Revises: cee6230fe490
+Create Date: 2026-10-17 23:50:43.731269
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.quote_items import backfill_quote_items
+
+
+# revision identifiers, used by Alembic.
+revision = '7e63b65a8a61'
+down_revision = 'cee6230fe490'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('quote_items'):
+        op.create_table(
+            'quote_items',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('quote_id', sa.Integer(), nullable=False),
+            sa.Column('position', sa.Integer(), nullable=False),
+            sa.Column('chassis_type', sa.String(length=100), nullable=False),
+            sa.Column('width', sa.Integer(), nullable=False),
+            sa.Column('height', sa.Integer(), nullable=False),
+            sa.Column('profile_series', sa.String(length=100), nullable=True),
+            sa.Column('glazing_type', sa.String(length=100), nullable=True),
+            sa.Column('finish', sa.String(length=100), nullable=True),
+            sa.Column('accessories', sa.Text(), nullable=True),
+            sa.Column('discount_percent', sa.Float(), nullable=True),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('unit_price_ht', sa.Float(), nullable=False),
+            sa.Column('unit_price_ttc', sa.Float(), nullable=False),
+            sa.Column('breakdown', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['quote_id'], ['quotes.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_quote_items_quote_id', 'quote_items', ['quote_id'])
+
+    columns = {column['name'] for column in inspector.get_columns('quotes')}
+    if 'client_name' not in columns:
+        op.add_column('quotes', sa.Column('client_name', sa.String(length=200), nullable=True))
+    if 'item_count' not in columns:
+        op.add_column('quotes', sa.Column('item_count', sa.Integer(), nullable=False, server_default='1'))
+
+    indexes = {index['name'] for index in inspector.get_indexes('quotes')}
+    if 'ix_quotes_company_date' not in indexes:
+        op.create_index('ix_quotes_company_date', 'quotes', ['company_id', 'quote_date', 'price_ttc', 'item_count'])
+    if 'ix_quotes_company_client' not in indexes:
+        op.create_index('ix_quotes_company_client', 'quotes', ['company_id', 'client_name'])
+    if 'ix_quotes_company_created' not in indexes:
+        op.create_index('ix_quotes_company_created', 'quotes', ['company_id', sa.text('created_at DESC')],
+                        postgresql_include=['quote_number', 'quote_date', 'price_ttc', 'chassis_type', 'client_name'])
+
+    # Articles out of details['items'] (or the quote columns), client_name, item_count
+    backfill_quote_items(connection=op.get_bind())
+
+
+def downgrade():
+    op.drop_index('ix_quotes_company_created', table_name='quotes')
+    op.drop_index('ix_quotes_company_client', table_name='quotes')
+    op.drop_index('ix_quotes_company_date', table_name='quotes')
+    with op.batch_alter_table('quotes') as batch_op:
+        batch_op.drop_column('item_count')
+        batch_op.drop_column('client_name')
+    op.drop_index('ix_quote_items_quote_id', table_name='quote_items')
+    op.drop_table('quote_items')
@@ -0,0 +1,35 @@
+"""pricing tiers and company rules
+
+Quantity thresholds (degressive rates) and company-specific pricing rules.
+
+Revision ID: 837780f15570
+Revises: 973b5feed1fa
+Create Date: 2026-10-17 23:48:59.841027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '837780f15570'
+down_revision = '973b5feed1fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('pricing')}
+    with op.batch_alter_table('pricing') as batch_op:
+        if 'min_quantity' not in columns:
+            batch_op.add_column(sa.Column('min_quantity', sa.Float(), nullable=False, server_default='0'))
+        if 'company_id' not in columns:
+            batch_op.add_column(sa.Column('company_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_pricing_company_id', 'companies', ['company_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('pricing') as batch_op:
+        batch_op.drop_constraint('fk_pricing_company_id', type_='foreignkey')
+        batch_op.drop_column('company_id')
+        batch_op.drop_column('min_quantity')
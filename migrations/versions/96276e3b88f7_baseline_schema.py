@@ -0,0 +1,32 @@
+"""baseline schema
+
+Schema created by `flask init-db` (db.create_all) before migrations were
+introduced. Databases from that time upgrade from here; init-db runs the
+upgrade right after create_all on new databases.
+
+Every later revision checks what already exists before changing it, so
+`flask db upgrade` is also safe on a database whose tables were partly
+created by db.create_all.
+
+Revision ID: 96276e3b88f7
+Revises: 
+Create Date: 2026-10-17 23:46:12.508331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '96276e3b88f7'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
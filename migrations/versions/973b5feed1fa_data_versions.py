@@ -0,0 +1,34 @@
+"""data versions
+
+Version stamps of the cached price books and catalog views.
+
+Revision ID: 973b5feed1fa
+Revises: 96276e3b88f7
+Create Date: 2026-10-17 23:47:02.748754
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '973b5feed1fa'
+down_revision = '96276e3b88f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('data_versions'):
+        return
+    op.create_table(
+        'data_versions',
+        sa.Column('company_key', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=30), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('company_key', 'scope')
+    )
+
+
+def downgrade():
+    op.drop_table('data_versions')
@@ -0,0 +1,81 @@
+"""quote daily rollups
+
+Daily quote totals read by the dashboard, filled from the existing quotes.
+`flask rebuild-quote-rollups` regenerates them if they ever drift.
+
+Revision ID: b13bf9e28460
+Revises: b58adb138c91
+Create Date: 2026-10-17 23:51:22.119557
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b13bf9e28460'
+down_revision = 'b58adb138c91'
+branch_labels = None
+depends_on = None
+
+
+quotes = sa.table(
+    'quotes',
+    sa.column('id', sa.Integer),
+    sa.column('company_id', sa.Integer),
+    sa.column('quote_date', sa.String),
+    sa.column('price_ht', sa.Float),
+    sa.column('price_ttc', sa.Float),
+    sa.column('item_count', sa.Integer),
+)
+
+rollups = sa.table(
+    'quote_daily_rollups',
+    sa.column('company_key', sa.Integer),
+    sa.column('day', sa.String),
+    sa.column('quote_count', sa.Integer),
+    sa.column('total_ht', sa.Float),
+    sa.column('total_ttc', sa.Float),
+    sa.column('item_count', sa.Integer),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('quote_daily_rollups'):
+        create_table()
+    # db.create_all() may have created the table empty just before
+    if bind.execute(sa.select(rollups.c.day).limit(1)).first() is not None:
+        return
+
+    # Same INSERT … SELECT … GROUP BY as rebuild_rollups()
+    key = sa.func.coalesce(quotes.c.company_id, 0)
+    grouped = sa.select(
+        key,
+        quotes.c.quote_date,
+        sa.func.count(quotes.c.id),
+        sa.func.coalesce(sa.func.sum(quotes.c.price_ht), 0),
+        sa.func.coalesce(sa.func.sum(quotes.c.price_ttc), 0),
+        sa.func.coalesce(sa.func.sum(quotes.c.item_count), 0)
+    ).group_by(key, quotes.c.quote_date)
+    bind.execute(rollups.insert().from_select(
+        ['company_key', 'day', 'quote_count', 'total_ht', 'total_ttc', 'item_count'],
+        grouped
+    ))
+
+
+def create_table():
+    op.create_table(
+        'quote_daily_rollups',
+        sa.Column('company_key', sa.Integer(), nullable=False),
+        sa.Column('day', sa.String(length=10), nullable=False),
+        sa.Column('quote_count', sa.Integer(), nullable=False),
+        sa.Column('total_ht', sa.Float(), nullable=False),
+        sa.Column('total_ttc', sa.Float(), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('company_key', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('quote_daily_rollups')
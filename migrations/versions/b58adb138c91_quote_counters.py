@@ -0,0 +1,34 @@
+"""quote counters
+
+Per-company daily counters allocating quote numbers.
+
+Revision ID: b58adb138c91
+Revises: 7e63b65a8a61
+Create Date: 2026-10-17 23:51:19.585762
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b58adb138c91'
+down_revision = '7e63b65a8a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('quote_counters'):
+        return
+    op.create_table(
+        'quote_counters',
+        sa.Column('company_key', sa.Integer(), nullable=False),
+        sa.Column('day', sa.String(length=8), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('company_key', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('quote_counters')
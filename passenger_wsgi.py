@@ -16,6 +16,7 @@ project_folder = Path(__file__).parent.resolve()
 load_dotenv(project_folder / '.env')
 
 from app import create_app, db
+from flask_migrate import upgrade
 from app.models import User, AppSettings
 
 application = create_app()
@@ -24,6 +25,9 @@ def init_database():
     """Initialize the database with default data."""
     with application.app_context():
         db.create_all()
+        # create_all never alters existing tables: migrations add the missing
+        # columns and record the schema revision (no-op on a fresh database)
+        upgrade()
         
         if not User.query.filter_by(username='superadmin').first():
             superadmin = User(
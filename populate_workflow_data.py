@@ -7,6 +7,7 @@ sys.path.insert(0, '.')
 
 from app import create_app, db
 from app.models import ChassisType, ProfileSeries, GlazingType, Finish, Accessory
+from app.services.versions import bump_version
 
 app = create_app()
 
@@ -96,6 +97,8 @@ with app.app_context():
     for f in finishes:
         db.session.add(f)
     
+    # Running app processes recompile their price books
+    bump_version(None)
     db.session.commit()
     print("\n✅ Database populated successfully!")
     print(f"  - {len(chassis_types)} chassis types")
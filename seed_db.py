@@ -1,8 +1,10 @@
 from app import create_app, db
 from app.models import (
     ChassisType, ProfileSeries, GlazingType, Finish, 
-    Accessory, Pricing, Config, User
+    Accessory, Pricing, User
 )
+from app.services.pricing import set_config_value
+from app.services.versions import bump_version
 
 app = create_app()
 
@@ -87,13 +89,14 @@ with app.app_context():
     ]
     
     for data in config_data:
-        config = Config(**data)
-        db.session.add(config)
+        set_config_value(data['key'], data['value'])
     
     admin = User(username='admin', full_name='Administrateur', role='admin')
     admin.set_password('admin123')
     db.session.add(admin)
     
+    # Running app processes recompile their price books
+    bump_version(None)
     db.session.commit()
     
     print("✅ Database seeded successfully with PostgreSQL!")
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from app import create_app, db
+from app.models import Accessory, ChassisType, Company, Config, Finish, GlazingType, ProfileSeries, User
+from app.services import assets
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('app')
+    os.environ['SECRET_KEY'] = 'test-secret'
+    os.environ['ENCRYPTION_KEY'] = Fernet.generate_key().decode()
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp / 'test.db'}"
+
+    # Asset build output of the working copy must not leak into the tests
+    dist_dir = tmp / 'dist'
+    dist_dir.mkdir()
+    patch = pytest.MonkeyPatch()
+    patch.setattr(assets, 'DIST_DIR', str(dist_dir))
+    patch.setattr(assets, 'MANIFEST_PATH', str(dist_dir / 'manifest.json'))
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        company = Company(name='ACME', status='approved')
+        db.session.add(company)
+        db.session.flush()
+        db.session.add(ChassisType(company_id=None, name='Fixe', min_width=300, max_width=3000,
+                                   min_height=300, max_height=2500))
+        db.session.add(ProfileSeries(company_id=None, name='Série Fine', price_per_meter=35.0))
+        db.session.add(ProfileSeries(company_id=None, name='Série Premium', price_per_meter=55.0))
+        db.session.add(GlazingType(company_id=None, name='4mm', price_per_m2=45.0))
+        db.session.add(Finish(company_id=None, name='Brut', price_coefficient=1.0))
+        db.session.add(Accessory(company_id=None, name='Crémone', unit_price=35.0))
+        db.session.add(Accessory(company_id=None, name='Rail', unit_price=20.0,
+                                 incompatible_series='Série Premium'))
+        db.session.add(Config(key='vat_rate', value='20'))
+        db.session.add(Config(key='loss_coefficient', value='1.1'))
+        admin = User(username='admin', email='admin@example.com', role='admin', company_id=company.id)
+        admin.set_password('secret')
+        db.session.add(admin)
+        db.session.commit()
+
+    yield app
+    patch.undo()
+
+
+# Article priced against the template catalog seeded above
+ITEM = {'chassisType': 'Fixe', 'width': 1000, 'height': 1200, 'profileSeries': 'Série Fine',
+        'glazingType': '4mm', 'finish': 'Brut', 'accessories': {'Crémone': 1}}
+
+
+@pytest.fixture
+def dist_dir(app):
+    return assets.DIST_DIR
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'secret'})
+    assert response.status_code == 200
+    return client
@@ -0,0 +1,51 @@
+import pytest
+
+
+def names(client, entity):
+    return {row['name']: row for row in client.get(f'/api/catalog/{entity}').get_json()}
+
+
+def test_bulk_applies_upserts_and_deletes(admin_client):
+    assert admin_client.post('/api/catalog/accessories/bulk', json={
+        'upserts': [{'name': 'Verrou', 'unit_price': 8.0}, {'name': 'Paumelle', 'unit_price': 4.0}]
+    }).status_code == 200
+
+    response = admin_client.post('/api/catalog/accessories/bulk', json={
+        'upserts': [{'name': 'Verrou', 'unit_price': 9.0}],
+        'deletes': ['Paumelle']
+    })
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'updated': 1, 'deleted': 1}
+
+    rows = names(admin_client, 'accessories')
+    assert rows['Verrou']['unit_price'] == 9.0
+    assert 'Paumelle' not in rows
+
+
+def test_invalid_row_rolls_back_the_whole_request(admin_client):
+    before = names(admin_client, 'accessories')
+
+    response = admin_client.post('/api/catalog/accessories/bulk', json={
+        'upserts': [{'name': 'Loquet', 'unit_price': 5.0}, {'name': 'Gâche', 'unit_price': 'cher'}],
+        'deletes': ['Crémone']
+    })
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['summary']['error'] == 1
+    assert [result['name'] for result in body['results'] if result['status'] == 'error'] == ['Gâche']
+
+    assert names(admin_client, 'accessories') == before
+
+
+@pytest.mark.parametrize('body', [
+    [],
+    [{'name': 'Loquet'}],
+    'upserts',
+    {'upserts': {'name': 'Loquet'}},
+    {'deletes': 'Crémone'},
+    {'upserts': None},
+])
+def test_malformed_body_is_rejected(admin_client, body):
+    response = admin_client.post('/api/catalog/accessories/bulk', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,74 @@
+import pytest
+
+from app import db
+from app.models import Company, GlazingType, User
+
+
+@pytest.fixture(scope='module')
+def beta_client(app):
+    with app.app_context():
+        company = Company(name='Beta', status='approved')
+        db.session.add(company)
+        db.session.flush()
+        admin = User(username='beta', email='beta@example.com', role='admin', company_id=company.id)
+        admin.set_password('secret')
+        db.session.add(admin)
+        db.session.commit()
+
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'beta', 'password': 'secret'})
+    assert response.status_code == 200
+    return client
+
+
+def rows_by_name(client, entity):
+    return {row['name']: row for row in client.get(f'/api/catalog/{entity}').get_json()}
+
+
+def test_company_inherits_template_catalog(beta_client, admin_client):
+    assert rows_by_name(beta_client, 'glazing-types') == rows_by_name(admin_client, 'glazing-types')
+
+
+def test_editing_template_row_copies_it_for_the_company(app, beta_client, admin_client):
+    template = rows_by_name(beta_client, 'glazing-types')['4mm']
+
+    response = beta_client.put(f"/api/catalog/glazing-types/{template['id']}", json={'price_per_m2': 99.0})
+    assert response.status_code == 200
+    override = response.get_json()
+    assert override['id'] != template['id']
+    assert override['price_per_m2'] == 99.0
+
+    # The override takes the template row's place, other companies keep the template
+    assert rows_by_name(beta_client, 'glazing-types')['4mm']['id'] == override['id']
+    assert rows_by_name(admin_client, 'glazing-types')['4mm'] == template
+    with app.app_context():
+        assert db.session.get(GlazingType, template['id']).price_per_m2 == template['price_per_m2']
+        assert db.session.get(GlazingType, override['id']).template_id == template['id']
+
+    # Editing again updates the same override
+    response = beta_client.put(f"/api/catalog/glazing-types/{template['id']}", json={'price_per_m2': 98.0})
+    assert response.get_json()['id'] == override['id']
+
+
+def test_deleting_inherited_row_hides_it_for_the_company_only(beta_client, admin_client):
+    template = rows_by_name(beta_client, 'finishes')['Brut']
+
+    assert beta_client.delete(f"/api/catalog/finishes/{template['id']}").status_code == 200
+    assert 'Brut' not in rows_by_name(beta_client, 'finishes')
+    assert 'Brut' in rows_by_name(admin_client, 'finishes')
+
+    # Re-creating the name brings the row back as an override
+    response = beta_client.post('/api/catalog/finishes', json={'name': 'Brut', 'price_coefficient': 1.1})
+    assert response.status_code == 201
+    assert rows_by_name(beta_client, 'finishes')['Brut']['price_coefficient'] == 1.1
+    assert rows_by_name(admin_client, 'finishes')['Brut'] == template
+
+
+def test_other_company_rows_are_not_reachable(beta_client, admin_client):
+    response = beta_client.post('/api/catalog/accessories', json={'name': 'Poignée Beta', 'unit_price': 12.0})
+    assert response.status_code == 201
+    entry_id = response.get_json()['id']
+
+    assert 'Poignée Beta' not in rows_by_name(admin_client, 'accessories')
+    assert admin_client.put(f'/api/catalog/accessories/{entry_id}', json={'unit_price': 0}).status_code == 404
+    assert admin_client.delete(f'/api/catalog/accessories/{entry_id}').status_code == 404
@@ -0,0 +1,48 @@
+from app.services.compatibility import CompatibilityIndex
+from conftest import ITEM
+
+PREMIUM_RAIL = {**ITEM, 'profileSeries': 'Série Premium', 'accessories': {'Rail': 1}}
+
+
+def test_incompatible_series_lists_are_parsed_leniently():
+    index = CompatibilityIndex(['Série A', 'Série B', 'Série C'], [
+        ('Rail', 'série  a; SÉRIE C'),
+        ('Crémone', None),
+        ('Verrou', 'Série inconnue'),
+    ])
+    assert not index.is_compatible('Rail', 'Série A')
+    assert index.is_compatible('Rail', 'Série B')
+    assert not index.is_compatible('Rail', 'Série C')
+    assert index.is_compatible('Crémone', 'Série A')
+    assert index.to_dict() == {'series': ['Série A', 'Série B', 'Série C'], 'incompatible': {'Rail': '5'}}
+
+
+def test_calculate_rejects_incompatible_accessory(admin_client):
+    response = admin_client.post('/api/quotes/calculate', json=PREMIUM_RAIL)
+    assert response.status_code == 400
+    assert 'not compatible' in response.get_json()['error']
+
+    response = admin_client.post('/api/quotes/calculate', json={**PREMIUM_RAIL, 'profileSeries': 'Série Fine'})
+    assert response.status_code == 200
+
+
+def test_batch_reports_incompatible_item(admin_client):
+    response = admin_client.post('/api/quotes/calculate-batch', json={'items': [ITEM, PREMIUM_RAIL]})
+    assert response.status_code == 200
+    first, second = response.get_json()['items']
+    assert 'error' not in first
+    assert 'not compatible' in second['error']
+
+
+def test_quote_with_incompatible_item_is_not_saved(admin_client):
+    before = admin_client.get('/api/quotes/stats').get_json()['total']
+    response = admin_client.post('/api/quotes', json={'items': [ITEM, PREMIUM_RAIL]})
+    assert response.status_code == 400
+    assert admin_client.get('/api/quotes/stats').get_json()['total'] == before
+
+
+def test_compatibility_matrix_lists_incompatible_accessories(admin_client):
+    matrix = admin_client.get('/api/catalog/compatibility').get_json()
+    bit = matrix['series'].index('Série Premium')
+    assert int(matrix['incompatible']['Rail'], 16) == 1 << bit
+    assert 'Crémone' not in matrix['incompatible']
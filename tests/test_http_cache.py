@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from app.services.http_cache import IMMUTABLE, NO_STORE, PRIVATE_REVALIDATE, PUBLIC_REVALIDATE
+
+
+def assert_revalidated(client, url, cache_control):
+    """Cache-Control attendu, ETag présent, 304 sans corps sur If-None-Match"""
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == cache_control
+    etag = response.headers.get('ETag')
+    assert etag
+
+    revalidated = client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['Cache-Control'] == cache_control
+    assert revalidated.headers['ETag'] == etag
+    return etag
+
+
+def test_fingerprinted_dist_asset_is_immutable(client, dist_dir):
+    with open(os.path.join(dist_dir, 'app.0123abcd45.js'), 'w') as f:
+        f.write('console.log(1);')
+
+    response = client.get('/static/dist/app.0123abcd45.js')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_versioned_static_asset_is_immutable(client):
+    response = client.get('/static/js/app.js?v=0123abcd45')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+
+
+def test_unversioned_static_asset_is_revalidated(client):
+    assert_revalidated(client, '/static/js/app.js', PUBLIC_REVALIDATE)
+
+
+def test_service_worker_is_revalidated(client):
+    response = client.get('/sw.js')
+    assert response.mimetype == 'application/javascript'
+    assert_revalidated(client, '/sw.js', PUBLIC_REVALIDATE)
+
+
+def test_catalog_etag_follows_catalog_version(admin_client):
+    etag = assert_revalidated(admin_client, '/api/catalog/chassis-types', PRIVATE_REVALIDATE)
+
+    response = admin_client.post('/api/catalog/chassis-types', json={
+        'name': 'Coulissant', 'min_width': 500, 'max_width': 4000, 'min_height': 500, 'max_height': 2500
+    })
+    assert response.status_code == 201
+
+    response = admin_client.get('/api/catalog/chassis-types', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Coulissant' in [row['name'] for row in response.get_json()]
+
+
+def test_catalog_compatibility_is_revalidated(admin_client):
+    assert_revalidated(admin_client, '/api/catalog/compatibility', PRIVATE_REVALIDATE)
+
+
+def test_translations_are_revalidated(client):
+    assert_revalidated(client, '/api/languages/translations/fr', PRIVATE_REVALIDATE)
+
+
+@pytest.mark.parametrize('url', ['/api/bootstrap/quote-wizard', '/api/bootstrap/dashboard'])
+def test_bootstrap_is_revalidated(admin_client, url):
+    assert_revalidated(admin_client, url, PRIVATE_REVALIDATE)
+
+
+@pytest.mark.parametrize('method, url, body', [
+    ('get', '/api/auth/check', None),
+    ('get', '/api/quotes/stats', None),
+    ('get', '/api/quotes/recent', None),
+    ('post', '/api/quotes/calculate', {'chassisType': 'Fixe', 'width': 1000, 'height': 1000}),
+])
+def test_sensitive_endpoints_are_not_stored(admin_client, method, url, body):
+    response = getattr(admin_client, method)(url, json=body)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == NO_STORE
+    assert response.headers['Pragma'] == 'no-cache'
+    assert 'ETag' not in response.headers
+
+
+def test_catalog_writes_are_not_stored(admin_client):
+    response = admin_client.post('/api/catalog/chassis-types', json={
+        'name': 'Fenêtre', 'min_width': 400, 'max_width': 1800, 'min_height': 400, 'max_height': 1600
+    })
+    assert response.status_code == 201
+    assert response.headers['Cache-Control'] == NO_STORE
+
+
+@pytest.mark.parametrize('url', ['/', '/login.html', '/quote.html'])
+def test_html_pages_are_revalidated(client, url):
+    assert_revalidated(client, url, PRIVATE_REVALIDATE)
@@ -0,0 +1,63 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import BackgroundJob, Company
+from app.routes import quotes
+from app.services import jobs, pdf_cache
+from app.services.jobs import JOB_STALE_AFTER
+from conftest import ITEM
+
+
+def add_job(app, status, **times):
+    with app.app_context():
+        company_id = Company.query.filter_by(name='ACME').one().id
+        job = BackgroundJob(id=str(uuid.uuid4()), kind='reprice', company_id=company_id, status=status, **times)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def test_lost_job_is_reported_failed_when_polled(app, admin_client):
+    long_ago = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER + 60)
+    job_id = add_job(app, 'running', started_at=long_ago, heartbeat_at=long_ago)
+
+    job = admin_client.get(f'/api/jobs/{job_id}').get_json()
+    assert job['status'] == 'failed'
+    assert 'Interrupted' in job['error']
+
+
+def test_job_with_recent_heartbeat_keeps_running(app, admin_client):
+    long_ago = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER + 60)
+    job_id = add_job(app, 'running', started_at=long_ago, heartbeat_at=datetime.utcnow())
+
+    assert admin_client.get(f'/api/jobs/{job_id}').get_json()['status'] == 'running'
+    response = admin_client.get(f'/api/jobs/{job_id}/result')
+    assert response.status_code == 409
+    assert response.get_json()['status'] == 'running'
+
+
+def test_async_pdf_result_survives_cache_eviction(app, admin_client, monkeypatch, tmp_path):
+    # Worker processes read PDF_CACHE_DIR from the environment when they start
+    monkeypatch.setenv('PDF_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(pdf_cache, 'PDF_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(jobs, 'JOBS_DIR', str(tmp_path / 'jobs'))
+    monkeypatch.setattr(quotes, 'PDF_INLINE_MAX_ITEMS', 0)
+
+    quote_id = admin_client.post('/api/quotes', json={'items': [ITEM, ITEM]}).get_json()['quote_id']
+    response = admin_client.get(f'/api/quotes/{quote_id}/pdf?async=1')
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+
+    deadline = time.monotonic() + 60
+    while admin_client.get(f'/api/jobs/{job_id}').get_json()['status'] == 'running':
+        assert time.monotonic() < deadline
+        time.sleep(0.2)
+
+    # The cached copy is evicted before the client downloads the result
+    for cached in (tmp_path / 'cache').glob('*.pdf'):
+        cached.unlink()
+    response = admin_client.get(f'/api/jobs/{job_id}/result')
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
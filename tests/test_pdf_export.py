@@ -0,0 +1,27 @@
+import io
+import zipfile
+
+from app.services import pdf_export
+from conftest import ITEM
+
+
+def test_unreadable_cached_pdf_is_listed_in_errors(admin_client, monkeypatch, tmp_path):
+    ids = [admin_client.post('/api/quotes', json={'items': [ITEM]}).get_json()['quote_id'] for _ in range(2)]
+    cached = tmp_path / 'cached.pdf'
+    cached.write_bytes(b'%PDF-cached')
+
+    # First quote: evicted from the cache and its re-render fails; second: cache hit
+    paths = iter([str(tmp_path / 'evicted.pdf'), str(cached)])
+    monkeypatch.setattr(pdf_export, 'lookup', lambda key: next(paths))
+
+    def broken_render(document):
+        raise RuntimeError('renderer crashed')
+    monkeypatch.setattr(pdf_export, 'render_checked', broken_render)
+
+    response = admin_client.post('/api/quotes/export/pdf-zip', json={'ids': ids})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    names = archive.namelist()
+    assert len(names) == 2 and names[1] == 'erreurs.txt'
+    assert archive.read(names[0]) == b'%PDF-cached'
+    assert 'rendering failed (RuntimeError)' in archive.read('erreurs.txt').decode()
@@ -0,0 +1,78 @@
+from app import db
+from app.models import Config, DataVersion
+from app.services.pricing import set_config_value
+from app.services.versions import TEMPLATE_KEY, bump_version
+from conftest import ITEM
+
+
+def calculate(client, **changes):
+    response = client.post('/api/quotes/calculate', json={**ITEM, **changes})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def catalog_row(client, entity, name):
+    return next(row for row in client.get(f'/api/catalog/{entity}').get_json() if row['name'] == name)
+
+
+def test_catalog_write_changes_price_immediately(admin_client):
+    before = calculate(admin_client)
+    glazing = catalog_row(admin_client, 'glazing-types', '4mm')
+
+    response = admin_client.put(f"/api/catalog/glazing-types/{glazing['id']}",
+                                json={'price_per_m2': glazing['price_per_m2'] * 2})
+    assert response.status_code == 200
+    try:
+        after = calculate(admin_client)
+        assert after['glazing_cost'] == round(before['glazing_cost'] * 2, 2)
+        assert after['total_price'] > before['total_price']
+    finally:
+        admin_client.put(f"/api/catalog/glazing-types/{response.get_json()['id']}",
+                         json={'price_per_m2': glazing['price_per_m2']})
+
+    assert calculate(admin_client) == before
+
+
+def test_config_write_changes_price_immediately(app, admin_client):
+    before = calculate(admin_client)
+    with app.app_context():
+        set_config_value('vat_rate', '10')
+        db.session.commit()
+    try:
+        after = calculate(admin_client)
+        assert after['vat_rate'] == 10
+        assert after['total_ht'] == before['total_ht']
+        assert after['total_price'] == round(after['total_ht'] * 1.1, 2)
+    finally:
+        with app.app_context():
+            set_config_value('vat_rate', '20')
+            db.session.commit()
+
+    assert calculate(admin_client) == before
+
+
+def test_write_committed_by_another_worker_is_seen(app, admin_client):
+    before = calculate(admin_client)
+    with app.app_context():
+        # Plain UPDATEs, as another process would commit them: nothing in
+        # this process is invalidated, only the stored version changes
+        bump_version(None, scope='config')
+        db.session.info.pop('bumped_versions')
+        db.session.execute(Config.__table__.update().where(Config.key == 'vat_rate').values(value='0'))
+        db.session.commit()
+    try:
+        after = calculate(admin_client)
+        assert after['total_price'] == after['total_ht'] == before['total_ht']
+    finally:
+        with app.app_context():
+            set_config_value('vat_rate', '20')
+            db.session.commit()
+
+
+def test_config_version_is_bumped_by_writes(app):
+    with app.app_context():
+        version = db.session.get(DataVersion, (TEMPLATE_KEY, 'config'))
+        before = version.version if version else 0
+        set_config_value('vat_rate', '20')
+        db.session.commit()
+        assert db.session.get(DataVersion, (TEMPLATE_KEY, 'config')).version == before + 1
@@ -0,0 +1,59 @@
+
+from app import db
+from app.models import Quote
+from app.services.pdf_renderer import quote_document
+from conftest import ITEM
+
+
+def save_single(client):
+    breakdown = client.post('/api/quotes/calculate', json=ITEM).get_json()
+    response = client.post('/api/quotes', json={**ITEM, 'breakdown': breakdown, 'clientName': 'Martin'})
+    assert response.status_code == 200
+    return response.get_json()['quote_id']
+
+
+def document(app, quote_id):
+    with app.app_context():
+        return quote_document(db.session.get(Quote, quote_id), {})
+
+
+def test_single_chassis_quote_keeps_its_shape(app, admin_client):
+    quote_id = save_single(admin_client)
+
+    quote = admin_client.get(f'/api/quotes/{quote_id}').get_json()
+    assert quote['chassis_type'] == 'Fixe'
+    assert quote['profile_series'] == 'Série Fine'
+    assert 'items' not in quote['details']
+    assert quote['details']['client_name'] == 'Martin'
+
+    rendered = document(app, quote_id)
+    assert rendered['items'] == []
+    assert rendered['single']['chassisType'] == 'Fixe'
+    with app.app_context():
+        assert len(db.session.get(Quote, quote_id).items) == 1
+
+
+def test_multi_article_quote_exposes_its_items(app, admin_client):
+    for items in ([ITEM, {**ITEM, 'width': 800, 'quantity': 3}], [ITEM]):
+        response = admin_client.post('/api/quotes', json={'items': items, 'clientName': 'Durand'})
+        assert response.status_code == 200
+        quote_id = response.get_json()['quote_id']
+
+        quote = admin_client.get(f'/api/quotes/{quote_id}').get_json()
+        assert quote['profile_series'] == 'Multiple'
+        assert [item['width'] for item in quote['details']['items']] == [item['width'] for item in items]
+        assert document(app, quote_id)['items'] == quote['details']['items']
+
+
+def test_legacy_multi_article_quote_exposes_its_items(app, admin_client):
+    breakdown = admin_client.post('/api/quotes/calculate', json=ITEM).get_json()
+    response = admin_client.post('/api/quotes', json={
+        'chassisType': 'Devis multiple (2 articles)', 'width': 0, 'height': 0,
+        'profileSeries': 'Multiple', 'glazingType': 'Multiple', 'finish': 'Multiple',
+        'breakdown': {'items': [{**ITEM, 'breakdown': breakdown}, {**ITEM, 'quantity': 2, 'breakdown': breakdown}],
+                      'total_price': breakdown['total_price'] * 3}
+    })
+    assert response.status_code == 200
+
+    details = admin_client.get(f"/api/quotes/{response.get_json()['quote_id']}").get_json()['details']
+    assert [item['quantity'] for item in details['items']] == [1, 2]
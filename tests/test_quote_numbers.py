@@ -0,0 +1,46 @@
+import json
+
+from app import db
+from app.models import Quote, QuoteCounter
+from app.services.quote_numbers import allocate_quote_number
+from conftest import ITEM
+
+
+def legacy_quote(quote_number, company_id=None):
+    return Quote(quote_number=quote_number, quote_date='2020-01-02', chassis_type='Fixe', width=1000,
+                 height=1000, profile_series='', glazing_type='', finish='', price_ht=0, price_ttc=0,
+                 details=json.dumps({}), company_id=company_id)
+
+
+def test_saved_quotes_get_consecutive_numbers(admin_client):
+    numbers = []
+    for _ in range(3):
+        response = admin_client.post('/api/quotes', json={'items': [ITEM], 'clientName': 'Dupont'})
+        assert response.status_code == 200
+        numbers.append(response.get_json()['quote_number'])
+
+    prefix, day, first = numbers[0].rsplit('-', 2)
+    assert numbers == [f'{prefix}-{day}-{int(first) + offset:04d}' for offset in range(3)]
+
+
+def test_counter_is_seeded_from_legacy_numbers(app):
+    with app.app_context():
+        db.session.add(legacy_quote('DEV-20200102-0007'))
+        db.session.commit()
+
+        assert allocate_quote_number(None, '20200102') == 'DEV-20200102-0008'
+        assert allocate_quote_number(None, '20200102') == 'DEV-20200102-0009'
+        db.session.commit()
+        assert db.session.get(QuoteCounter, (0, '20200102')).last_value == 9
+
+
+def test_counters_are_per_company_and_day(app):
+    with app.app_context():
+        assert allocate_quote_number(None, '20200103') == 'DEV-20200103-0001'
+        assert allocate_quote_number(1, '20200103') == 'DEV-20200103-0001'
+        assert allocate_quote_number(None, '20200104') == 'DEV-20200104-0001'
+        assert allocate_quote_number(None, '20200103') == 'DEV-20200103-0002'
+        db.session.rollback()
+
+        # Rolled back with the quote that would have used it
+        assert db.session.get(QuoteCounter, (0, '20200103')) is None
@@ -0,0 +1,50 @@
+from app import db
+from app.models import QuoteDailyRollup
+from app.services.rollups import rebuild_rollups
+from conftest import ITEM
+
+
+def rollup_totals(app):
+    with app.app_context():
+        rows = db.session.query(
+            QuoteDailyRollup.quote_count, QuoteDailyRollup.total_ht,
+            QuoteDailyRollup.total_ttc, QuoteDailyRollup.item_count
+        ).all()
+        return [round(sum(column), 2) for column in zip(*rows)] if rows else [0, 0, 0, 0]
+
+
+def test_create_then_delete_leaves_rollups_unchanged(app, admin_client):
+    before = rollup_totals(app)
+    stats = admin_client.get('/api/quotes/stats').get_json()
+
+    response = admin_client.post('/api/quotes', json={'items': [ITEM, {**ITEM, 'quantity': 2}]})
+    assert response.status_code == 200
+    quote = admin_client.get(f"/api/quotes/{response.get_json()['quote_id']}").get_json()
+
+    count, total_ht, total_ttc, items = rollup_totals(app)
+    assert count == before[0] + 1
+    assert total_ht == round(before[1] + quote['price_ht'], 2)
+    assert total_ttc == round(before[2] + quote['price_ttc'], 2)
+    assert items == before[3] + 2
+    created = admin_client.get('/api/quotes/stats').get_json()
+    assert created['total'] == stats['total'] + 1
+    assert created['thisMonth'] == stats['thisMonth'] + 1
+
+    assert admin_client.delete(f"/api/quotes/{quote['id']}").status_code == 200
+    assert rollup_totals(app) == before
+    assert admin_client.get('/api/quotes/stats').get_json() == stats
+
+
+def test_rebuild_matches_incremental_rollups(app, admin_client):
+    with app.app_context():
+        rebuild_rollups()
+    before = rollup_totals(app)
+
+    response = admin_client.post('/api/quotes', json={'items': [ITEM, ITEM]})
+    assert response.status_code == 200
+    incremental = rollup_totals(app)
+    assert incremental[0] == before[0] + 1
+
+    with app.app_context():
+        rebuild_rollups()
+    assert rollup_totals(app) == incremental
@@ -12,6 +12,7 @@ if str(project_home) not in sys.path:
     sys.path.insert(0, str(project_home))
 
 from app import create_app, db
+from flask_migrate import upgrade
 from app.models import User, AppSettings
 from dotenv import load_dotenv
 
@@ -23,6 +24,9 @@ def init_database():
     """Initialize the database with default data."""
     with application.app_context():
         db.create_all()
+        # create_all never alters existing tables: migrations add the missing
+        # columns and record the schema revision (no-op on a fresh database)
+        upgrade()
         
         if not User.query.filter_by(username='superadmin').first():
             superadmin = User(